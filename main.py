@@ -36,14 +36,16 @@ import glob
 import logging
 import time
 import json
-import unicodecsv
 from optparse import OptionParser
-from teiexplorer.corpusreader import tei_content_scraper as tcscraper
-from teiexplorer.utils.sqlite_basic import (
-    CorpusSQLiteDBWriter,
-    CorpusSQLiteDBReader
+from teiexplorer.utils.memoize import (
+    configure_caches,
+    report_cache_statistics
 )
 
+# The dependencies of each command (lxml, unicodecsv, dataset and SQLAlchemy,
+# numpy...) are imported by the functions running it, so that short commands
+# (e.g. --help, or a CSV export) do not pay the import time of the others.
+
 # import metadataGraph as mdg
 
 logging.basicConfig(
@@ -51,91 +53,171 @@ logging.basicConfig(
     level=logging.INFO)
 
 
-def tei_to_omeka_header(header):
-    """ Transforms an XML-TEI header path to a Omeka-s (semantic-web compliant) header."""
-
-
-    # XML-TEI headers elements to Linked Data correspondences
-    xml_tag_to_voc = {
-        u"#fileDesc#titleStmt_title": u"dcterms:title",
-        u"#fileDesc#titleStmt_author_key": u"dcterms:creator",
-        u"#fileDesc#titleStmt_author": u"dcterms:creator",
-        u"#fileDesc#editionStmt#respStmt": u"dcterms:contributor",
-        u"#fileDesc#publicationStmt_publisher": u"dcterms:publisher",
-        u"#profileDesc#creation_when": u"dcterms:date",
-        u"#profileDesc#langUsage_ident": u"dcterms:language",
-        u"#fileDesc#publicationStmt_idno": u"dcterms:identifier",  # Mandatory for Gallica
-        u"#fileDesc#titleStmt_editor_key": u"http://schema.org/editor",
-        u'#fileDesc#publicationStmt#availability#licence': u"dcterms:rights",
-        u"#fileDesc#publicationStmt#availability#licence_": u"dcterms:rights",
-        u"#fileDesc#publicationStmt#licence": u"dcterms:rights",
-    }
+def database_writer(db_name):
+    """The CorpusSQLiteDBWriter of the DB db_name."""
+    from teiexplorer.utils.sqlite_basic import CorpusSQLiteDBWriter
+    return CorpusSQLiteDBWriter(db_name)
 
-    if xml_tag_to_voc.get(header, None):
-        return xml_tag_to_voc.get(header, header)
 
-    if u'#fileDesc#editionStmt#respStmt_' in header:
-        return u"dcterms:contributor"
+def database_reader(db_name):
+    """The CorpusSQLiteDBReader of the DB db_name."""
+    from teiexplorer.utils.sqlite_basic import CorpusSQLiteDBReader
+    return CorpusSQLiteDBReader(db_name)
 
-    return header
 
-def parse_tei_documents(corpora, database=None, omeka_csv_folder=None):
+def parse_tei_documents(corpora, database_name=None, omeka_csv_folder=None, json_lines_file=None):
     """
-    Extracting metadata from all the documents in corpora.
-    Optionally saving this information in a SQLite database.
+    Extracting metadata from all the documents in corpora, in a single pass:
+    each parsed document is fed to the sinks (SQLite DB, Omeka-s CSV, JSON-lines)
+    of the pipeline, which write it concurrently.
     :param corpora: Corpora locations where TEI files are stored
-    :param database: The database where the metadata should be stored. If none, no storage.
-    :param csv_file: The file where the transformed metadata information in
-                     Omeka-s CSVimport format should be written.
+    :param database_name: The database where the metadata should be stored. If none, no storage.
+    :param omeka_csv_folder: The folder where the transformed metadata information in
+                             Omeka-s CSVimport format should be written.
+    :param json_lines_file: The JSON-lines file where the metadata should be written.
     :return:
     """
-
+    from teiexplorer.corpusreader.pipeline import (
+        DocumentPipeline,
+        iter_tei_documents,
+        JSONLinesSink,
+        OmekaCSVSink,
+        SQLiteSink
+    )
+
+    sinks = []
+    if database_name:
+        sinks.append(SQLiteSink(database_name))
     if omeka_csv_folder:
+        sinks.append(OmekaCSVSink(omeka_csv_folder))
+    if json_lines_file:
+        sinks.append(JSONLinesSink(json_lines_file))
 
-        # Creating the folder if it does not exists
-        if not os.path.exists(omeka_csv_folder):
-            os.makedirs(omeka_csv_folder)
+    DocumentPipeline(sinks).run(iter_tei_documents(corpora, debug_size))
 
 
+def iter_documents_tokens(corpora):
+    """
+    Reads the documents of the corpora one by one.
+    :param corpora: Corpora locations where TEI files are stored
+    :return: A generator of (document file, body tokens) pairs
+    """
+    from teiexplorer.corpusreader.pipeline import iter_tei_documents
 
-    # The 'corpus_tag' corresponds to a label giving a hint on the corpus provenance.
-    for (corpus_tag, corpus_location) in corpora.items():
+    for document in iter_tei_documents(corpora, debug_size):
+        yield (u"%s" % document.filePath, document.get_body_tokens())
 
-        csv_header_info = []
-        csv_matadata_list = []
 
-        test_limit = 0
-        for document_file in glob.glob(corpus_location):
-            if debug_size and test_limit >= debug_size:
-                continue
-            test_limit += 1
-            logging.info(u"Parsing %s" % document_file)
-            document = tcscraper.TeiContent(document_file, corpus_tag)
+def find_near_duplicate_documents(corpora, database, near_duplicates_config):
+    """
+    Finds the near-duplicate documents of the corpora (MinHash/LSH on the word
+    shingles of their bodies), and saves them in the document_similarity table.
+    :param corpora: Corpora locations where TEI files are stored
+    :param database: The CorpusSQLiteDBWriter where the similarities are stored
+    :param near_duplicates_config: The "near_duplicates" entry of the configuration
+    """
+    from teiexplorer.corpuscomparer.near_duplicates import find_near_duplicates
 
-            # Doing clustering on content.
-            # if document.metadata:
-            # corpus.add_metadata(document_file, document.metadata)
-            # corpus.add_text_content(document_file,document.content_words)
+    similarities = find_near_duplicates(
+        iter_documents_tokens(corpora),
+        threshold=near_duplicates_config.get("threshold", 0.8),
+        num_perm=near_duplicates_config.get("num_perm", 128),
+        shingle_size=near_duplicates_config.get("shingle_size", 5))
+    database.add_document_similarities(similarities, method=u'minhash')
 
-            # Adding the metadata information to the document
-            if database:
-                database.add_xml_document(document)
 
-            if omeka_csv_folder:
-                csv_header_info, csv_metadata = document.metadata_to_omeka_compliant_csv(csv_header_info)
-                csv_metadata.insert(0, "text/xml")
-                csv_matadata_list.append(csv_metadata)
-            del document
+def find_reused_passages(corpora, database, text_reuse_config):
+    """
+    Aligns the passages shared by the documents of the corpora, and saves them
+    in the text_reuse table as soon as they are found.
+    :param corpora: Corpora locations where TEI files are stored
+    :param database: The CorpusSQLiteDBWriter where the passages are stored
+    :param text_reuse_config: The "text_reuse" entry of the configuration
+    """
+    from teiexplorer.corpuscomparer.text_reuse import find_text_reuse
+
+    document_files = []
+    for corpus_location in corpora.values():
+        corpus_files = glob.glob(corpus_location)
+        document_files.extend(corpus_files[:debug_size] if debug_size else corpus_files)
 
-        if omeka_csv_folder:
-            csv_file = u'%s/%s.csv' % (omeka_csv_folder, corpus_tag)
-            csv_f = open(csv_file, 'wb')
-            csv_writer = unicodecsv.writer(csv_f, encoding='utf-8')
-            csv_header_info = [tei_to_omeka_header(h) for h in csv_header_info]
-            csv_header_info.insert(0, u"dcterms:format")
-            csv_writer.writerow(csv_header_info)
-            csv_writer.writerows(csv_matadata_list)
-            csv_f.close()
+    database.reset_text_reuse()
+    find_text_reuse(
+        document_files,
+        on_passages=database.add_text_reuse_passages,
+        **text_reuse_config)
+
+
+def export_corpus_graph(database, graph_folder):
+    """
+    Exports the graph of the documents of the DB and of their attributes
+    (see metadata_graph.CorpusGraph) in graph_folder, as:
+        - corpus_graph.graphml;
+        - corpus_graph_edges.jsonl, the JSON-lines edges list;
+        - corpus_graph_nodes.csv and corpus_graph_edges.csv, for Gephi.
+    :param database: The CorpusSQLiteDBReader of the DB
+    :param graph_folder: The folder where the files are written
+    """
+    from teiexplorer.corpuscomparer.graph_export import (
+        export_gephi_csv,
+        export_graphml,
+        export_json_lines
+    )
+    from teiexplorer.corpuscomparer.metadata_graph import CorpusGraph
+
+    if not os.path.exists(graph_folder):
+        os.makedirs(graph_folder)
+
+    graph = CorpusGraph.from_database(database.db)
+    export_graphml(graph, os.path.join(graph_folder, u'corpus_graph.graphml'))
+    export_json_lines(graph, os.path.join(graph_folder, u'corpus_graph_edges.jsonl'))
+    export_gephi_csv(
+        graph,
+        os.path.join(graph_folder, u'corpus_graph_nodes.csv'),
+        os.path.join(graph_folder, u'corpus_graph_edges.csv'))
+
+
+def analyse_corpus_graph(database, graph_analytics_config):
+    """
+    Computes the connected components of the documents linked by their shared
+    attributes, the document-document and author-author projections of the
+    documents-attributes graph and their degrees, and saves them in the DB
+    (see graph_analytics and CorpusSQLiteDBWriter.add_graph_analytics).
+    :param database: The CorpusSQLiteDBWriter of the DB
+    :param graph_analytics_config: The "graph_analytics" entry of the configuration
+    """
+    import numpy as np
+    from teiexplorer.corpuscomparer import graph_analytics
+    from teiexplorer.corpuscomparer.metadata_graph import CorpusGraph
+
+    relations = graph_analytics_config.get("relations", graph_analytics.DEFAULT_RELATIONS)
+    graph = CorpusGraph.from_database(database.db)
+
+    (documents, components) = graph_analytics.document_components(graph, relations)
+    component_sizes = np.bincount(components).tolist()
+
+    (linked_documents, document_projection) = graph_analytics.document_projection(
+        graph, relations, max_attribute_degree=graph_analytics_config.get("max_attribute_degree", 1000))
+    (authors, author_projection) = graph_analytics.author_projection(graph)
+
+    def degrees():
+        for (projection_name, nodes, projection) in ((u'document', linked_documents, document_projection),
+                                                     (u'author', authors, author_projection)):
+            statistics = graph_analytics.degree_statistics(projection)
+            logging.info(u"%s projection: %i nodes, %i edges, %i isolated, degrees: mean %.2f, median %.1f, max %i"
+                         % (projection_name, statistics[u'nodes'], statistics[u'edges'], statistics[u'isolated'],
+                            statistics[u'mean_degree'], statistics[u'median_degree'], statistics[u'max_degree']))
+            for (node, degree, weighted_degree) in zip(
+                    nodes.tolist(), statistics[u'degrees'].tolist(), statistics[u'weighted_degrees'].tolist()):
+                yield (projection_name, graph.label(node), degree, weighted_degree)
+
+    database.add_graph_analytics(
+        components=(
+            (graph.label(document), component, component_sizes[component])
+            for (document, component) in zip(documents.tolist(), components.tolist())),
+        document_links=graph_analytics.iter_pairs(graph, linked_documents, document_projection),
+        coauthors=graph_analytics.iter_pairs(graph, authors, author_projection),
+        degrees=degrees())
 
 
 if __name__ == "__main__":
@@ -146,10 +228,27 @@ if __name__ == "__main__":
     • use a previously computed metadata DB metadata.db to save the transformed
       metadata information in the header of a new document:
       python3 main.py -c configs/config.json -a -d metadata.db
+    • Recompute the normalized persons and dates of a metadata DB metadata.db:
+      python3 main.py -d metadata.db --renormalize
+    • Cluster the persons of a metadata DB metadata.db which are likely to be the same author:
+      python3 main.py -d metadata.db -r
+    • Find the near-duplicate documents of the corpus and save them in a metadata DB metadata.db:
+      python3 main.py -c configs/config.json -d metadata.db --near-duplicates
+    • Align the passages shared by the documents of the corpus and save them in a metadata DB metadata.db:
+      python3 main.py -c configs/config.json -d metadata.db --text-reuse
+    • Import Dewey codes in a metadata DB metadata.db:
+      python3 main.py -d metadata.db -y path/to/dewey/corresp/file.tsv --import-dewey
+    • Export the graph of the documents and of their metadata (GraphML, JSON-lines, Gephi CSV):
+      python3 main.py -d metadata.db -g graph
+    • Compute the connected components of the documents sharing authors or series, the co-authors
+      and the documents sharing metadata, and save them in a metadata DB metadata.db:
+      python3 main.py -c configs/config.json -d metadata.db --graph-analytics
     • Save a simplified version of the metadata DB to a CSV file:
-      python3 main.py -d metadata.db [-y path/to/dewey/corresp/file.tsv] -v newCSVsimplifiedDB.csv
+      python3 main.py -d metadata.db -v newCSVsimplifiedDB.csv
     • Export all the corpus to Omeka via CSV file
       python3 main.py  -c configs/config_omeka.json -p -o omeka
+    • Parse the corpus once, and save it in a metadata DB, in Omeka CSV files and in a JSON-lines file:
+      python3 main.py -c configs/config.json -d metadata.db -p -s -o omeka -j metadata.jsonl
 
     """
     parser = OptionParser(usage)
@@ -187,37 +286,140 @@ if __name__ == "__main__":
                       help="Name of the folder in which the file where the transformed metadata information in "
                            "an Omeka-s CSVimport format should be written.")
 
+    parser.add_option("-j", "--jsonLinesFile",
+                      dest="json_lines_file",
+                      default=False,
+                      help="Name of the JSON-lines file where the metadata of each parsed document is written.")
+
+    parser.add_option("--renormalize",
+                      action="store_true",
+                      dest="renormalize",
+                      default=False,
+                      help="Recomputes the normalized persons and dates information of the whole database.")
+
+    parser.add_option("-r", "--reconcileAuthors",
+                      action="store_true",
+                      dest="reconcile_authors",
+                      default=False,
+                      help="Clusters the persons of the database which are likely to be the same author.")
+
+    parser.add_option("--near-duplicates",
+                      action="store_true",
+                      dest="near_duplicates",
+                      default=False,
+                      help="Saves the pairs of near-duplicate documents of the corpus in the database.")
+
+    parser.add_option("--text-reuse",
+                      action="store_true",
+                      dest="text_reuse",
+                      default=False,
+                      help="Saves the passages shared by documents of the corpus in the database.")
+
+    parser.add_option("-g", "--exportGraphFolder",
+                      dest="graph_folder",
+                      default=False,
+                      help="Name of the folder in which the graph of the documents and of their metadata "
+                           "is exported (GraphML, JSON-lines and Gephi CSV files).")
+
+    parser.add_option("--graph-analytics",
+                      action="store_true",
+                      dest="graph_analytics",
+                      default=False,
+                      help="Saves the connected components of the documents, the co-authors and the "
+                           "documents sharing metadata in the database.")
+
     parser.add_option("-y", "--deweyFilePath",
                       dest="dewey_filepath",
                       default=False,
                       help="Name of the Dewey/Document-ark correspondences file path.")
 
+    parser.add_option("--import-dewey",
+                      action="store_true",
+                      dest="import_dewey",
+                      default=False,
+                      help="Loads the Dewey/Document-ark correspondences file (-y) in the database.")
+
     (options, args) = parser.parse_args()
 
+    caches_config = {}
+    near_duplicates_config = {}
+    text_reuse_config = {}
+    graph_analytics_config = {}
     if options.config_file:
         with open(options.config_file) as jsonfile:
             config = json.load(jsonfile)
             debug_size = config.get("debug_size", None)
             corpora = config["corpora"]
+            caches_config = config.get("caches", {})
+            near_duplicates_config = config.get("near_duplicates", {})
+            text_reuse_config = config.get("text_reuse", {})
+            graph_analytics_config = config.get("graph_analytics", {})
+    configure_caches(caches_config.get("sizes"))
 
     # Results will be saved or read from a SQLite Database
     db_name = 'UseAndReuse_%s.sqlite' % time.strftime('%b_%d_%Y_%H:%M:%S')
     if options.database:
         db_name = options.database
+        if caches_config.get("warm_up") and os.path.exists(db_name):
+            from teiexplorer.utils.sqlite_basic import warm_up_caches
+            try:
+                warm_up_caches(database_reader(db_name).db)
+            except IOError:
+                logging.warning(u"Caches not warmed up: %s is not a metadata DB." % db_name)
 
     # -- Parse the corpus and optionally save it (in DB of Omeka CSV mass import format-- #
     if options.parse_tei:
-        db = CorpusSQLiteDBWriter(db_name) if options.save_to_database else None
-        parse_tei_documents(corpora, database=db, omeka_csv_folder=options.omeka_csv_folder)
+        parse_tei_documents(
+            corpora,
+            database_name=db_name if options.save_to_database else None,
+            omeka_csv_folder=options.omeka_csv_folder,
+            json_lines_file=options.json_lines_file)
+
+    # -- Recompute the persons and dates normalisation of the whole DB -- #
+    if options.renormalize and options.database:
+        db = database_writer(db_name)
+        db.renormalize()
+
+    # -- Reconcile the authors of the whole DB -- #
+    if options.reconcile_authors and options.database:
+        db = database_writer(db_name)
+        db.reconcile_authors()
+
+    # -- Find the near-duplicate documents of the corpus -- #
+    if options.near_duplicates and options.config_file and options.database:
+        db = database_writer(db_name)
+        find_near_duplicate_documents(corpora, db, near_duplicates_config)
+
+    # -- Align the reused passages of the corpus -- #
+    if options.text_reuse and options.config_file and options.database:
+        db = database_writer(db_name)
+        find_reused_passages(corpora, db, text_reuse_config)
+
+    # -- Load the Dewey codes in the DB -- #
+    if options.import_dewey and options.dewey_filepath and options.database:
+        db = database_writer(db_name)
+        db.import_dewey(options.dewey_filepath)
 
     # -- Modify corpus's TEI content -- #
     if options.amend_TEI and options.database:
-        db = CorpusSQLiteDBReader(db_name)
-        db.treat_document(modify_TEI=False, dewey_filepath=options.dewey_filepath)
+        db = database_reader(db_name)
+        db.treat_document(modify_TEI=False)
+
+    # -- Export the graph of the documents and of their metadata -- #
+    if options.graph_folder and options.database:
+        db = database_reader(db_name)
+        export_corpus_graph(db, options.graph_folder)
+
+    # -- Compute the analytics of the graph of the documents and of their metadata -- #
+    if options.graph_analytics and options.database:
+        db = database_writer(db_name)
+        analyse_corpus_graph(db, graph_analytics_config)
 
     # -- Export the main information of the DB in CSV format
     if options.db_csv_file and options.database:
-        db = CorpusSQLiteDBReader(db_name)
-        db.export_to_csv(options.db_csv_file, dewey_filepath=options.dewey_filepath)
+        db = database_reader(db_name)
+        db.export_to_csv(options.db_csv_file)
+
+    report_cache_statistics(caches_config.get("metrics_endpoint"))
 
     sys.exit()
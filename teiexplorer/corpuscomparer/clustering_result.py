@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+clustering_result is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+"""
+
+import numpy as np
+
+try:
+    import joblib
+except ImportError:
+    # joblib was vendored in older scikit-learn versions (and importing it
+    # from there imports the whole of scikit-learn)
+    from sklearn.externals import joblib
+
+
+class ClusteringResult(object):
+    """
+    The result of a clustering run, computed once and shared by the reporting
+    and plotting steps:
+        - the documents (filenames) and their cluster labels;
+        - the members (documents indices) of each cluster;
+        - the top terms of each cluster centroid;
+        - the 2-D layout coordinates of the documents, once computed.
+    """
+
+    def __init__(self, run_name, filenames, labels, top_terms):
+        """
+        :param run_name: The name of the run
+        :param filenames: The documents, in the order of the rows of the clustered matrix
+        :param labels: The cluster of each document
+        :param top_terms: The list of the top terms of each cluster
+        """
+        self.run_name = run_name
+        self.filenames = list(filenames)
+        self.labels = np.asarray(labels, dtype=np.int32)
+        self.top_terms = top_terms
+        self.n_clusters = len(top_terms)
+
+        order = np.argsort(self.labels, kind='mergesort')
+        boundaries = np.cumsum(np.bincount(self.labels, minlength=self.n_clusters))[:-1]
+        self.members = np.split(order, boundaries)
+
+        self.xs = self.ys = None
+        self.layout_method = None
+
+    @classmethod
+    def from_model(cls, run_name, model, filenames, feature_names, top_terms_num=6):
+        """
+        :param model: A fitted clustering model, with labels_ and cluster_centers_
+        :param feature_names: The terms of the columns of the clustered matrix
+        :param top_terms_num: The number of terms kept for each cluster
+        """
+        centers = np.asarray(model.cluster_centers_)
+        top_terms_num = min(top_terms_num, centers.shape[1])
+
+        # The top_terms_num best terms of each centroid, then sorted
+        best = np.argpartition(-centers, top_terms_num - 1, axis=1)[:, :top_terms_num]
+        best_values = np.take_along_axis(centers, best, axis=1)
+        best = np.take_along_axis(best, np.argsort(-best_values, axis=1), axis=1)
+
+        top_terms = [[feature_names[column] for column in row] for row in best]
+        return cls(run_name, filenames, model.labels_, top_terms)
+
+    def cluster_name(self, cluster_id):
+        """:return: A label of the cluster made of its top terms."""
+        return u' + '.join(self.top_terms[cluster_id])
+
+    def documents(self, cluster_id):
+        """:return: The filenames of the documents of the cluster."""
+        return [self.filenames[i] for i in self.members[cluster_id]]
+
+    def set_layout(self, xs, ys, method=None):
+        """Sets the 2-D coordinates of the documents (see CorpusComparer.multidimensional_scaling)."""
+        self.xs, self.ys = np.asarray(xs), np.asarray(ys)
+        self.layout_method = method
+
+    def save(self, path):
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path):
+        return joblib.load(path)
@@ -1,29 +1,46 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import csv
+import io
 import logging
+import os
 # from util import summ_dicts, create_dir
 import numpy as np
-import pandas as pd
+import scipy.sparse as sp
 # import nltk
 # import re
 # import os
 # import codecs
 # from sklearn import feature_extraction
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.cluster import KMeans
-from sklearn.externals import joblib
+try:
+    import joblib
+except ImportError:
+    # joblib was vendored in older scikit-learn versions (and importing it
+    # from there imports the whole of scikit-learn)
+    from sklearn.externals import joblib
 
 # import os  # for os.path.basename
-from sklearn.manifold import MDS
-# from scipy.cluster.hierarchy import ward, dendrogram
 
-import seaborn as sns
-import matplotlib.pyplot as plt
 # import matplotlib as mpl
 # import mpld3
 
+from teiexplorer.utils.tokenizer import (
+    tokenize,
+    tokenize_documents
+)
+from .clustering_result import ClusteringResult
+from .registry import DocumentRegistry
+
+# scikit-learn, matplotlib/seaborn and dataset (SQLAlchemy) take seconds to
+# import: they are imported by the methods using them, so that importing this
+# module (e.g. from the command line) stays fast.
+
+
+def _pretokenized(tokens):
+    """Identity tokenizer/preprocessor, for documents which are already lists of tokens."""
+    return tokens
+
 # TODO: clean and optimized version
 
 class CorpusComparer(object):
@@ -38,42 +55,94 @@ class CorpusComparer(object):
     #########################
     #  Data pre-processing
     #########################
-    max_file_id = 0
-    metadata = {}
-    normalized_texts_files_id = {}
-    normalized_texts = []
     MIN_FREQ_THRESHOLD = 1
+    STEMMING = False
+    MAX_FEATURES = 200000
+
+    # Streaming vectorization
+    HASHED_FEATURES_NUM = 2 ** 20
+    STREAMING_CHUNK_SIZE = 1000
 
-    # Classification
+    # Classification (defaults of the "clustering" configuration)
     K_MEAN_CLUSTERS_NUM = 5
+    CLUSTERING_MODE = 'kmeans'  # or 'minibatch'
+    CLUSTERING_CHUNK_SIZE = 1000
     CENTROID_DISPLAY_WORDS = 6
-    tfidf_matrix = []
-    tfidf_vectorizer = None
-    dist = None
-
-    clustering_result = {}
+    LAYOUT_METHOD = 'svd'  # or 'mds', 'landmark_mds', 'random_projection'
+    HIERARCHY_COMPONENTS = 100
+    HIERARCHY_NEIGHBOURS = 10
+    DENDROGRAM_DEPTH = 5
+
+    def __init__(self, config=None):
+        """
+        :param config: The configuration dict (see config.json). Its "clustering"
+                       entry may set:
+                        - n_clusters: the number of clusters
+                        - mode: 'kmeans' (full batch) or 'minibatch' (online)
+                        - chunk_size: the number of documents of each mini-batch
+                        - layout: the 2-D layout of the clusters drawing
+                          (see layout.LAYOUTS)
+                        - feature_store: if set, the directory of a feature store
+                          (see feature_store.FeatureStore) where the n-grams counts
+                          are kept between runs, so that only new texts are tokenized.
+                        - text_store: the directory where the texts are stored
+                          (see registry.DocumentRegistry), a temporary one if not set.
+                        - metadata_weight: the weight (between 0 and 1) of the metadata
+                          features of the documents, combined with their TF-IDF features
+                          if a metadata DB is set (see set_metadata_database)
+                        - metadata_features: the weights of the metadata features groups
+                          (see metadata_features.DEFAULT_WEIGHTS)
+                        - hierarchy: the options of the hierarchical clustering: the
+                          number of SVD components of the documents ("components"),
+                          the number of neighbours of each document which may be
+                          merged with it ("neighbours") and the number of levels of
+                          the dendrogram ("depth").
+        """
+        clustering_config = (config or {}).get('clustering', {})
+        self.n_clusters = clustering_config.get('n_clusters', self.K_MEAN_CLUSTERS_NUM)
+        self.clustering_mode = clustering_config.get('mode', self.CLUSTERING_MODE)
+        self.clustering_chunk_size = clustering_config.get('chunk_size', self.CLUSTERING_CHUNK_SIZE)
+        self.layout_method = clustering_config.get('layout', self.LAYOUT_METHOD)
+        self.feature_store_directory = clustering_config.get('feature_store')
+        self.metadata_weight = clustering_config.get('metadata_weight', 0.0)
+        self.metadata_feature_weights = clustering_config.get('metadata_features')
+        self.metadata_database = None
+        self._metadata_feature_names = []
+        hierarchy_config = clustering_config.get('hierarchy', {})
+        self.hierarchy_components = hierarchy_config.get('components', self.HIERARCHY_COMPONENTS)
+        self.hierarchy_neighbours = hierarchy_config.get('neighbours', self.HIERARCHY_NEIGHBOURS)
+        self.dendrogram_depth = hierarchy_config.get('depth', self.DENDROGRAM_DEPTH)
+
+        self.metadata = {}
+        # Documents ids (rows of the matrices) and texts
+        self.registry = DocumentRegistry(clustering_config.get('text_store'))
+
+        self.tfidf_matrix = []
+        self.tfidf_vectorizer = None
+        self.knn_graph = None
+        self.linkage_matrix = None
+        self.clustering_result = {}
+        # Clustering models and results, by run filename
+        self._models = {}
+        self._results = {}
+
+    def close(self):
+        """Releases the text store."""
+        self.registry.close()
 
     def add_metadata(self, filename, metadata):
         self.metadata[filename] = metadata
 
     def add_text_content(self, filename, text):
+        """Registers the text of a document. A document added again keeps its id
+        (and row in the matrices), its new text replacing the previous one."""
         if text:
-            file_index = self.normalized_texts_files_id.get(
-                filename,
-                len(self.normalized_texts))
-
-            if file_index == -1:
-                self.normalized_texts_files_id[filename] = self.max_file_id
-                self.max_file_id += 1
-                self.normalized_texts.append(text)
-            else:
-                # TODO _ Log an issue here
-                self.normalized_texts_files_id[filename] = file_index
-                self.normalized_texts.insert(file_index, text)
+            if filename in self.registry:
+                logging.warning(u"Replacing the text of document %s" % filename)
+            self.registry.add(filename, text)
 
     def _get_text_tokens(self, document):
-        # TODO - stemming or else. Chose where to normalize
-        return document
+        return tokenize(document, stem=self.STEMMING)
 
     def get_metadata_list(self):
         return self.metadata.values()
@@ -82,12 +151,12 @@ class CorpusComparer(object):
     #       Unsupervised classification. 
     # Cf. # http://brandonrose.org/clustering
     ############################################
-    def get_document_attributes(self, corresp, attr):
-        return [self.metadata[f].get(attr, 'UNKN') for (f, i) in corresp]
+    def get_document_attributes(self, filenames, attr):
+        return [self.metadata[f].get(attr, 'UNKN') for f in filenames]
 
-    def get_document_aggregated_info(self, corresp):
+    def get_document_aggregated_info(self, filenames):
         info_list = []
-        for (f, i) in corresp:
+        for f in filenames:
             info = "%s %s %s %s" % (\
                    self.metadata[f].get(u'title', 'UNKN'),
                    self.metadata[f].get(u'author', 'UNKN'),
@@ -97,185 +166,440 @@ class CorpusComparer(object):
             info_list.append(info)
         return info_list
 
-    def k_means_clustering(self, filename):
-        # define vectorizer parameters
+    def vectorize_stream(self, documents):
+        """
+        Computes the TF-IDF matrix of documents read from an iterable,
+        with hashed n-grams features (see vectorizer.StreamingTfidfVectorizer):
+        neither the texts nor the vocabulary are kept in memory.
+        :param documents: An iterable of (filename, text) pairs, e.g. a generator
+                          reading the corpus files.
+        """
+        from .vectorizer import StreamingTfidfVectorizer
+
+        logging.info("Doing streaming TF-IDF vectorization")
+
+        def texts():
+            for (filename, text) in documents:
+                self.registry.add(filename, text)
+                yield text
+
+        self.tfidf_vectorizer = StreamingTfidfVectorizer(
+            n_features=self.HASHED_FEATURES_NUM,
+            ngram_range=(1, 3),
+            min_df=0.2,
+            max_df=0.8,
+            chunk_size=self.STREAMING_CHUNK_SIZE,
+            tokenizer=self._get_text_tokens
+        )
+        self.tfidf_matrix = self.tfidf_vectorizer.fit_transform(texts())
 
-        logging.info("Doing k-mean clustering")
+    def vectorize(self, processes=None):
+        """Computes the TF-IDF matrix of the texts added with add_text_content."""
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        if self.feature_store_directory:
+            self._vectorize_with_store(processes=processes)
+            return
+
+        # Texts are tokenized beforehand, in a process pool
+        documents_tokens = tokenize_documents(
+            self.registry.texts(),
+            processes=processes,
+            stem=self.STEMMING)
 
         self.tfidf_vectorizer = TfidfVectorizer(
             max_df=0.8,
-            max_features=200000,
+            max_features=self.MAX_FEATURES,
             min_df=0.2,
-            tokenizer=self._get_text_tokens,
+            tokenizer=_pretokenized,
+            preprocessor=_pretokenized,
+            token_pattern=None,
             ngram_range=(1, 3),
             lowercase = False
         )
 
         # fit the vectorizer to the whole corpus
-        self.tfidf_matrix = self.tfidf_vectorizer.fit_transform(self.normalized_texts)
-
-        km = KMeans(n_clusters=self.K_MEAN_CLUSTERS_NUM)
-        km.fit(self.tfidf_matrix)
+        self.tfidf_matrix = self.tfidf_vectorizer.fit_transform(documents_tokens)
+
+    def _vectorize_with_store(self, processes=None):
+        """Computes the TF-IDF matrix of the texts added with add_text_content
+        from the counts of the feature store, where only the new (or modified)
+        texts are tokenized and counted."""
+        from .feature_store import FeatureStore
+
+        store = FeatureStore(self.feature_store_directory, ngram_range=(1, 3), stem=self.STEMMING,
+                             max_features=self.MAX_FEATURES)
+        if store.add_documents(self.registry.items(), processes=processes):
+            store.save()
+
+        self.tfidf_vectorizer = store
+        self.tfidf_matrix = store.tfidf(self.registry.filenames, min_df=0.2, max_df=0.8)
+
+    def _load_model(self, filename):
+        """The clustering model of the run filename, loaded once from data/results/."""
+        if filename not in self._models:
+            self._models[filename] = joblib.load('data/results/%s_cluster.pkl' % filename)
+        return self._models[filename]
+
+    def _save_model(self, filename, km):
+        """Saves the clustering model of the run filename, and its ClusteringResult."""
         joblib.dump(km, 'data/results/%s_cluster.pkl' % filename)
-        logging.info("K-mean clustering model pickled in data/results/%s_cluster.pkl" %filename)
-
-    def multidimensional_scaling(self):
-
-        logging.info("Doing MDS")
-
-        # Multidimensional scaling
-        MDS()
+        self._models[filename] = km
+        logging.info("K-mean clustering model pickled in data/results/%s_cluster.pkl" % filename)
+
+        result = ClusteringResult.from_model(
+            filename,
+            km,
+            self.registry.filenames,
+            self._get_feature_names(),
+            top_terms_num=self.CENTROID_DISPLAY_WORDS)
+        self._save_result(result)
+
+    def _save_result(self, result):
+        result.save('data/results/%s_result.pkl' % result.run_name)
+        self._results[result.run_name] = result
+
+    def _get_feature_names(self):
+        try:
+            feature_names = self.tfidf_vectorizer.get_feature_names_out()
+        except AttributeError:
+            # scikit-learn < 1.0
+            feature_names = self.tfidf_vectorizer.get_feature_names()
+        if self._metadata_feature_names:
+            feature_names = list(feature_names) + self._metadata_feature_names
+        return feature_names
+
+    def get_clustering_result(self, filename):
+        """The ClusteringResult of the run filename, loaded once from data/results/
+        (or computed from its model if it was not saved)."""
+        if filename not in self._results:
+            path = 'data/results/%s_result.pkl' % filename
+            if os.path.exists(path):
+                self._results[filename] = ClusteringResult.load(path)
+            else:
+                self._save_model(filename, self._load_model(filename))
+        return self._results[filename]
+
+    def set_metadata_database(self, db_name):
+        """
+        Sets the metadata DB (see utils.sqlite_basic) whose metadata features
+        (authors, dates, Dewey codes, corpus tags) are combined with the TF-IDF
+        features of the documents, with the metadata_weight of the configuration.
+        Documents are matched by their filename (the _file of the DB).
+        """
+        self.metadata_database = db_name
+
+    def _with_metadata_features(self, matrix, filenames, new_documents=False):
+        """Combines a TF-IDF matrix whose rows are the documents filenames with
+        their metadata features, if a metadata DB is set.
+        :param new_documents: If True, the documents are described with the
+                              metadata features of the previous documents."""
+        if not (self.metadata_database and self.metadata_weight):
+            self._metadata_feature_names = []
+            return matrix
+
+        import dataset
+        from .metadata_features import build_metadata_features, combine_features
+
+        metadata_matrix, _, feature_names = build_metadata_features(
+            dataset.connect(u'sqlite:///%s' % self.metadata_database),
+            document_ids=filenames,
+            weights=self.metadata_feature_weights,
+            feature_names=self._metadata_feature_names if new_documents else None)
+        self._metadata_feature_names = feature_names
+        return combine_features([
+            (matrix, 1.0 - self.metadata_weight),
+            (metadata_matrix, self.metadata_weight)])
+
+    def _vectorize(self, processes=None, documents=None):
+        if documents is None:
+            self.vectorize(processes=processes)
+        else:
+            self.vectorize_stream(documents)
+        self.tfidf_matrix = self._with_metadata_features(self.tfidf_matrix, self.registry.filenames)
+
+    def k_means_clustering(self, filename, processes=None, documents=None):
+        """
+        :param filename: The name of the run, used for the results files
+        :param processes: The number of processes used for tokenization
+        :param documents: If set, an iterable of (filename, text) pairs which is
+                          vectorized in streaming mode (see vectorize_stream)
+                          instead of the texts added with add_text_content.
+        """
+
+        from sklearn.cluster import KMeans
 
-        # convert two components as we're plotting points in a two-dimensional plane
-        # "precomputed" because we provide a distance matrix
-        # we will also specify `random_state` so the plot is reproducible.
-        self.dist = 1 - cosine_similarity(self.tfidf_matrix)
-        mds = MDS(n_components=2, dissimilarity="precomputed", random_state=1)
-        pos = mds.fit_transform(self.dist)  # shape (n_components, n_samples)
+        logging.info("Doing k-mean clustering")
 
-        xs, ys = pos[:, 0], pos[:, 1]
+        self._vectorize(processes=processes, documents=documents)
+
+        if self.clustering_mode == 'minibatch':
+            km = self._online_k_means()
+        else:
+            km = KMeans(n_clusters=self.n_clusters)
+            km.fit(self.tfidf_matrix)
+        self._save_model(filename, km)
+
+    def select_clusters_number(self, filename, k_values=range(2, 11), processes=None,
+                               documents=None, sample_size=2000):
+        """
+        Fits k-means models for each number of clusters of k_values in a process
+        pool (see model_selection.select_n_clusters), and keeps the one with the
+        best silhouette score as the model of the run filename.
+        The scores are written in data/results/<filename>_k_selection.csv.
+        :param filename: The name of the run, used for the results files
+        :param k_values: The numbers of clusters to evaluate
+        :param processes: The number of processes used for tokenization and model fitting
+        :param documents: If set, an iterable of (filename, text) pairs which is
+                          vectorized in streaming mode (see vectorize_stream)
+        :param sample_size: The number of documents sampled for the silhouette scores
+        :return: The selected number of clusters
+        """
+        from .model_selection import select_n_clusters
+
+        logging.info("Selecting the number of clusters among %s" % list(k_values))
+
+        self._vectorize(processes=processes, documents=documents)
+
+        scores, km = select_n_clusters(
+            self.tfidf_matrix, k_values, processes=processes, sample_size=sample_size)
+
+        with io.open('data/results/%s_k_selection.csv' % filename, 'w', newline='') as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=['k', 'inertia', 'silhouette'])
+            writer.writeheader()
+            writer.writerows(scores)
+        logging.info("Clusters number selection scores saved in data/results/%s_k_selection.csv" % filename)
+
+        self.n_clusters = km.n_clusters
+        self._save_model(filename, km)
+        return self.n_clusters
+
+    def _iter_matrix_chunks(self, matrix):
+        for start in range(0, matrix.shape[0], self.clustering_chunk_size):
+            yield matrix[start:start + self.clustering_chunk_size]
+
+    def _online_k_means(self):
+        """Fits a MiniBatchKMeans model chunk by chunk (partial_fit) on the
+        TF-IDF matrix, then labels all the documents."""
+        from sklearn.cluster import MiniBatchKMeans
+
+        logging.info("Doing online k-mean clustering by chunks of %i documents" % self.clustering_chunk_size)
+
+        km = MiniBatchKMeans(
+            n_clusters=self.n_clusters,
+            batch_size=self.clustering_chunk_size,
+            random_state=1)
+        for chunk in self._iter_matrix_chunks(self.tfidf_matrix):
+            km.partial_fit(chunk)
+        km.labels_ = np.concatenate(
+            [km.predict(chunk) for chunk in self._iter_matrix_chunks(self.tfidf_matrix)])
+        return km
+
+    def assign_clusters(self, filename, documents, update=True):
+        """
+        Vectorizes new documents with the fitted vectorizer and assigns them to
+        the existing clusters of the run filename, without refitting the model.
+        Documents which are already registered keep their id: their row of the
+        TF-IDF matrix and their label are replaced.
+        :param filename: The name of the run whose model is used
+        :param documents: An iterable of (filename, text) pairs
+        :param update: If True and the model is a MiniBatchKMeans, the clusters
+                       centers are updated with the new documents (partial_fit).
+        :return: A dict {document filename: cluster id}
+        """
+        from sklearn.cluster import MiniBatchKMeans
+        from .feature_store import FeatureStore
+        from .vectorizer import StreamingTfidfVectorizer
+
+        documents = list(documents)
+        texts = [text for (_, text) in documents]
+        if isinstance(self.tfidf_vectorizer, (StreamingTfidfVectorizer, FeatureStore)):
+            new_matrix = self.tfidf_vectorizer.transform(texts)
+        else:
+            new_matrix = self.tfidf_vectorizer.transform(
+                tokenize_documents(texts, processes=1, stem=self.STEMMING))
+        new_matrix = self._with_metadata_features(
+            new_matrix, [document_filename for (document_filename, _) in documents], new_documents=True)
+
+        km = self._load_model(filename)
+        # partial_fit replaces the labels of the corpus by those of its batch
+        labels = km.labels_
+        if update and isinstance(km, MiniBatchKMeans):
+            km.partial_fit(new_matrix)
+        clusters = km.predict(new_matrix)
+
+        # The rows of the matrix (and the labels) follow the documents ids:
+        # new documents are appended, registered ones are replaced by their
+        # last occurrence in documents.
+        previous_num = self.tfidf_matrix.shape[0]
+        document_ids = [self.registry.add(document_filename, text) for (document_filename, text) in documents]
+        rows = np.arange(len(self.registry))
+        for (position, document_id) in enumerate(document_ids):
+            rows[document_id] = previous_num + position
+        self.tfidf_matrix = sp.vstack([self.tfidf_matrix, new_matrix], format='csr')[rows]
+        km.labels_ = np.concatenate([labels, clusters])[rows]
+        self._save_model(filename, km)
+
+        return {
+            document_filename: int(cluster)
+            for ((document_filename, _), cluster) in zip(documents, clusters)
+        }
 
-        return xs, ys
+    def nearest_neighbours(self, k=10, filename=None):
+        """
+        Computes the k most similar documents of each document, by blocks of
+        sparse products (see similarity.top_k_similarities), without the dense
+        documents x documents similarity matrix.
+        :param k: The number of neighbours of each document
+        :param filename: If set, the graph is saved in data/results/<filename>_knn.npz
+        :return: A sparse (documents x documents) matrix of the cosine similarities
+                 of each document (row) with its k nearest neighbours (columns).
+                 Rows and columns follow the documents ids of the registry.
+        """
+        from .similarity import top_k_similarities
+
+        logging.info("Computing the %i nearest neighbours of each document" % k)
+
+        self.knn_graph = top_k_similarities(self.tfidf_matrix, k=k)
+        if filename:
+            sp.save_npz('data/results/%s_knn.npz' % filename, self.knn_graph)
+            logging.info("Nearest neighbours graph saved in data/results/%s_knn.npz" % filename)
+        return self.knn_graph
+
+    def near_duplicates(self, threshold=0.8, shingle_size=5, num_perm=128, processes=None):
+        """
+        Finds the pairs of near-duplicate texts (added with add_text_content)
+        with MinHash signatures of their word shingles and a banded LSH index
+        (see near_duplicates.find_near_duplicates): texts are not compared pairwise.
+        :param threshold: The minimal estimated Jaccard similarity of the shingle sets
+        :param shingle_size: The number of words of each shingle
+        :param num_perm: The length of the MinHash signatures
+        :param processes: The number of processes used for tokenization
+        :return: The list of (filename, other filename, estimated Jaccard similarity)
+        """
+        from .near_duplicates import find_near_duplicates
+
+        logging.info("Finding near-duplicate documents")
+
+        documents_tokens = tokenize_documents(self.registry.texts(), processes=processes)
+        return find_near_duplicates(
+            zip(self.registry.filenames, documents_tokens),
+            threshold=threshold,
+            num_perm=num_perm,
+            shingle_size=shingle_size)
+
+    def text_reuse(self, on_passages=None, processes=None, **alignment_options):
+        """
+        Aligns the passages shared by the texts added with add_text_content
+        (see text_reuse.find_text_reuse for the alignment options).
+        :param on_passages: A function called with the passages rows of each text,
+                            e.g. CorpusSQLiteDBWriter.add_text_reuse_passages
+        :param processes: The number of processes aligning the candidate pairs
+        :return: The list of the passages rows, whose offsets are character
+                 offsets in the texts
+        """
+        from .text_reuse import find_text_reuse
+
+        logging.info("Aligning reused passages")
+
+        passages = []
+
+        def save_passages(rows):
+            passages.extend(rows)
+            if on_passages:
+                on_passages(rows)
+
+        find_text_reuse(
+            self.registry.filenames,
+            load_text=self.registry.get_text,
+            on_passages=save_passages,
+            processes=processes,
+            **alignment_options)
+        return passages
+
+    def multidimensional_scaling(self, method=None):
+        """
+        2-D layout of the documents, computed on the sparse TF-IDF matrix.
+        'mds' (the exact metric MDS on the dense distance matrix) is O(n²) in
+        memory and O(n³) in time: use 'svd', 'landmark_mds' or
+        'random_projection' for corpora of more than a few thousand documents.
+        :param method: The layout method (see layout.LAYOUTS), defaults to
+                       the "clustering"/"layout" configuration.
+        :return: The x and y coordinates of the documents
+        """
+        from .layout import compute_layout
+
+        method = method or self.layout_method
+        logging.info("Computing the 2-D layout of the documents (%s)" % method)
+
+        return compute_layout(self.tfidf_matrix, method)
 
     def document_clusters(self, filename):
         logging.info("Organising clusters info")
 
-        km = joblib.load('data/results/%s_cluster.pkl' % filename)
-        clusters = km.labels_.tolist()
-        sorted_files_id_corresp = sorted(
-            self.normalized_texts_files_id.items(), key=lambda x: x[1]
-        )
-
-        documents = {
-            'title': self.get_document_attributes(sorted_files_id_corresp, u'title'),
-            'file': [f for (f, i) in sorted_files_id_corresp],
-            'label': self.get_document_attributes(sorted_files_id_corresp, u'LOCAL_corpus_tag'),
-            'cluster': clusters,
-            'author': self.get_document_attributes(sorted_files_id_corresp, u'author'),
-            'year':  self.get_document_attributes(sorted_files_id_corresp, u'date'),
-
-        }
-
-        frame = pd.DataFrame(
-            documents,
-            index=[clusters],
-            columns=['file', 'title', 'label', 'author', 'year', 'cluster']
-        )
-
-        terms = self.tfidf_vectorizer.get_feature_names()
-
-        # sort cluster centers by proximity to centroid
-        order_centroids = km.cluster_centers_.argsort()[:, ::-1]
+        result = self.get_clustering_result(filename)
 
-        for cluster_id in range(self.K_MEAN_CLUSTERS_NUM):
-            logging.debug("\n\n--- Cluster %d --- " % cluster_id)
-            cluster_name = ''
-            terms_index = order_centroids[cluster_id, :self.CENTROID_DISPLAY_WORDS]
-            for ind in terms_index:
-                cluster_name = "%s + %s" % (cluster_name, terms[ind])
-            logging.debug(cluster_name)
-
-            cluster_name = "%i %s" %(cluster_id, cluster_name)
+        for cluster_id in range(result.n_clusters):
+            cluster_name = "%i %s" % (cluster_id, result.cluster_name(cluster_id))
+            logging.debug("\n\n--- Cluster %s --- " % cluster_name)
             logging.debug("\n--- Documents of cluster %d ---" % cluster_id)
 
-            clusters_documents = frame.ix[cluster_id][u'file']
-            if type(clusters_documents) is str:
-                logging.debug(clusters_documents)
-                self.metadata[clusters_documents][u'_clust'] = cluster_name
-                try:
-                    self.clustering_result[cluster_id].append(self.metadata[clusters_documents])
-                except KeyError:
-                    self.clustering_result[cluster_id] = [self.metadata[clusters_documents]]
-            else:
-                for document in clusters_documents.values:
-                    logging.debug(document)
-                    self.metadata[document][u'_clust'] = cluster_name
-                    try:
-                        self.clustering_result[cluster_id].append(self.metadata[document])
-                    except KeyError:
-                        self.clustering_result[cluster_id] = [self.metadata[document]]
+            for document in result.documents(cluster_id):
+                logging.debug(document)
+                self.metadata[document][u'_clust'] = cluster_name
+                self.clustering_result.setdefault(cluster_id, []).append(self.metadata[document])
 
     def draw_clusters(self, filename):
+        import matplotlib.pyplot as plt
+        import seaborn as sns
 
         logging.info("Drawing clusters")
 
-        km = joblib.load('data/results/%s_cluster.pkl' % filename)
-        clusters = km.labels_.tolist()
-        sorted_files_id_corresp = sorted(
-            self.normalized_texts_files_id.items(), key=lambda x: x[1]
-        )
-
-        documents = {
-            'file': [f for (f, i) in sorted_files_id_corresp],
-            'cluster': clusters,
-            'title2': self.get_document_aggregated_info(sorted_files_id_corresp)
-        }
-
-        frame = pd.DataFrame(
-            documents,
-            index=[clusters],
-            columns=['file', 'title2', 'cluster']
-            )
-
-        terms = self.tfidf_vectorizer.get_feature_names()
-        # total_vocab = [item for sublist in self.normalized_texts for item in sublist]
-        # vocab_frame = pd.DataFrame({'words': total_vocab})
+        result = self.get_clustering_result(filename)
+        titles = self.get_document_aggregated_info(result.filenames)
 
         logging.info("Top terms per cluster:\n")
-        # sort cluster centers by proximity to centroid
-        order_centroids = km.cluster_centers_.argsort()[:, ::-1] 
-
-        cluster_names = {}
-
-        for cluster_id in range(self.K_MEAN_CLUSTERS_NUM):
+        for cluster_id in range(result.n_clusters):
             logging.info("\n\n--- Cluster %d --- " % cluster_id)
-            cluster_name = ''
-            terms_index = order_centroids[cluster_id, :self.CENTROID_DISPLAY_WORDS]
-            for ind in terms_index:
-                cluster_name = "%s + %s" % (cluster_name, terms[ind])
-            
-            cluster_names[cluster_id] = cluster_name
-            logging.info(cluster_name)
+            logging.info(result.cluster_name(cluster_id))
             logging.info("\n--- Documents of cluster %d ---" % cluster_id)
-            for document in frame.ix[cluster_id].values.tolist():
-                logging.info(document)
+            for i in result.members[cluster_id]:
+                logging.info([result.filenames[i], titles[i], cluster_id])
 
         # Visualisation
-        palette = sns.color_palette("colorblind", self.K_MEAN_CLUSTERS_NUM)
+        palette = sns.color_palette("colorblind", result.n_clusters)
         cluster_colors = {k: v for k, v in enumerate(palette)}
 
-        xs, ys = self.multidimensional_scaling()
-
-        # create data frame that has the result of the MDS plus the cluster numbers and titles
-        df = pd.DataFrame(dict(x=xs, y=ys, label=clusters, title=documents["title2"]))
-
-        # group by cluster
-        groups = df.groupby('label')
+        if result.xs is None or result.layout_method != self.layout_method:
+            xs, ys = self.multidimensional_scaling()
+            result.set_layout(xs, ys, self.layout_method)
+            self._save_result(result)
 
         # set up plot
         fig, ax = plt.subplots(figsize=(17, 9)) # set size
         ax.margins(0.5) # Optional, just adds 5% padding to the autoscaling
 
-        # iterate through groups to layer the plot
+        # iterate through clusters to layer the plot
         # note that I use the cluster_name and cluster_color dicts
         # with the 'name' lookup to return the appropriate color/label
-        for name, group in groups:
-            ax.plot(group.x, group.y, marker='o', linestyle='', ms=12,
-                    label=cluster_names[name], color=cluster_colors[name],
+        for cluster_id in range(result.n_clusters):
+            members = result.members[cluster_id]
+            ax.plot(result.xs[members], result.ys[members], marker='o', linestyle='', ms=12,
+                    label=result.cluster_name(cluster_id), color=cluster_colors[cluster_id],
                     mec='none')
             ax.set_aspect('auto')
             ax.tick_params(
                 axis='x',          # changes apply to the x-axis
                 which='both',      # both major and minor ticks are affected
-                bottom='off',      # ticks along the bottom edge are off
-                top='off',         # ticks along the top edge are off
-                labelbottom='off')
+                bottom=False,      # ticks along the bottom edge are off
+                top=False,         # ticks along the top edge are off
+                labelbottom=False)
             ax.tick_params(
                 axis='y',         # changes apply to the y-axis
                 which='both',      # both major and minor ticks are affected
-                left='off',      # ticks along the bottom edge are off
-                top='off',         # ticks along the top edge are off
-                labelleft='off')
+                left=False,      # ticks along the bottom edge are off
+                top=False,         # ticks along the top edge are off
+                labelleft=False)
 
         lgd = ax.legend(
             numpoints=1,
@@ -284,8 +608,8 @@ class CorpusComparer(object):
             ncol=1)  # show legend with only 1 point
 
         # add label in x,y position with the label as the film title
-        for i in range(len(df)):
-            ax.text(df.ix[i]['x'], df.ix[i]['y'], df.ix[i]['title'], size=8)
+        for (x, y, title) in zip(result.xs, result.ys, titles):
+            ax.text(x, y, title, size=8)
 
         plt.savefig(
             'data/results/%s_clusters.png' % filename,
@@ -297,26 +621,54 @@ class CorpusComparer(object):
 
         logging.info("K-mean clusters visualisation pickled in data/results/%s_clusters.png" % filename)
 
-        # linkage_matrix = ward(self.dist) # define the linkage_matrix using ward clustering pre-computed distances
-        #
-        # fig, ax = plt.subplots(figsize=(150, 200)) # set size
-        # ax = dendrogram(linkage_matrix, orientation="right", labels=documents["title"]);
-        #
-        # plt.tick_params(\
-        #     axis= 'x',          # changes apply to the x-axis
-        #     which='both',      # both major and minor ticks are affected
-        #     bottom='off',      # ticks along the bottom edge are off
-        #     top='off',         # ticks along the top edge are off
-        #     labelbottom='off')
-        #
-        # plt.tight_layout()  # show plot with tight layout
-        #
-        # # uncomment below to save figure
-        # plt.savefig('data/results/%s_dendogram.png' % filename, dpi=200)  # save figure as ward_clusters
-        #
-        # # import ipdb; ipdb.set_trace()
-
-    def cluster(self, run_filename):
-        self.k_means_clustering(run_filename)
+    def hierarchical_clustering(self, filename, processes=None, documents=None):
+        """
+        Ward hierarchical clustering of the documents on their SVD components,
+        merges being restricted to the nearest neighbours graph of the documents
+        (see hierarchy.ward_linkage): no dense distance matrix is built.
+        The linkage matrix is saved in data/results/<filename>_linkage.npy,
+        its rows follow the documents ids of the registry.
+        :param filename: The name of the run, used for the results files
+        :param processes: The number of processes used for tokenization
+        :param documents: If set, an iterable of (filename, text) pairs which is
+                          vectorized in streaming mode (see vectorize_stream)
+        :return: The scipy linkage matrix
+        """
+        from .hierarchy import ward_linkage
+
+        logging.info("Doing hierarchical clustering")
+
+        self._vectorize(processes=processes, documents=documents)
+        self.nearest_neighbours(k=self.hierarchy_neighbours)
+        self.linkage_matrix = ward_linkage(
+            self.tfidf_matrix,
+            knn_graph=self.knn_graph,
+            n_components=self.hierarchy_components)
+
+        np.save('data/results/%s_linkage.npy' % filename, self.linkage_matrix)
+        logging.info("Linkage matrix saved in data/results/%s_linkage.npy" % filename)
+        return self.linkage_matrix
+
+    def draw_dendrogram(self, filename, depth=None):
+        """
+        Draws the dendrogram of the last hierarchical clustering (or of the one
+        saved for filename) in data/results/<filename>_dendrogram.png.
+        :param depth: The number of levels drawn, the deeper subtrees being
+                      collapsed (defaults to the "hierarchy"/"depth" configuration)
+        """
+        from .hierarchy import draw_dendrogram
+
+        if self.linkage_matrix is None:
+            self.linkage_matrix = np.load('data/results/%s_linkage.npy' % filename)
+
+        draw_dendrogram(
+            self.linkage_matrix,
+            self.get_document_aggregated_info(self.registry.filenames),
+            'data/results/%s_dendrogram.png' % filename,
+            depth=depth or self.dendrogram_depth)
+        logging.info("Dendrogram drawn in data/results/%s_dendrogram.png" % filename)
+
+    def cluster(self, run_filename, processes=None, documents=None):
+        self.k_means_clustering(run_filename, processes=processes, documents=documents)
         self.document_clusters(run_filename)
         self.draw_clusters(run_filename)
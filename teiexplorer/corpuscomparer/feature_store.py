@@ -0,0 +1,308 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+feature_store is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+A persisted store of the n-gram counts of the documents of a corpus, so that
+clustering experiments do not re-read and re-tokenize the whole corpus:
+    - counts.npz: the (documents x n-grams) counts CSR matrix;
+    - features.json: the vocabulary (n-gram of each column), the document ids
+      (document of each row), the digests of the documents' texts and the
+      manifest, a digest of the whole corpus which versions the store.
+Adding documents only tokenizes the new (or modified) ones: rows are appended
+and new n-grams are appended as new columns. Documents missing from the added
+ones stay in the store until they are removed (remove_documents). The IDF weights are recomputed
+from the counts when the TF-IDF matrix is requested.
+The vocabulary is capped (as the max_features of sklearn's vectorizers): when
+it grows beyond max_features n-grams, the n-grams of lowest document frequency
+are pruned, with their counts. A pruned n-gram found again in new documents
+is counted from these documents only.
+"""
+
+import hashlib
+import io
+import json
+import logging
+import os
+from collections import Counter
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.preprocessing import normalize
+
+from teiexplorer.utils.tokenizer import tokenize_documents
+
+from .vectorizer import iter_chunks
+
+
+def _pretokenized(tokens):
+    """Identity tokenizer/preprocessor, for documents which are already lists of tokens."""
+    return tokens
+
+
+def text_digest(text):
+    """The SHA-1 hex digest of a (unicode) text."""
+    return hashlib.sha1((text or u'').encode('utf-8')).hexdigest()
+
+
+class FeatureStore(object):
+    """
+    The n-gram counts of the documents of a corpus, persisted in a directory.
+
+    :Example:
+    >>> store = FeatureStore(u'data/features')
+    >>> store.add_documents([(u'doc1.xml', text1), (u'doc2.xml', text2)])
+    >>> store.save()
+    >>> tfidf_matrix = store.tfidf(min_df=0.2, max_df=0.8)
+    """
+
+    COUNTS_FILE = u'counts.npz'
+    FEATURES_FILE = u'features.json'
+
+    def __init__(self, directory, ngram_range=(1, 3), stem=False, max_features=200000):
+        """
+        :param directory: The directory of the store, loaded if it exists
+        :param ngram_range: The n-grams sizes, as in sklearn
+        :param stem: If True, tokens are stemmed (see tokenizer.tokenize)
+        :param max_features: The maximal number of n-grams kept (see prune), None for no limit
+        """
+        self.directory = directory
+        self.ngram_range = tuple(ngram_range)
+        self.stem = stem
+        self.max_features = max_features
+
+        self.counts = sp.csr_matrix((0, 0), dtype=np.int32)
+        self.vocabulary = []
+        self.document_ids = []
+        self.digests = []
+        self._columns = {}
+        self._rows = {}
+        self.feature_names = None
+        self.idf_ = None
+        self._features_mask = None
+
+        self._analyzer = CountVectorizer(
+            tokenizer=_pretokenized,
+            preprocessor=_pretokenized,
+            token_pattern=None,
+            lowercase=False,
+            ngram_range=self.ngram_range
+        ).build_analyzer()
+
+        if os.path.exists(os.path.join(directory, self.FEATURES_FILE)):
+            self.load()
+
+    def __len__(self):
+        return len(self.document_ids)
+
+    def manifest(self):
+        """The digest of the corpus: of the (sorted) document ids and texts digests."""
+        manifest = hashlib.sha1()
+        for (document_id, digest) in sorted(zip(self.document_ids, self.digests)):
+            manifest.update((u'%s\t%s\n' % (document_id, digest)).encode('utf-8'))
+        return manifest.hexdigest()
+
+    def load(self):
+        with io.open(os.path.join(self.directory, self.FEATURES_FILE), encoding='utf-8') as features_file:
+            features = json.load(features_file)
+        if tuple(features[u'ngram_range']) != self.ngram_range or features[u'stem'] != self.stem:
+            raise ValueError("The feature store %s was built with other n-grams options" % self.directory)
+
+        self.counts = sp.load_npz(os.path.join(self.directory, self.COUNTS_FILE)).tocsr()
+        self.vocabulary = features[u'vocabulary']
+        self.document_ids = features[u'document_ids']
+        self.digests = features[u'digests']
+        self._columns = {ngram: column for (column, ngram) in enumerate(self.vocabulary)}
+        self._rows = {document_id: row for (row, document_id) in enumerate(self.document_ids)}
+
+        if features[u'manifest'] != self.manifest():
+            raise ValueError("The feature store %s is corrupted (manifest mismatch)" % self.directory)
+        logging.info(u"Feature store %s loaded: %i documents, %i features"
+                     % (self.directory, len(self.document_ids), len(self.vocabulary)))
+
+    def save(self):
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+        sp.save_npz(os.path.join(self.directory, self.COUNTS_FILE), self.counts)
+        features = {
+            u'manifest': self.manifest(),
+            u'ngram_range': list(self.ngram_range),
+            u'stem': self.stem,
+            u'vocabulary': self.vocabulary,
+            u'document_ids': self.document_ids,
+            u'digests': self.digests,
+        }
+        with io.open(os.path.join(self.directory, self.FEATURES_FILE), 'w', encoding='utf-8') as features_file:
+            features_file.write(u'%s' % json.dumps(features, ensure_ascii=False))
+        logging.info(u"Feature store %s saved (manifest %s)" % (self.directory, features[u'manifest']))
+
+    def _count(self, texts, processes=None, grow=True):
+        """
+        :param texts: A list of texts
+        :param grow: If True, unknown n-grams are added to the vocabulary,
+                     otherwise they are ignored.
+        :return: The CSR counts matrix of the texts
+        """
+        indices, indptr, values = [], [0], []
+        for tokens in tokenize_documents(texts, processes=processes, stem=self.stem):
+            ngram_counts = Counter()
+            for ngram in self._analyzer(tokens):
+                column = self._columns.get(ngram)
+                if column is None:
+                    if not grow:
+                        continue
+                    column = self._columns[ngram] = len(self.vocabulary)
+                    self.vocabulary.append(ngram)
+                ngram_counts[column] += 1
+            indices.extend(ngram_counts.keys())
+            values.extend(ngram_counts.values())
+            indptr.append(len(indices))
+        return sp.csr_matrix(
+            (np.array(values, dtype=np.int32), np.array(indices, dtype=np.int64), np.array(indptr, dtype=np.int64)),
+            shape=(len(texts), len(self.vocabulary)))
+
+    def _changed_documents(self, documents):
+        """Yields the (document id, text, digest) of the documents which are
+        new, or whose text changed."""
+        for (document_id, text) in documents:
+            digest = text_digest(text)
+            row = self._rows.get(document_id)
+            if row is None or self.digests[row] != digest:
+                yield (document_id, text, digest)
+
+    def _keep_rows(self, rows):
+        """Keeps the rows (documents) of the store whose index is in rows, in this order."""
+        self.counts = self.counts[rows]
+        self.document_ids = [self.document_ids[row] for row in rows]
+        self.digests = [self.digests[row] for row in rows]
+        self._rows = {document_id: row for (row, document_id) in enumerate(self.document_ids)}
+
+    def add_documents(self, documents, processes=None, chunk_size=1000):
+        """
+        Adds the counts of new documents, and updates those of the documents
+        whose text changed. The other documents are not tokenized again.
+        Documents are read, tokenized and counted chunk by chunk: only the
+        texts of a chunk are held in memory.
+        The documents of the store which are not in documents are kept
+        (see remove_documents).
+        :param documents: An iterable of (document id, text) pairs
+        :param processes: The number of processes used for tokenization
+        :param chunk_size: The number of documents tokenized at once
+        :return: The number of added or updated documents
+        """
+        added_ids, added_digests, added_counts = [], [], []
+        for chunk in iter_chunks(self._changed_documents(documents), chunk_size):
+            added_counts.append(self._count([text for (_, text, _) in chunk], processes=processes))
+            added_ids.extend(document_id for (document_id, _, _) in chunk)
+            added_digests.extend(digest for (_, _, digest) in chunk)
+        if not added_ids:
+            return 0
+
+        # Modified documents are removed, then appended as new ones
+        modified = set(document_id for document_id in added_ids if document_id in self._rows)
+        if modified:
+            self._keep_rows([row for (row, document_id) in enumerate(self.document_ids)
+                             if document_id not in modified])
+
+        # Counts of the previous chunks have fewer columns than the vocabulary
+        self.counts = sp.vstack([
+            sp.csr_matrix((counts.data, counts.indices, counts.indptr),
+                          shape=(counts.shape[0], len(self.vocabulary)))
+            for counts in [self.counts] + added_counts], format='csr')
+        self.document_ids.extend(added_ids)
+        self.digests.extend(added_digests)
+        self._rows = {document_id: row for (row, document_id) in enumerate(self.document_ids)}
+        self.prune(self.max_features)
+
+        logging.info(u"%i documents added to the feature store (%i updated), %i documents and %i features"
+                     % (len(added_ids), len(modified), len(self.document_ids), len(self.vocabulary)))
+        return len(added_ids)
+
+    def remove_documents(self, document_ids):
+        """
+        Removes documents from the store (e.g. those which are no longer in
+        the corpus), with the n-grams which only appeared in them.
+        :param document_ids: An iterable of document ids (unknown ids are ignored)
+        :return: The number of removed documents
+        """
+        removed = set(document_ids) & set(self._rows)
+        if not removed:
+            return 0
+        self._keep_rows([row for (row, document_id) in enumerate(self.document_ids)
+                         if document_id not in removed])
+        self.prune()
+        logging.info(u"%i documents removed from the feature store" % len(removed))
+        return len(removed)
+
+    def prune(self, max_features=None):
+        """
+        Removes the n-grams which no longer appear in any document (those of
+        the previous texts of updated documents) and, if more than max_features
+        remain, those of lowest document frequency (then of lowest count).
+        :return: The number of removed n-grams
+        """
+        features_num = len(self.vocabulary)
+        document_frequencies = np.bincount(self.counts.indices, minlength=features_num)
+        columns = np.flatnonzero(document_frequencies)
+        if max_features is not None and len(columns) > max_features:
+            totals = np.bincount(self.counts.indices, weights=self.counts.data, minlength=features_num)
+            columns = np.sort(np.lexsort((-totals, -document_frequencies))[:max_features])
+        if len(columns) == features_num:
+            return 0
+
+        self.counts = self.counts[:, columns].tocsr()
+        self.vocabulary = [self.vocabulary[column] for column in columns.tolist()]
+        self._columns = {ngram: column for (column, ngram) in enumerate(self.vocabulary)}
+        # The TF-IDF weights refer to the previous columns
+        self.feature_names = self.idf_ = self._features_mask = None
+        logging.info(u"%i n-grams pruned from the feature store" % (features_num - len(columns)))
+        return features_num - len(columns)
+
+    def tfidf(self, document_ids=None, min_df=1, max_df=1.0):
+        """
+        The TF-IDF matrix of documents of the store, with smoothed IDF weights
+        (as in sklearn's TfidfVectorizer) computed from the counts of these documents.
+
+        :param document_ids: The ids of the documents (rows) of the matrix,
+                             in this order (default: all the documents of the store)
+        :param min_df: N-grams appearing in less documents are ignored
+                       (a proportion of the documents if it is a float)
+        :param max_df: N-grams appearing in more documents are ignored
+                       (a proportion of the documents if it is a float)
+        :return: A (documents x kept n-grams) L2-normalised CSR matrix.
+                 The n-grams of its columns are in feature_names.
+        """
+        if document_ids is None:
+            counts = self.counts
+        else:
+            counts = self.counts[[self._rows[document_id] for document_id in document_ids]]
+        n = counts.shape[0]
+        min_df = min_df * n if isinstance(min_df, float) else min_df
+        max_df = max_df * n if isinstance(max_df, float) else max_df
+
+        document_frequencies = np.bincount(counts.indices, minlength=counts.shape[1])
+        self._features_mask = (document_frequencies >= min_df) & (document_frequencies <= max_df)
+        columns = np.flatnonzero(self._features_mask)
+        self.feature_names = np.array(self.vocabulary, dtype=object)[columns]
+        self.idf_ = np.log((1.0 + n) / (1.0 + document_frequencies[columns])) + 1.0
+
+        tfidf = counts[:, columns].multiply(self.idf_).tocsr()
+        return normalize(tfidf, norm='l2', copy=False)
+
+    def transform(self, texts, processes=None):
+        """TF-IDF matrix of new texts, with the n-grams and IDF weights of the
+        last tfidf call. The texts are not added to the store."""
+        if self.idf_ is None:
+            raise ValueError("The TF-IDF weights must be computed (tfidf) before transforming texts.")
+        counts = self._count(list(texts), processes=processes, grow=False)
+        counts = sp.csr_matrix((counts.data, counts.indices, counts.indptr),
+                               shape=(counts.shape[0], len(self._features_mask)))
+        tfidf = counts[:, np.flatnonzero(self._features_mask)].multiply(self.idf_).tocsr()
+        return normalize(tfidf, norm='l2', copy=False)
+
+    def get_feature_names_out(self):
+        return self.feature_names
+
+    get_feature_names = get_feature_names_out
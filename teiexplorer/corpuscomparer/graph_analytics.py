@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+graph_analytics is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+Analytics of the documents-attributes graph of a corpus (see metadata_graph):
+    - the connected components of the documents, linked by their shared
+      attributes (authors and series by default), with an array-based
+      union-find;
+    - the document-document projection (B.Bᵀ, B being the documents x
+      attributes biadjacency matrix): the number of attributes shared by
+      each pair of documents;
+    - the author-author projection (Bᵀ.B, B being the documents x authors
+      biadjacency matrix): the number of documents shared by each pair of
+      authors, i.e. co-authorships;
+    - the degree statistics of the projections.
+"""
+
+import logging
+from array import array
+
+import numpy as np
+import scipy.sparse as sp
+
+from .metadata_graph import DOCUMENT, NODE_TYPES
+
+DEFAULT_RELATIONS = (u'author', u'series')
+
+
+def union_find(n, sources, targets):
+    """
+    Connected components of a graph, with a union-find on arrays (union by
+    size and path halving).
+    :param n: The number of nodes
+    :param sources: The first nodes of the edges
+    :param targets: The second nodes of the edges
+    :return: The component of each node (an int array, components being
+             numbered from 0 by their smallest node)
+    """
+    parent = array('i', range(n))
+    size = array('i', [1]) * n
+
+    def find(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for (source, target) in zip(np.asarray(sources).tolist(), np.asarray(targets).tolist()):
+        (source, target) = (find(source), find(target))
+        if source == target:
+            continue
+        if size[source] < size[target]:
+            (source, target) = (target, source)
+        parent[target] = source
+        size[source] += size[target]
+
+    roots = np.array([find(node) for node in range(n)], dtype=np.int64)
+    (_, first_nodes, components) = np.unique(roots, return_index=True, return_inverse=True)
+    # Components numbered by their smallest node
+    return np.argsort(np.argsort(first_nodes)).astype(np.int32)[components]
+
+
+def _relation_edges(graph, relations):
+    """The (document, attribute) edges of the graph whose attribute has a type of relations."""
+    nodes = np.repeat(np.arange(len(graph), dtype=np.int32), graph.degrees())
+    documents = graph.node_types[nodes] == DOCUMENT
+    relation_types = [NODE_TYPES.index(relation) for relation in relations]
+    selected = documents & np.isin(graph.node_types[graph.indices], relation_types)
+    return nodes[selected], graph.indices[selected]
+
+
+def document_components(graph, relations=DEFAULT_RELATIONS):
+    """
+    :param graph: A CorpusGraph
+    :param relations: The types of the attributes linking the documents
+    :return: (the ids of the document nodes, the component of each document)
+    """
+    (sources, targets) = _relation_edges(graph, relations)
+    components = union_find(len(graph), sources, targets)
+
+    documents = graph.nodes(u'document')
+    (_, labels) = np.unique(components[documents], return_inverse=True)
+    logging.info(u"%i documents in %i components (linked by %s)"
+                 % (len(documents), len(np.unique(labels)), u', '.join(relations)))
+    return documents, labels.astype(np.int32)
+
+
+def biadjacency(graph, relations, max_attribute_degree=None):
+    """
+    :param graph: A CorpusGraph
+    :param relations: The types of the attributes (columns)
+    :param max_attribute_degree: If set, attributes of more documents are ignored
+    :return: (the ids of the document nodes, the ids of the attribute nodes,
+              the (documents x attributes) CSR biadjacency matrix)
+    """
+    documents = graph.nodes(u'document')
+    attributes = np.flatnonzero(np.isin(graph.node_types, [NODE_TYPES.index(relation) for relation in relations]))
+    if max_attribute_degree:
+        attributes = attributes[graph.degrees()[attributes] <= max_attribute_degree]
+    matrix = graph.adjacency()[documents][:, attributes].astype(np.int32)
+    return documents, attributes, matrix.tocsr()
+
+
+def _projection(matrix):
+    """The product of matrix by its transpose, without its diagonal."""
+    projection = (matrix * matrix.T).tocsr()
+    projection.setdiag(0)
+    projection.eliminate_zeros()
+    return projection
+
+
+def document_projection(graph, relations=DEFAULT_RELATIONS, max_attribute_degree=1000):
+    """
+    :param max_attribute_degree: Attributes of more documents are ignored, as
+                                 they would link all of them (the projection
+                                 of an attribute of n documents has n² entries)
+    :return: (the ids of the document nodes, the (documents x documents) CSR
+              matrix of the numbers of attributes shared by the documents)
+    """
+    (documents, _, matrix) = biadjacency(graph, relations, max_attribute_degree)
+    return documents, _projection(matrix)
+
+
+def author_projection(graph):
+    """
+    :return: (the ids of the author nodes, the (authors x authors) CSR
+              matrix of the numbers of documents shared by the authors)
+    """
+    (_, authors, matrix) = biadjacency(graph, [u'author'])
+    return authors, _projection(matrix.T.tocsr())
+
+
+def degree_statistics(projection):
+    """
+    :param projection: A symmetric (nodes x nodes) sparse matrix
+    :return: A dict of the degrees and weighted degrees of each node, and of
+             the numbers of nodes, edges and isolated nodes and of the mean,
+             median and maximal degree of the projection.
+    """
+    degrees = np.diff(projection.indptr)
+    weighted_degrees = np.asarray(projection.sum(axis=1)).ravel()
+    return {
+        u'degrees': degrees,
+        u'weighted_degrees': weighted_degrees,
+        u'nodes': len(degrees),
+        u'edges': projection.nnz // 2,
+        u'isolated': int((degrees == 0).sum()),
+        u'mean_degree': float(degrees.mean()) if len(degrees) else 0.0,
+        u'median_degree': float(np.median(degrees)) if len(degrees) else 0.0,
+        u'max_degree': int(degrees.max()) if len(degrees) else 0,
+    }
+
+
+def iter_pairs(graph, nodes, projection):
+    """Generator of the (label, other label, weight) of each pair of nodes of a projection, once."""
+    pairs = sp.triu(projection, k=1).tocoo()
+    for (row, column, weight) in zip(pairs.row.tolist(), pairs.col.tolist(), pairs.data.tolist()):
+        yield (graph.label(nodes[row]), graph.label(nodes[column]), weight)
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+graph_export is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+Streaming exports of a CorpusGraph (see metadata_graph):
+    - GraphML (e.g. for Cytoscape or yEd);
+    - a JSON-lines edges list, one edge by line;
+    - the nodes and edges CSV files of Gephi's spreadsheet import.
+Edges are read from the CSR arrays of the graph by blocks of nodes, and
+written as they are read: no other representation of the graph is built.
+"""
+
+import csv
+import io
+import json
+import logging
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+from .metadata_graph import NODE_TYPES
+
+GRAPHML_HEADER = u"""<?xml version="1.0" encoding="UTF-8"?>
+<graphml xmlns="http://graphml.graphdrawing.org/xmlns"
+         xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
+         xsi:schemaLocation="http://graphml.graphdrawing.org/xmlns http://graphml.graphdrawing.org/xmlns/1.0/graphml.xsd">
+  <key id="label" for="node" attr.name="label" attr.type="string"/>
+  <key id="type" for="node" attr.name="type" attr.type="string"/>
+  <key id="relation" for="edge" attr.name="relation" attr.type="string"/>
+  <graph id="corpus" edgedefault="undirected">
+"""
+
+GRAPHML_FOOTER = u"""  </graph>
+</graphml>
+"""
+
+
+def iter_edges(graph, block_size=65536):
+    """
+    Generator of the edges of a CorpusGraph, each (undirected) edge once.
+    :param block_size: The number of nodes whose edges are read at once
+    :return: A generator of (node, neighbour) arrays, with node < neighbour
+    """
+    degrees = graph.degrees()
+    for start in range(0, len(graph), block_size):
+        end = min(start + block_size, len(graph))
+        nodes = np.repeat(np.arange(start, end, dtype=np.int32), degrees[start:end])
+        neighbours = graph.indices[graph.indptr[start]:graph.indptr[end]]
+        upper = nodes < neighbours
+        yield nodes[upper], neighbours[upper]
+
+
+def _node_type_names(graph):
+    """The type name of each node (list lookups are faster than those of numpy arrays)."""
+    return [NODE_TYPES[node_type] for node_type in graph.node_types.tolist()]
+
+
+def _relations(graph, nodes, neighbours):
+    """The type names of the attribute nodes of (document, attribute) edges."""
+    attributes = np.where(graph.node_types[nodes] == NODE_TYPES.index(u'document'), neighbours, nodes)
+    return [NODE_TYPES[node_type] for node_type in graph.node_types[attributes].tolist()]
+
+
+def export_graphml(graph, path, block_size=65536):
+    """Writes the graph in the GraphML file path."""
+    with io.open(path, 'w', encoding='utf-8') as graphml_file:
+        graphml_file.write(GRAPHML_HEADER)
+        for (node, (label, node_type)) in enumerate(zip(graph.labels, _node_type_names(graph))):
+            graphml_file.write(
+                u'    <node id="n%i"><data key="label">%s</data><data key="type">%s</data></node>\n'
+                % (node, escape(label), node_type))
+
+        edges_num = 0
+        for (nodes, neighbours) in iter_edges(graph, block_size):
+            graphml_file.writelines(
+                u'    <edge id="e%i" source="n%i" target="n%i"><data key="relation">%s</data></edge>\n'
+                % edge
+                for edge in zip(range(edges_num, edges_num + len(nodes)), nodes.tolist(), neighbours.tolist(),
+                                _relations(graph, nodes, neighbours)))
+            edges_num += len(nodes)
+        graphml_file.write(GRAPHML_FOOTER)
+
+    logging.info(u"%i nodes and %i edges exported in %s" % (len(graph), edges_num, path))
+
+
+def export_json_lines(graph, path, block_size=65536):
+    """
+    Writes the edges of the graph in the JSON-lines file path, e.g.
+    {"source": 0, "source_label": "doc1.xml", "source_type": "document",
+     "target": 3, "target_label": "olivetpj", "target_type": "author"}
+    """
+    # The JSON strings of the labels and types are encoded once by node
+    labels = [json.dumps(label, ensure_ascii=False) for label in graph.labels]
+    node_types = [json.dumps(node_type) for node_type in _node_type_names(graph)]
+    line = (u'{"source": %i, "source_label": %s, "source_type": %s, '
+            u'"target": %i, "target_label": %s, "target_type": %s}\n')
+
+    edges_num = 0
+    with io.open(path, 'w', encoding='utf-8') as json_file:
+        for (nodes, neighbours) in iter_edges(graph, block_size):
+            json_file.writelines(
+                line % (node, labels[node], node_types[node], neighbour, labels[neighbour], node_types[neighbour])
+                for (node, neighbour) in zip(nodes.tolist(), neighbours.tolist()))
+            edges_num += len(nodes)
+
+    logging.info(u"%i edges exported in %s" % (edges_num, path))
+
+
+def export_gephi_csv(graph, nodes_path, edges_path, block_size=65536):
+    """Writes the nodes (Id, Label, Type) and the edges (Source, Target, Type,
+    Relation) of the graph in the CSV files of Gephi's spreadsheet import."""
+    with io.open(nodes_path, 'w', encoding='utf-8', newline='') as nodes_file:
+        writer = csv.writer(nodes_file)
+        writer.writerow([u'Id', u'Label', u'Type'])
+        writer.writerows(
+            (node, label, node_type)
+            for (node, (label, node_type)) in enumerate(zip(graph.labels, _node_type_names(graph))))
+
+    edges_num = 0
+    with io.open(edges_path, 'w', encoding='utf-8', newline='') as edges_file:
+        writer = csv.writer(edges_file)
+        writer.writerow([u'Source', u'Target', u'Type', u'Relation'])
+        for (nodes, neighbours) in iter_edges(graph, block_size):
+            writer.writerows(
+                (node, neighbour, u'Undirected', relation)
+                for (node, neighbour, relation)
+                in zip(nodes.tolist(), neighbours.tolist(), _relations(graph, nodes, neighbours)))
+            edges_num += len(nodes)
+
+    logging.info(u"%i nodes and %i edges exported in %s and %s"
+                 % (len(graph), edges_num, nodes_path, edges_path))
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+hierarchy is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+Ward hierarchical clustering of the documents of a (sparse) TF-IDF matrix,
+without the dense documents x documents distance matrix:
+    - the documents are first reduced to a few dense components (truncated SVD);
+    - merges are restricted to the pairs of documents linked in a sparse
+      k-nearest-neighbours graph (see similarity.top_k_similarities), so that
+      the memory of the agglomeration is linear in the number of documents.
+The result is a scipy linkage matrix, saved as a .npy file, and drawn as a
+dendrogram truncated to its top levels.
+"""
+
+import logging
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.cluster.hierarchy import dendrogram
+from sklearn.cluster import AgglomerativeClustering
+from sklearn.decomposition import TruncatedSVD
+from sklearn.preprocessing import normalize
+
+
+def reduce_dimensions(matrix, n_components=100, random_state=1):
+    """
+    :param matrix: A (documents x features) sparse matrix
+    :param n_components: The number of SVD components kept (at most
+                         the number of features - 1)
+    :return: The (documents x components) dense, L2-normalised matrix
+    """
+    n_components = min(n_components, matrix.shape[1] - 1)
+    if n_components < 1:
+        return normalize(np.asarray(sp.csr_matrix(matrix).todense(), dtype=np.float64))
+    svd = TruncatedSVD(n_components=n_components, random_state=random_state)
+    return normalize(svd.fit_transform(matrix))
+
+
+def connectivity_graph(knn_graph):
+    """The symmetric, binary connectivity matrix of a k-nearest-neighbours graph."""
+    graph = sp.csr_matrix(knn_graph, dtype=np.float64)
+    graph = graph + graph.T
+    graph.data[:] = 1.0
+    return graph
+
+
+def linkage_from_model(model):
+    """
+    :param model: A fitted AgglomerativeClustering model, with children_ and distances_
+    :return: The (documents - 1) x 4 scipy linkage matrix of the merges of the model
+    """
+    n = len(model.labels_)
+    counts = np.zeros(len(model.children_), dtype=np.float64)
+    for (i, children) in enumerate(model.children_):
+        counts[i] = sum(1 if child < n else counts[child - n] for child in children)
+    return np.column_stack([model.children_, model.distances_, counts]).astype(np.float64)
+
+
+def ward_linkage(matrix, knn_graph=None, n_components=100, random_state=1):
+    """
+    Ward hierarchical clustering of the documents.
+    :param matrix: A (documents x features) sparse matrix
+    :param knn_graph: A sparse (documents x documents) k-nearest-neighbours graph.
+                      If set, only neighbours (or clusters containing neighbours)
+                      are merged. Without it, the memory is quadratic.
+    :param n_components: The number of SVD components on which documents are compared
+    :return: The scipy linkage matrix of the documents
+    """
+    if matrix.shape[0] < 2:
+        raise ValueError("At least 2 documents are needed to build a hierarchy")
+
+    reduced = reduce_dimensions(matrix, n_components=n_components, random_state=random_state)
+    logging.info(u"Ward clustering of %i documents on %i components" % reduced.shape)
+
+    model = AgglomerativeClustering(
+        n_clusters=None,
+        distance_threshold=0,
+        linkage='ward',
+        connectivity=connectivity_graph(knn_graph) if knn_graph is not None else None,
+        compute_full_tree=True)
+    model.fit(reduced)
+    return linkage_from_model(model)
+
+
+def draw_dendrogram(linkage, labels, path, depth=5, leaf_height=0.25):
+    """
+    Draws the top levels of a hierarchy: the subtrees below depth merges from
+    the root are collapsed into a single leaf, labelled with its number of documents.
+    :param linkage: A scipy linkage matrix
+    :param labels: The labels of the documents
+    :param path: The file of the figure
+    :param depth: The number of levels drawn
+    :param leaf_height: The height of each leaf in the figure, in inches
+    """
+    # matplotlib is slow to import, and only needed to draw
+    import matplotlib.pyplot as plt
+
+    leaves = dendrogram(linkage, truncate_mode='level', p=depth, no_plot=True)[u'leaves']
+
+    fig, ax = plt.subplots(figsize=(17, max(5, leaf_height * len(leaves))))
+    dendrogram(
+        linkage,
+        truncate_mode='level',
+        p=depth,
+        orientation='right',
+        labels=list(labels),
+        leaf_font_size=8,
+        ax=ax)
+    ax.tick_params(
+        axis='x',
+        which='both',
+        bottom=False,
+        top=False,
+        labelbottom=False)
+
+    plt.tight_layout()
+    plt.savefig(path, dpi=200)
+    plt.close(fig)
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+layout is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+2-D layouts of the documents of a (sparse, L2-normalised) TF-IDF matrix,
+used to draw the clusters.
+    - mds: sklearn's metric MDS on the dense cosine distance matrix.
+      Exact but O(n²) in memory and O(n³) in time: small corpora only.
+    - svd: truncated SVD (LSA) to 2 components, directly on the sparse matrix.
+    - landmark_mds: classical MDS on a random sample of landmark documents,
+      the other documents being placed by distance-based triangulation
+      (de Silva & Tenenbaum). O(n.m) for m landmarks.
+    - random_projection: gaussian random projection to 2 components.
+
+Timings on synthetic corpora can be compared with:
+    python -m teiexplorer.corpuscomparer.layout
+"""
+
+import logging
+import time
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.decomposition import TruncatedSVD
+from sklearn.manifold import MDS
+from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
+from sklearn.random_projection import GaussianRandomProjection
+
+
+def mds_layout(matrix, random_state=1):
+    # The dense distance matrix is computed in place: a single n x n array
+    dist = cosine_similarity(matrix)
+    np.subtract(1, dist, out=dist)
+    mds = MDS(n_components=2, dissimilarity="precomputed", random_state=random_state)
+    return mds.fit_transform(dist)
+
+
+def svd_layout(matrix, random_state=1):
+    return TruncatedSVD(n_components=2, random_state=random_state).fit_transform(matrix)
+
+
+def random_projection_layout(matrix, random_state=1):
+    return GaussianRandomProjection(n_components=2, random_state=random_state).fit_transform(matrix)
+
+
+def landmark_mds_layout(matrix, random_state=1, n_landmarks=300, block_size=4096):
+    """
+    Landmark MDS: classical MDS of n_landmarks sampled documents, then
+    triangulation of all the documents from their distances to the landmarks.
+    :param matrix: A (documents x features) matrix with L2-normalised rows
+    :param n_landmarks: The number of landmark documents
+    :param block_size: The number of documents triangulated at once
+    :return: A (documents x 2) array of coordinates
+    """
+    n = matrix.shape[0]
+    rng = np.random.RandomState(random_state)
+    landmarks = matrix[np.sort(rng.choice(n, min(n_landmarks, n), replace=False))]
+    m = landmarks.shape[0]
+
+    # Classical MDS of the landmarks (squared cosine distances, double centering)
+    squared_distances = (1 - cosine_similarity(landmarks)) ** 2
+    centering = np.eye(m) - np.ones((m, m)) / m
+    eigenvalues, eigenvectors = np.linalg.eigh(-0.5 * centering.dot(squared_distances).dot(centering))
+    top = np.argsort(eigenvalues)[::-1][:2]
+    eigenvalues = np.maximum(eigenvalues[top], 1e-12)
+    pseudo_inverse = (eigenvectors[:, top] / np.sqrt(eigenvalues)).T
+
+    # Triangulation of all the documents
+    mean_squared_distances = squared_distances.mean(axis=0)
+    positions = np.empty((n, 2))
+    for start in range(0, n, block_size):
+        block = matrix[start:start + block_size]
+        block_squared_distances = (1 - cosine_similarity(block, landmarks)) ** 2
+        positions[start:start + block_size] = \
+            -0.5 * (block_squared_distances - mean_squared_distances).dot(pseudo_inverse.T)
+    return positions
+
+
+LAYOUTS = {
+    'mds': mds_layout,
+    'svd': svd_layout,
+    'landmark_mds': landmark_mds_layout,
+    'random_projection': random_projection_layout,
+}
+
+
+def compute_layout(matrix, method='svd', **options):
+    """
+    :param matrix: A (documents x features) sparse matrix, e.g. a TF-IDF matrix
+    :param method: One of LAYOUTS: 'mds', 'svd', 'landmark_mds', 'random_projection'
+    :param options: Options of the layout function (random_state, n_landmarks...)
+    :return: The x and y coordinates of the documents
+    """
+    try:
+        layout = LAYOUTS[method]
+    except KeyError:
+        raise ValueError("Unknown layout method %s (expected one of %s)"
+                         % (method, ', '.join(sorted(LAYOUTS))))
+    positions = layout(matrix, **options)
+    return positions[:, 0], positions[:, 1]
+
+
+def synthetic_corpus(documents_num, features_num, density, random_state=1):
+    """A random (documents x features) CSR matrix with L2-normalised rows,
+    with about density * features_num non-zero values per row."""
+    rng = np.random.RandomState(random_state)
+    nnz_per_row = max(1, int(density * features_num))
+    rows = np.repeat(np.arange(documents_num), nnz_per_row)
+    cols = rng.randint(0, features_num, size=rows.shape[0])
+    values = rng.random_sample(rows.shape[0])
+    matrix = sp.csr_matrix((values, (rows, cols)), shape=(documents_num, features_num))
+    return normalize(matrix)
+
+
+def benchmark_layouts(sizes=(500, 2000, 20000), features_num=50000, density=0.002,
+                      methods=None, max_mds_size=2000):
+    """
+    Times each layout method on synthetic sparse corpora.
+    :param sizes: The numbers of documents of the synthetic corpora
+    :param features_num: The number of features of the synthetic corpora
+    :param density: The proportion of non-zero features of each document
+    :param methods: The layout methods to time (default: all)
+    :param max_mds_size: 'mds' is skipped for larger corpora
+    :return: A list of (method, documents number, seconds)
+    """
+    timings = []
+    for size in sizes:
+        matrix = synthetic_corpus(size, features_num, density)
+        for method in methods or sorted(LAYOUTS):
+            if method == 'mds' and size > max_mds_size:
+                continue
+            start = time.time()
+            compute_layout(matrix, method)
+            timings.append((method, size, time.time() - start))
+            logging.info(u"Layout %s of %i documents: %.2fs" % timings[-1])
+    return timings
+
+
+if __name__ == '__main__':
+    logging.basicConfig(
+        format='%(asctime)s : %(levelname)s : %(message)s',
+        level=logging.INFO)
+    benchmark_layouts()
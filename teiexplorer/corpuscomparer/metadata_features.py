@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+metadata_features is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+Sparse metadata features of the documents of a metadata DB (see
+utils.sqlite_basic), read in a single SQL query:
+    - author: the reconciled author clusters (see utils.reconciliation),
+      or the authors' fingerprints if the authors were not reconciled;
+    - decade and century: bins of the earliest deduced date of the document;
+    - dewey and dewey_class: the Dewey code (e.g. 840) and its main class (8);
+    - corpus_tag: the corpus of the document.
+Each (group, value) pair is a column, weighted by the weight of its group,
+and rows are L2-normalised: the dot product of two rows is a cosine similarity
+of the documents' metadata, available before any body text is read.
+"""
+
+import logging
+from collections import OrderedDict
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.preprocessing import normalize
+
+DEFAULT_WEIGHTS = OrderedDict([
+    (u'author', 1.0),
+    (u'decade', 1.0),
+    (u'century', 0.5),
+    (u'dewey', 1.0),
+    (u'dewey_class', 0.5),
+    (u'corpus_tag', 0.5),
+])
+
+
+def _metadata_query(db):
+    """The UNION query of the (document_id, feature, value) rows available in db."""
+    tables = db.tables
+    selects = []
+    ctes = []
+
+    if u'person' in tables and db['person'].has_column(u'fingerprint'):
+        if u'person_cluster' in tables:
+            selects.append(
+                u"SELECT dha.document_id AS document_id, 'author' AS feature, "
+                u"COALESCE('cluster ' || pc.cluster_id, p.fingerprint) AS value "
+                u"FROM documentHasAuthor dha JOIN person p ON p.id = dha.author_id "
+                u"LEFT JOIN person_cluster pc ON pc.person_id = p.id")
+        else:
+            selects.append(
+                u"SELECT dha.document_id AS document_id, 'author' AS feature, p.fingerprint AS value "
+                u"FROM documentHasAuthor dha JOIN person p ON p.id = dha.author_id")
+
+    if u'date' in tables and db['date'].has_column(u'deduced_date'):
+        ctes.append(
+            u"document_year AS ("
+            u"SELECT dhd.document_id AS document_id, CAST(MIN(d.deduced_date) AS INTEGER) AS year "
+            u"FROM documentHasDate dhd JOIN date d ON d.id = dhd.date_id "
+            u"WHERE d.deduced_date IS NOT NULL GROUP BY dhd.document_id)")
+        selects.append(u"SELECT document_id, 'decade' AS feature, year / 10 * 10 AS value FROM document_year")
+        selects.append(u"SELECT document_id, 'century' AS feature, year / 100 * 100 AS value FROM document_year")
+
+    if u'dewey' in tables and db['document'].has_column(u'ark'):
+        selects.append(
+            u"SELECT doc._file AS document_id, 'dewey' AS feature, substr(dw.dewey, 1, 3) AS value "
+            u"FROM document doc JOIN dewey dw ON dw.ark = doc.ark")
+        selects.append(
+            u"SELECT doc._file AS document_id, 'dewey_class' AS feature, substr(dw.dewey, 1, 1) AS value "
+            u"FROM document doc JOIN dewey dw ON dw.ark = doc.ark")
+
+    selects.append(u"SELECT _file AS document_id, 'corpus_tag' AS feature, _tag AS value FROM document")
+
+    return u'%s%s' % (
+        u'WITH %s ' % u', '.join(ctes) if ctes else u'',
+        u' UNION ALL '.join(selects))
+
+
+def _normalize(matrix):
+    """L2-normalises the rows of a CSR matrix (which may have no columns)."""
+    return normalize(matrix) if matrix.shape[1] else matrix
+
+
+def build_metadata_features(db, document_ids=None, weights=None, feature_names=None):
+    """
+    :param db: A dataset connection to a metadata DB
+    :param document_ids: The documents (_file) of the rows of the matrix, in this
+                         order (default: all the documents having metadata features)
+    :param weights: A dict {feature group: weight}, see DEFAULT_WEIGHTS.
+                    Groups absent or with a null weight are ignored.
+    :param feature_names: The features of the columns of the matrix (default: all
+                          the features found), e.g. to build the features of new
+                          documents in the same space as the previous ones.
+    :return: (the (documents x features) L2-normalised CSR matrix, the document ids
+             of its rows, the feature names "group=value" of its columns)
+    """
+    weights = DEFAULT_WEIGHTS if weights is None else weights
+    rows = OrderedDict() if document_ids is None else OrderedDict((d, i) for (i, d) in enumerate(document_ids))
+    columns = OrderedDict()
+    for name in feature_names or []:
+        group = name.split(u'=', 1)[0]
+        columns[name] = (len(columns), weights.get(group) or 0.0)
+    entries = set([])
+
+    for row in db.query(_metadata_query(db)):
+        (document_id, feature, value) = (row[u'document_id'], row[u'feature'], row[u'value'])
+        if value is None or not weights.get(feature):
+            continue
+        if document_id not in rows:
+            if document_ids is not None:
+                continue
+            rows[document_id] = len(rows)
+        name = u'%s=%s' % (feature, value)
+        if name not in columns:
+            if feature_names is not None:
+                continue
+            columns[name] = (len(columns), weights[feature])
+        entries.add((rows[document_id], columns[name][0]))
+
+    column_weights = np.array([weight for (_, weight) in columns.values()], dtype=float)
+    (row_indices, column_indices) = zip(*entries) if entries else ((), ())
+    matrix = sp.csr_matrix(
+        (column_weights[list(column_indices)], (row_indices, column_indices)),
+        shape=(len(rows), len(columns)))
+
+    logging.info(u"%i metadata features of %i documents" % (len(columns), len(rows)))
+    return _normalize(matrix), list(rows), list(columns)
+
+
+def align_rows(matrix, row_ids, target_ids):
+    """
+    Reorders the rows of a matrix.
+    :param matrix: A (sparse) matrix whose rows are identified by row_ids
+    :param row_ids: The ids of the rows of matrix
+    :param target_ids: The ids of the rows of the result. Ids absent from
+                       row_ids get an empty row.
+    :return: A CSR matrix whose row i is the row of target_ids[i] in matrix
+    """
+    positions = {row_id: i for (i, row_id) in enumerate(row_ids)}
+    pairs = [(i, positions[target_id]) for (i, target_id) in enumerate(target_ids) if target_id in positions]
+    (targets, sources) = zip(*pairs) if pairs else ((), ())
+    selection = sp.csr_matrix(
+        (np.ones(len(pairs)), (targets, sources)),
+        shape=(len(target_ids), matrix.shape[0]))
+    return (selection * sp.csr_matrix(matrix)).tocsr()
+
+
+def combine_features(blocks):
+    """
+    Concatenates feature matrices (with the same rows) with weights: each block is
+    L2-normalised and scaled by the square root of its weight, so that the dot
+    product of two rows is the weighted sum of the cosine similarities of the blocks
+    (a weighted average if the weights sum to 1 and no row of a block is empty).
+    :param blocks: A list of (matrix, weight)
+    :return: The combined CSR matrix
+    """
+    return sp.hstack(
+        [_normalize(sp.csr_matrix(matrix)) * np.sqrt(weight) for (matrix, weight) in blocks if weight],
+        format='csr')
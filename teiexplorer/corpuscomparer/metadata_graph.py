@@ -1,62 +1,169 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
+"""
+metadata_graph is part of the project TEIExplorer
+Author: Valérie Hanoka
 
-# import networkx as nx
-# from networkx.readwrite import json_graph
-
-# class CorpusGraph(object):
-#
-#     g = None
-#
-#     def __init__(self):
-#         """TODO"""
-#         self.g = nx.DiGraph()
-#
-#     #--------------------
-#     #   Nodes creation
-#     #--------------------
-#     def createDocumentNodes(self, document_metadata):
-#         """TODO"""
-#
-#         # File unique id will be its filepath
-#         # A document is a node.
-#         corpus_tag = document_metadata.pop(u'corpus_tag', 'UNK') # TODO Change the pop and labels
-#         file_path = document_metadata.pop(u'filePath', 'UNK')# TODO Change
-#         idno = document_metadata.pop(u'idno', 'UNK') # TODO Change
-#
-#         document = self.g.add_node(file_path, origin=corpus_tag, idno=idno)
-#
-#         # Each document attribute will be another typed node, linked to the Document Node
-#         # Nodes must be unique in the graph.
-#         for attribute_type in document_metadata:
-#             attribute_content = document_metadata[attribute_type]
-#             # TODO Make it unique
-#             if not (attribute_content in self.g.nodes() and self.g.node[attribute_content] is attribute_type):
-#                 attribute = self.g.add_node(attribute_content, vtype=attribute_type)
-#
-#             self.g.add_edge(file_path, attribute_content, etype=attribute_type)
-#
-#
-#
-#     def saveToPng(self, output_file):
-#         """TODO"""
-#         #import ipdb; ipdb.set_trace()
-#         import matplotlib
-#         matplotlib.use("Agg")
-#         import matplotlib.pyplot as plt
-#         fig = plt.figure()
-#         nx.draw(self.g, ax=fig.add_subplot(111))
-#         fig.savefig(output_file)
-#         print u"Dumped in %s" % output_file
-#
-#     def saveToGraphml(self, output_file):
-#         """TODO"""
-#         nx.write_graphml(self.g, output_file, encoding='utf-8')
-#         print u"Dumped in %s" % output_file
-#
-#     def loadGraphml(self, input_file):
-#         """TODO"""
-#         import pdb;
-#         pdb.set_trace()
-#         #self. g = nx.read_graphml(input_file, unicode)
+The bipartite graph of the documents of a metadata DB (see utils.sqlite_basic)
+and of their attributes: authors (fingerprints), dates (deduced years),
+identifiers and series titles. Each document and each distinct attribute
+value is a node, identified by a dense integer id.
 
+The (undirected) edges are stored in compressed sparse row arrays: the
+neighbours of node i are indices[indptr[i]:indptr[i + 1]], i.e. 8 bytes by
+edge (int32, once in each direction) instead of the dicts of networkx.
+"""
+
+import logging
+from array import array
+
+import numpy as np
+import scipy.sparse as sp
+
+NODE_TYPES = (u'document', u'author', u'date', u'identifier', u'series')
+DOCUMENT = NODE_TYPES.index(u'document')
+
+
+def _attributes_query(db):
+    """The UNION query of the (document_id, node_type, label) rows available in db."""
+    tables = db.tables
+    selects = []
+
+    if u'person' in tables and u'documentHasAuthor' in tables and db['person'].has_column(u'fingerprint'):
+        selects.append(
+            u"SELECT dha.document_id AS document_id, 'author' AS node_type, p.fingerprint AS label "
+            u"FROM documentHasAuthor dha JOIN person p ON p.id = dha.author_id")
+
+    if u'date' in tables and u'documentHasDate' in tables and db['date'].has_column(u'deduced_date'):
+        selects.append(
+            u"SELECT dhd.document_id AS document_id, 'date' AS node_type, "
+            u"CAST(CAST(d.deduced_date AS INTEGER) AS TEXT) AS label "
+            u"FROM documentHasDate dhd JOIN date d ON d.id = dhd.date_id")
+
+    if u'identifier' in tables and u'documentHasIdentifier' in tables:
+        selects.append(
+            u"SELECT dhi.document_id AS document_id, 'identifier' AS node_type, i.idno AS label "
+            u"FROM documentHasIdentifier dhi JOIN identifier i ON i.id = dhi.idno_id")
+
+    if u'title' in tables and u'documentHasTitle' in tables:
+        selects.append(
+            u"SELECT dht.document_id AS document_id, 'series' AS node_type, t.title AS label "
+            u"FROM documentHasTitle dht JOIN title t ON t.id = dht.title_id "
+            u"WHERE dht.from_xml_element LIKE '%seriesStmt%'")
+
+    return u' UNION ALL '.join(selects)
+
+
+class CorpusGraph(object):
+    """
+    The documents-attributes bipartite graph of a corpus, in CSR arrays.
+
+    :Example:
+    >>> graph = CorpusGraph.from_database(dataset.connect(u'sqlite:///metadata.db'))
+    >>> author = graph.node_id(u'author', u'olivetpj')
+    >>> [graph.label(document) for document in graph.neighbours(author)]
+    >>> [u'/corpus/doc1.xml', u'/corpus/doc2.xml']
+    """
+
+    def __init__(self, node_types, labels, sources, targets):
+        """
+        :param node_types: The type of each node (an index of NODE_TYPES)
+        :param labels: The label of each node (unique by node type)
+        :param sources: The first nodes of the edges
+        :param targets: The second nodes of the edges (duplicate edges are merged)
+        """
+        self.node_types = np.asarray(node_types, dtype=np.int8)
+        self.labels = list(labels)
+        self._ids = {(node_type, label): node for (node, (node_type, label))
+                     in enumerate(zip(self.node_types.tolist(), self.labels))}
+
+        n = len(self.labels)
+        sources = np.asarray(sources, dtype=np.int32)
+        targets = np.asarray(targets, dtype=np.int32)
+        adjacency = sp.csr_matrix(
+            (np.ones(2 * len(sources), dtype=np.int8),
+             (np.concatenate([sources, targets]), np.concatenate([targets, sources]))),
+            shape=(n, n))
+        adjacency.sum_duplicates()
+        adjacency.sort_indices()
+        self.indptr = adjacency.indptr.astype(np.int64)
+        self.indices = adjacency.indices.astype(np.int32)
+
+    @classmethod
+    def from_database(cls, db):
+        """
+        Builds the graph of the documents of a metadata DB and of their attributes.
+        :param db: A dataset connection to a metadata DB
+        """
+        node_types = array('b')
+        labels = []
+        ids = {}
+        sources = array('i')
+        targets = array('i')
+
+        def node_id(node_type, label):
+            node = ids.get((node_type, label))
+            if node is None:
+                node = ids[(node_type, label)] = len(labels)
+                node_types.append(node_type)
+                labels.append(label)
+            return node
+
+        for row in db.query(u"SELECT _file FROM document"):
+            node_id(DOCUMENT, row[u'_file'])
+
+        query = _attributes_query(db)
+        for row in (db.query(query) if query else []):
+            if row[u'label'] is None or row[u'document_id'] is None:
+                continue
+            sources.append(node_id(DOCUMENT, row[u'document_id']))
+            targets.append(node_id(NODE_TYPES.index(row[u'node_type']), u'%s' % row[u'label']))
+
+        graph = cls(node_types, labels, sources, targets)
+        logging.info(u"Corpus graph: %i nodes (%i documents), %i edges"
+                     % (len(graph), len(graph.nodes(u'document')), graph.n_edges))
+        return graph
+
+    def __len__(self):
+        return len(self.labels)
+
+    @property
+    def n_edges(self):
+        return len(self.indices) // 2
+
+    def node_id(self, node_type, label):
+        """The id of the node of a type (see NODE_TYPES) and label (KeyError if it does not exist)."""
+        return self._ids[(NODE_TYPES.index(node_type), label)]
+
+    def label(self, node):
+        return self.labels[node]
+
+    def node_type(self, node):
+        return NODE_TYPES[self.node_types[node]]
+
+    def nodes(self, node_type=None):
+        """The ids of the nodes (of a type, see NODE_TYPES)."""
+        if node_type is None:
+            return np.arange(len(self.labels))
+        return np.flatnonzero(self.node_types == NODE_TYPES.index(node_type))
+
+    def neighbours(self, node, node_type=None):
+        """
+        :param node: A node id
+        :param node_type: If set, only the neighbours of this type are returned
+        :return: The (sorted) array of the ids of the neighbours of node
+        """
+        neighbours = self.indices[self.indptr[node]:self.indptr[node + 1]]
+        if node_type is not None:
+            neighbours = neighbours[self.node_types[neighbours] == NODE_TYPES.index(node_type)]
+        return neighbours
+
+    def degrees(self):
+        """The number of neighbours of each node."""
+        return np.diff(self.indptr)
+
+    def adjacency(self):
+        """The (nodes x nodes) adjacency matrix of the graph, sharing its arrays."""
+        return sp.csr_matrix(
+            (np.ones(len(self.indices), dtype=np.int8), self.indices, self.indptr),
+            shape=(len(self), len(self)))
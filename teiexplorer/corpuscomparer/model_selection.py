@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+model_selection is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+Selection of the number of clusters: k-means models are fitted for a range
+of k in a process pool, and evaluated by their inertia and (sampled)
+silhouette score. The TF-IDF matrix is shared with the workers as
+memory-mapped .npy files rather than being pickled to each of them.
+"""
+
+import logging
+import os
+import shutil
+import tempfile
+from multiprocessing import Pool
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.cluster import KMeans
+from sklearn.metrics import silhouette_score
+
+try:
+    import joblib
+except ImportError:
+    # joblib was vendored in older scikit-learn versions
+    from sklearn.externals import joblib
+
+
+def share_matrix(matrix, directory):
+    """
+    Saves the arrays of a CSR matrix as .npy files, to be memory-mapped by
+    other processes (see load_shared_matrix).
+    :return: A (picklable) description of the shared matrix
+    """
+    matrix = sp.csr_matrix(matrix)
+    shared = {u'shape': matrix.shape}
+    for name in (u'data', u'indices', u'indptr'):
+        shared[name] = os.path.join(directory, u'%s.npy' % name)
+        np.save(shared[name], getattr(matrix, name))
+    return shared
+
+
+def load_shared_matrix(shared):
+    """The (read-only, memory-mapped) CSR matrix described by shared."""
+    return sp.csr_matrix(
+        tuple(np.load(shared[name], mmap_mode='r') for name in (u'data', u'indices', u'indptr')),
+        shape=shared[u'shape'],
+        copy=False)
+
+
+def _evaluate_k(task):
+    """
+    Fits a k-means model and evaluates it.
+    :param task: (shared matrix, k, models directory, silhouette sample size, random state)
+    :return: A dict with the k, inertia, silhouette and model (file) of the model
+    """
+    (shared, k, directory, sample_size, random_state) = task
+    matrix = load_shared_matrix(shared)
+
+    km = KMeans(n_clusters=k, n_init=10, random_state=random_state)
+    labels = km.fit_predict(matrix)
+    if 1 < len(np.unique(labels)) < matrix.shape[0]:
+        silhouette = silhouette_score(
+            matrix, labels,
+            sample_size=min(sample_size, matrix.shape[0]) if sample_size else None,
+            random_state=random_state)
+    else:
+        silhouette = float('nan')
+
+    model_file = os.path.join(directory, u'kmeans_%i.pkl' % k)
+    joblib.dump(km, model_file)
+    logging.info(u"k=%i: inertia %.4f, silhouette %.4f" % (k, km.inertia_, silhouette))
+    return {u'k': k, u'inertia': float(km.inertia_), u'silhouette': float(silhouette), u'model': model_file}
+
+
+def select_n_clusters(matrix, k_values, processes=None, sample_size=2000, random_state=1):
+    """
+    Fits and evaluates k-means models for each k of k_values, in parallel.
+
+    :param matrix: The (documents x features) matrix to cluster
+    :param k_values: The numbers of clusters to evaluate
+    :param processes: The number of worker processes (default: number of CPUs).
+                      With 1, models are fitted in the current process.
+    :param sample_size: The number of documents sampled to compute the
+                        silhouette scores (all of them if None)
+    :param random_state: The seed of the k-means initialisations and samplings
+    :return: (the list of the scores of each k, sorted by k, the best model),
+             the best model having the highest silhouette score.
+    """
+    k_values = [k for k in k_values if 1 < k <= matrix.shape[0]]
+    if not k_values:
+        raise ValueError("No number of clusters to evaluate for %i documents" % matrix.shape[0])
+
+    directory = tempfile.mkdtemp(prefix=u'teiexplorer_')
+    try:
+        shared = share_matrix(matrix, directory)
+        tasks = [(shared, k, directory, sample_size, random_state) for k in k_values]
+        if processes == 1:
+            scores = [_evaluate_k(task) for task in tasks]
+        else:
+            pool = Pool(processes)
+            try:
+                scores = list(pool.imap_unordered(_evaluate_k, tasks))
+            finally:
+                pool.close()
+                pool.join()
+
+        scores.sort(key=lambda score: score[u'k'])
+        best = max(scores, key=lambda score: (not np.isnan(score[u'silhouette']), score[u'silhouette']))
+        best_model = joblib.load(best.pop(u'model'))
+        for score in scores:
+            score.pop(u'model', None)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    logging.info(u"Best number of clusters: %i (silhouette %.4f)" % (best[u'k'], best[u'silhouette']))
+    return scores, best_model
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+near_duplicates is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+Near-duplicate documents detection with MinHash and Locality Sensitive Hashing:
+    - each document is reduced to the set of its word shingles (n-grams),
+      hashed in 32 bits;
+    - a MinHash signature of num_perm values approximates the Jaccard
+      similarity of the shingle sets of two documents;
+    - the signatures are cut in bands, and documents sharing the same values
+      for (at least) one band are candidate pairs;
+    - candidate pairs are kept if their estimated Jaccard similarity reaches
+      the threshold.
+The documents are never compared pairwise: the cost is linear in the number
+of documents (plus the number of candidate pairs).
+"""
+
+import logging
+import zlib
+from collections import defaultdict
+from itertools import combinations
+
+import numpy as np
+
+MAX_HASH = np.uint64(0xFFFFFFFF)
+
+
+def hash_shingles(tokens, shingle_size=5):
+    """
+    :param tokens: A list of (unicode) tokens
+    :param shingle_size: The number of tokens of each shingle
+    :return: An array of the (unique) 32 bits hashes of the word shingles of tokens.
+             A document shorter than shingle_size is a single shingle.
+    """
+    if not tokens:
+        return np.array([], dtype=np.uint64)
+    shingle_size = min(shingle_size, len(tokens))
+    hashes = set(
+        zlib.crc32(u' '.join(tokens[i:i + shingle_size]).encode('utf-8')) & 0xFFFFFFFF
+        for i in range(len(tokens) - shingle_size + 1))
+    return np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+
+
+class MinHasher(object):
+    """
+    Computes the MinHash signatures of documents, with num_perm hash functions
+    h(x) = ((a.x + b) mod 2^64) >> 32 (multiply-add-shift universal hashing,
+    with random 64 bits a and b, a being odd), applied to the 32 bits hashes
+    of the shingles.
+    """
+
+    # Number of shingles hashed at once
+    CHUNK_SIZE = 4096
+
+    def __init__(self, num_perm=128, shingle_size=5, seed=1):
+        """
+        :param num_perm: The number of hash functions (length of the signatures)
+        :param shingle_size: The number of tokens of each shingle
+        :param seed: The seed of the hash functions: signatures are comparable
+                     only if they were computed with the same seed.
+        """
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(0, 2 ** 64 - 1, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.randint(0, 2 ** 64 - 1, size=num_perm, dtype=np.uint64)
+
+    def signature(self, tokens):
+        """
+        :param tokens: The list of tokens of a document
+        :return: The MinHash signature of the document, an array of num_perm uint32.
+                 The signature of an empty document only contains MAX_HASH.
+        """
+        shingles = hash_shingles(tokens, self.shingle_size)
+        if not len(shingles):
+            return np.full(self.num_perm, MAX_HASH, dtype=np.uint32)
+        # (shingles x num_perm) values, reduced to their minimum for each hash
+        # function, by chunks of shingles to bound the memory of long documents
+        signature = np.full(self.num_perm, MAX_HASH, dtype=np.uint64)
+        for start in range(0, len(shingles), self.CHUNK_SIZE):
+            hashes = (np.outer(shingles[start:start + self.CHUNK_SIZE], self.a) + self.b) >> np.uint64(32)
+            np.minimum(signature, hashes.min(axis=0), out=signature)
+        return signature.astype(np.uint32)
+
+
+def estimate_jaccard(signature, other_signature):
+    """The estimated Jaccard similarity of two documents: the proportion of
+    equal values in their MinHash signatures."""
+    return float(np.mean(signature == other_signature))
+
+
+def optimal_bands(num_perm, threshold):
+    """
+    Chooses the number of bands b (of r = num_perm / b rows) whose LSH S-curve
+    threshold, (1/b)^(1/r), is the closest below threshold. Candidate pairs
+    being verified, lower thresholds only cost false positives, while higher
+    thresholds miss near-duplicates.
+    :return: The number of bands
+    """
+    bands = [b for b in range(1, num_perm + 1) if num_perm % b == 0]
+    below = [b for b in bands if (1.0 / b) ** (1.0 / (num_perm // b)) <= threshold]
+    return min(below or bands, key=lambda b: abs((1.0 / b) ** (1.0 / (num_perm // b)) - threshold))
+
+
+class LSHIndex(object):
+    """
+    A banded LSH index of MinHash signatures: two documents are candidates
+    if their signatures are identical on at least one band.
+    """
+
+    def __init__(self, num_perm=128, bands=16):
+        if num_perm % bands:
+            raise ValueError("The number of bands (%i) must divide the signatures length (%i)"
+                             % (bands, num_perm))
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.buckets = [defaultdict(list) for _ in range(bands)]
+        self.signatures = {}
+
+    def add(self, key, signature):
+        """Indexes the signature of the document key."""
+        if key in self.signatures:
+            raise ValueError("Document %s is already indexed" % key)
+        self.signatures[key] = signature
+        for band in range(self.bands):
+            band_values = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            self.buckets[band][band_values].append(key)
+
+    def candidate_pairs(self):
+        """
+        :return: The set of (key, other key) pairs of documents sharing at least
+                 one band, each pair being ordered by insertion.
+        """
+        order = {key: i for (i, key) in enumerate(self.signatures)}
+        pairs = set([])
+        for band_buckets in self.buckets:
+            for keys in band_buckets.values():
+                if len(keys) > 1:
+                    pairs.update(combinations(keys, 2))
+        return set(
+            (key, other_key) if order[key] < order[other_key] else (other_key, key)
+            for (key, other_key) in pairs)
+
+    def near_duplicates(self, threshold=0.8):
+        """
+        :param threshold: The minimal estimated Jaccard similarity
+        :return: The list of (key, other key, estimated Jaccard similarity) of the
+                 candidate pairs reaching the threshold, most similar first.
+        """
+        similarities = []
+        candidates = self.candidate_pairs()
+        for (key, other_key) in candidates:
+            similarity = estimate_jaccard(self.signatures[key], self.signatures[other_key])
+            if similarity >= threshold:
+                similarities.append((key, other_key, similarity))
+        logging.info(u"%i near-duplicate pairs found among %i candidate pairs of %i documents"
+                     % (len(similarities), len(candidates), len(self.signatures)))
+        return sorted(similarities, key=lambda s: (-s[2], s[0], s[1]))
+
+
+def find_near_duplicates(documents, threshold=0.8, num_perm=128, shingle_size=5, bands=None):
+    """
+    :Example:
+    >>> find_near_duplicates([(u'a.xml', tokens_a), (u'b.xml', tokens_b)], threshold=0.5)
+    >>> [(u'a.xml', u'b.xml', 0.7421875)]
+    :param documents: An iterable of (document id, list of tokens) pairs, read once:
+                      only the signatures are kept in memory.
+    :param threshold: The minimal estimated Jaccard similarity of the shingle sets
+    :param num_perm: The length of the MinHash signatures
+    :param shingle_size: The number of tokens of each shingle
+    :param bands: The number of LSH bands (default: see optimal_bands)
+    :return: The list of (document id, other document id, estimated Jaccard similarity)
+    """
+    minhasher = MinHasher(num_perm=num_perm, shingle_size=shingle_size)
+    index = LSHIndex(num_perm=num_perm, bands=bands or optimal_bands(num_perm, threshold))
+    for (document_id, tokens) in documents:
+        if tokens:
+            index.add(document_id, minhasher.signature(tokens))
+    return index.near_duplicates(threshold)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+registry is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+"""
+
+import io
+import numbers
+import os
+import shutil
+import tempfile
+from array import array
+
+
+class DocumentRegistry(object):
+    """
+    The documents of a corpus, identified by dense integer ids (0, 1, 2...
+    in the order of their registration), whose texts are appended to an
+    on-disk text store: only the (byte) offsets and lengths of the texts
+    are kept in memory, in arrays.
+
+    :Example:
+    >>> registry = DocumentRegistry()
+    >>> registry.add(u'doc1.xml', u'Le chat dort.')
+    >>> 0
+    >>> registry.get_text(u'doc1.xml')
+    >>> u'Le chat dort.'
+    """
+
+    TEXTS_FILE = u'texts.dat'
+
+    def __init__(self, directory=None):
+        """
+        :param directory: The directory of the text store (whose content is
+                          replaced). A temporary directory, removed by close(),
+                          is used if it is not set.
+        """
+        self._temporary = directory is None
+        self.directory = tempfile.mkdtemp(prefix=u'teiexplorer_') if self._temporary else directory
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+        self.path = os.path.join(self.directory, self.TEXTS_FILE)
+
+        self.filenames = []
+        self._ids = {}
+        self._offsets = array('q')
+        self._lengths = array('q')
+        self._size = 0
+        self._store = io.open(self.path, 'w+b')
+
+    def __len__(self):
+        return len(self.filenames)
+
+    def __contains__(self, filename):
+        return filename in self._ids
+
+    def __getstate__(self):
+        # The text store is reopened (read-only) when unpickled, e.g. in a worker process
+        if self._store:
+            self._store.flush()
+        state = self.__dict__.copy()
+        state[u'_store'] = None
+        state[u'_temporary'] = False
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._store = io.open(self.path, 'rb')
+
+    def add(self, filename, text):
+        """
+        Appends a text to the store. A document registered again keeps its id,
+        and its new text replaces the previous one.
+        :param filename: The document identifier, e.g. its file path
+        :param text: A unicode text
+        :return: The id of the document
+        """
+        data = (text or u'').encode('utf-8')
+        self._store.seek(self._size)
+        self._store.write(data)
+
+        document_id = self._ids.get(filename)
+        if document_id is None:
+            document_id = self._ids[filename] = len(self.filenames)
+            self.filenames.append(filename)
+            self._offsets.append(self._size)
+            self._lengths.append(len(data))
+        else:
+            self._offsets[document_id] = self._size
+            self._lengths[document_id] = len(data)
+        self._size += len(data)
+        return document_id
+
+    def get_id(self, filename):
+        """The id of a document (KeyError if it is not registered)."""
+        return self._ids[filename]
+
+    def get_text(self, document):
+        """
+        :param document: A document id, or its filename
+        :return: The text of the document
+        """
+        document_id = document if isinstance(document, numbers.Integral) else self._ids[document]
+        self._store.flush()
+        self._store.seek(self._offsets[document_id])
+        return self._store.read(self._lengths[document_id]).decode('utf-8')
+
+    def texts(self):
+        """Generator of the texts of all the documents, in the order of their ids."""
+        for document_id in range(len(self.filenames)):
+            yield self.get_text(document_id)
+
+    def items(self):
+        """Generator of the (filename, text) of all the documents, in the order of their ids."""
+        for (document_id, filename) in enumerate(self.filenames):
+            yield (filename, self.get_text(document_id))
+
+    def close(self):
+        if self._store:
+            self._store.close()
+            self._store = None
+        if self._temporary:
+            shutil.rmtree(self.directory, ignore_errors=True)
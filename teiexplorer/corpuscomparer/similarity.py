@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+similarity is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+"""
+
+import logging
+
+import numpy as np
+import scipy.sparse as sp
+
+
+def top_k_similarities(matrix, k=10, block_size=256):
+    """
+    Sparse k-nearest-neighbours graph of the rows of a matrix, for the cosine
+    similarity. The full N x N similarity matrix is never built: rows are
+    processed by blocks of block_size (a block_size x N dense product),
+    and only the k best similarities of each row are kept (with argpartition).
+
+    :param matrix: A (documents x features) sparse matrix whose rows are L2-normalised
+                   (e.g. a TF-IDF matrix), so that dot products are cosine similarities.
+    :param k: The number of neighbours kept for each row
+    :param block_size: The number of rows compared to the whole matrix at once
+    :return: A (documents x documents) CSR matrix, where row i holds the
+             (positive) similarities of the k nearest neighbours of document i.
+    """
+    X = sp.csr_matrix(matrix, dtype=np.float32)
+    n = X.shape[0]
+    k = min(k, n - 1)
+    if k < 1:
+        return sp.csr_matrix((n, n), dtype=np.float32)
+
+    X_T = X.T.tocsr()
+    rows, cols, similarities = [], [], []
+    for start in range(0, n, block_size):
+        end = min(start + block_size, n)
+        block = (X[start:end] * X_T).toarray()
+
+        # A document is not its own neighbour
+        block[np.arange(end - start), np.arange(start, end)] = -np.inf
+
+        neighbours = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        block_similarities = np.take_along_axis(block, neighbours, axis=1)
+        is_similar = block_similarities > 0
+
+        rows.append(np.repeat(np.arange(start, end), k)[is_similar.ravel()])
+        cols.append(neighbours[is_similar])
+        similarities.append(block_similarities[is_similar])
+        logging.debug(u"Nearest neighbours of %i/%i documents computed" % (end, n))
+
+    return sp.csr_matrix(
+        (np.concatenate(similarities), (np.concatenate(rows), np.concatenate(cols))),
+        shape=(n, n))
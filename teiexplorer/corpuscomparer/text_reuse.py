@@ -0,0 +1,311 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+text_reuse is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+Passage-level text reuse detection:
+    - an inverted index maps the (hashed) word n-grams of all the documents
+      to their (document, position) occurrences;
+    - documents sharing enough (not too common) n-grams are candidate pairs;
+    - for each candidate pair, the shared n-grams are seeds, which are chained
+      along their diagonals and extended into aligned passages;
+    - passages are located by character offsets in the texts (e.g. the text
+      of the TEI body, see TeiContent.get_body_text).
+Candidate pairs are aligned in a process pool, and the passages are handed
+to a callback as soon as they are found (e.g. to be saved in the DB).
+"""
+
+import logging
+import zlib
+from collections import Counter, OrderedDict
+from itertools import combinations, groupby
+from multiprocessing import Pool
+
+import numpy as np
+from pylru import lrucache
+
+from teiexplorer.utils.tokenizer import tokenize_with_offsets
+
+# N-grams occurring more often in a text are not used as alignment seeds
+MAX_SEED_REPETITIONS = 10
+# Number of tokenized texts kept by each alignment worker
+PREPARED_TEXTS_CACHE_SIZE = 64
+
+
+def ngram_hashes(tokens, ngram_size=5):
+    """
+    :param tokens: A list of (unicode) tokens
+    :param ngram_size: The number of tokens of each n-gram
+    :return: An array of the 32 bits hashes of the n-grams starting at each
+             position of tokens (empty if there are less than ngram_size tokens)
+    """
+    return np.fromiter(
+        (zlib.crc32(u' '.join(tokens[i:i + ngram_size]).encode('utf-8')) & 0xFFFFFFFF
+         for i in range(len(tokens) - ngram_size + 1)),
+        dtype=np.uint32)
+
+
+def read_tei_body(document_file):
+    """Loads the text of the body of a TEI document (None if it has none)."""
+    from teiexplorer.corpusreader.tei_content_scraper import TeiContent
+    return TeiContent(document_file, u'').get_body_text()
+
+
+class NgramIndex(object):
+    """
+    An inverted index of the word n-grams of documents, stored in arrays:
+    the (hash, document number, position) of each n-gram occurrence.
+    """
+
+    def __init__(self, ngram_size=5, max_document_frequency=50):
+        """
+        :param ngram_size: The number of tokens of each n-gram
+        :param max_document_frequency: N-grams occurring in more documents
+                                       (formulas, quotations of the Bible...)
+                                       do not make documents candidates.
+        """
+        self.ngram_size = ngram_size
+        self.max_document_frequency = max_document_frequency
+        self.document_ids = []
+        self._chunks = []
+        self._hashes = self._documents = self._positions = None
+
+    def add_document(self, document_id, tokens):
+        """Indexes the n-grams of a document (a list of tokens)."""
+        hashes = ngram_hashes(tokens, self.ngram_size)
+        document_num = len(self.document_ids)
+        self.document_ids.append(document_id)
+        self._chunks.append((
+            hashes,
+            np.full(len(hashes), document_num, dtype=np.uint32),
+            np.arange(len(hashes), dtype=np.uint32)))
+        self._hashes = None
+
+    def _build(self):
+        if self._hashes is None:
+            if self._chunks:
+                hashes, documents, positions = (np.concatenate(arrays) for arrays in zip(*self._chunks))
+            else:
+                hashes = documents = positions = np.array([], dtype=np.uint32)
+            order = np.lexsort((positions, documents, hashes))
+            self._hashes, self._documents, self._positions = hashes[order], documents[order], positions[order]
+            self._chunks = [(self._hashes, self._documents, self._positions)]
+
+    def postings(self, ngram_hash):
+        """:return: The list of (document id, position) of the occurrences of an n-gram hash."""
+        self._build()
+        start, end = np.searchsorted(self._hashes, [ngram_hash, int(ngram_hash) + 1])
+        return [(self.document_ids[d], int(p))
+                for (d, p) in zip(self._documents[start:end], self._positions[start:end])]
+
+    def candidate_pairs(self, min_shared=3):
+        """
+        :param min_shared: The minimal number of distinct n-grams shared by two documents
+        :return: A dict {(document number, other document number): number of shared n-grams}
+                 of the document pairs sharing at least min_shared n-grams.
+        """
+        self._build()
+        # Unique (n-gram, document) occurrences
+        keep = np.ones(len(self._hashes), dtype=bool)
+        keep[1:] = (self._hashes[1:] != self._hashes[:-1]) | (self._documents[1:] != self._documents[:-1])
+        hashes, documents = self._hashes[keep], self._documents[keep]
+
+        # N-grams of 2 to max_document_frequency documents
+        boundaries = np.flatnonzero(np.diff(hashes)) + 1
+        starts = np.concatenate([[0], boundaries])
+        ends = np.concatenate([boundaries, [len(hashes)]])
+        frequencies = ends - starts
+        shared = (frequencies > 1) & (frequencies <= self.max_document_frequency)
+
+        pairs = Counter()
+        for (start, end) in zip(starts[shared], ends[shared]):
+            pairs.update(combinations(documents[start:end].tolist(), 2))
+        return {pair: count for (pair, count) in pairs.items() if count >= min_shared}
+
+
+def chain_seeds(seeds, max_gap=10):
+    """
+    Chains seeds (shared n-grams) into passages: a seed extends a passage if it
+    is at most max_gap tokens after its end in both documents.
+    :param seeds: A list of (position, other position) of shared n-grams
+    :param max_gap: The maximal number of tokens between two chained seeds
+    :return: A list of [start, end, other start, other end, seeds number], the
+             ends being the positions of the last seeds (inclusive).
+    """
+    passages = []
+    # Passages which may still be extended, i.e. ending less than max_gap tokens ago
+    open_passages = []
+    for (position, other_position) in sorted(seeds):
+        open_passages = [p for p in open_passages if position - p[1] <= max_gap]
+        for passage in open_passages:
+            if passage[2] <= other_position and abs(other_position - passage[3]) <= max_gap:
+                passage[1] = position
+                passage[3] = max(passage[3], other_position)
+                passage[4] += 1
+                break
+        else:
+            passage = [position, position, other_position, other_position, 1]
+            passages.append(passage)
+            open_passages.append(passage)
+    return passages
+
+
+def prepare_text(text, ngram_size=5):
+    """
+    Tokenizes a text and hashes its n-grams, once for all its alignments.
+    :return: (the (token, start, end) of the text, the hashes of its n-grams,
+              the order of the sorted hashes, the sorted hashes)
+    """
+    tokens = tokenize_with_offsets(text)
+    hashes = ngram_hashes([t for (t, _, _) in tokens], ngram_size)
+    order = np.argsort(hashes, kind='mergesort')
+    return tokens, hashes, order, hashes[order]
+
+
+def align_prepared_texts(prepared_text, other_prepared_text, ngram_size=5, max_gap=10, min_length=10):
+    """Aligns the passages shared by two texts prepared with prepare_text (see align_texts)."""
+    (tokens, hashes, _, _) = prepared_text
+    (other_tokens, _, order, sorted_hashes) = other_prepared_text
+
+    # Seeds: the positions of the n-grams of text in other_text,
+    # ignoring n-grams repeated too often to be aligned
+    starts = np.searchsorted(sorted_hashes, hashes, side='left')
+    ends = np.searchsorted(sorted_hashes, hashes, side='right')
+    repetitions = ends - starts
+    seeds = [
+        (position, int(other_position))
+        for position in np.flatnonzero((repetitions > 0) & (repetitions <= MAX_SEED_REPETITIONS)).tolist()
+        for other_position in order[starts[position]:ends[position]]
+    ]
+
+    passages = []
+    for (start, end, other_start, other_end, _) in chain_seeds(seeds, max_gap):
+        length = end - start + ngram_size
+        if length < min_length:
+            continue
+        passages.append((
+            tokens[start][1], tokens[end + ngram_size - 1][2],
+            other_tokens[other_start][1], other_tokens[other_end + ngram_size - 1][2],
+            length))
+    return passages
+
+
+def align_texts(text, other_text, ngram_size=5, max_gap=10, min_length=10):
+    """
+    Aligns the passages shared by two texts.
+
+    :param text: A unicode text
+    :param other_text: Another unicode text
+    :param ngram_size: The number of tokens of the seeds
+    :param max_gap: The maximal number of tokens between two chained seeds
+    :param min_length: The minimal number of tokens of a passage
+    :return: A list of (start, end, other start, other end, tokens number) of the
+             aligned passages, start and end being character offsets in text
+             and other start and other end character offsets in other_text.
+    """
+    return align_prepared_texts(
+        prepare_text(text, ngram_size), prepare_text(other_text, ngram_size),
+        ngram_size=ngram_size, max_gap=max_gap, min_length=min_length)
+
+
+# State of the alignment worker processes (see _initialise_worker)
+_load_text = None
+_alignment_options = {}
+_prepared_texts = {}
+
+
+def _initialise_worker(load_text, alignment_options):
+    global _load_text, _alignment_options, _prepared_texts
+    _load_text = load_text
+    _alignment_options = alignment_options
+    _prepared_texts = lrucache(PREPARED_TEXTS_CACHE_SIZE)
+
+
+def _prepared_text(document_id):
+    """The prepared text of a document, loaded and tokenized once while it is
+    in the cache of the worker (tasks of close documents share candidates)."""
+    if document_id not in _prepared_texts:
+        _prepared_texts[document_id] = prepare_text(
+            _load_text(document_id), _alignment_options.get(u'ngram_size', 5))
+    return _prepared_texts[document_id]
+
+
+def _align_document(task):
+    """Aligns a document with its candidate documents.
+    :param task: (document id, [other document ids])
+    :return: The list of the passages rows"""
+    (document_id, other_document_ids) = task
+    prepared_text = _prepared_text(document_id)
+    rows = []
+    for other_document_id in OrderedDict.fromkeys(other_document_ids):
+        other_prepared_text = _prepared_text(other_document_id)
+        for (start, end, other_start, other_end, length) in align_prepared_texts(
+                prepared_text, other_prepared_text, **_alignment_options):
+            rows.append({
+                u'document_id': document_id,
+                u'document_start': start,
+                u'document_end': end,
+                u'other_document_id': other_document_id,
+                u'other_document_start': other_start,
+                u'other_document_end': other_end,
+                u'length': length,
+            })
+    return rows
+
+
+def find_text_reuse(document_ids, load_text=read_tei_body, on_passages=None,
+                    ngram_size=5, min_shared=3, max_gap=10, min_length=10,
+                    max_document_frequency=50, processes=None, chunksize=4):
+    """
+    Finds the passages shared by the documents.
+
+    :param document_ids: The ids of the documents, e.g. TEI files paths
+    :param load_text: A (picklable) function loading the text of a document from
+                      its id, called in the worker processes (default: read_tei_body)
+    :param on_passages: A function called with the list of the passages rows of each
+                        document as soon as they are aligned (e.g. to save them)
+    :param ngram_size: The number of tokens of the n-grams (seeds)
+    :param min_shared: The minimal number of n-grams shared by two candidate documents
+    :param max_gap: The maximal number of tokens between two chained seeds
+    :param min_length: The minimal number of tokens of a passage
+    :param max_document_frequency: N-grams of more documents are not seeds of candidates
+    :param processes: The number of worker processes (default: number of CPUs).
+                      With 1, documents are aligned in the current process.
+    :param chunksize: The number of documents sent to a worker at once
+    :return: The number of aligned passages
+    """
+    index = NgramIndex(ngram_size, max_document_frequency)
+    for document_id in document_ids:
+        index.add_document(document_id, [t for (t, _, _) in tokenize_with_offsets(load_text(document_id))])
+
+    pairs = index.candidate_pairs(min_shared)
+    logging.info(u"%i candidate pairs of documents for text reuse" % len(pairs))
+
+    tasks = [
+        (index.document_ids[document_num], [index.document_ids[other] for (_, other) in group])
+        for (document_num, group) in groupby(sorted(pairs), key=lambda pair: pair[0])
+    ]
+    alignment_options = {u'ngram_size': ngram_size, u'max_gap': max_gap, u'min_length': min_length}
+
+    if processes == 1:
+        _initialise_worker(load_text, alignment_options)
+        results = (_align_document(task) for task in tasks)
+        pool = None
+    else:
+        pool = Pool(processes, _initialise_worker, (load_text, alignment_options))
+        results = pool.imap_unordered(_align_document, tasks, chunksize)
+
+    passages_num = 0
+    try:
+        for rows in results:
+            passages_num += len(rows)
+            if rows and on_passages:
+                on_passages(rows)
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+
+    logging.info(u"%i reused passages found" % passages_num)
+    return passages_num
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+vectorizer is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+"""
+
+import logging
+from itertools import islice
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+
+from teiexplorer.utils.tokenizer import tokenize
+
+
+def iter_chunks(iterable, chunk_size):
+    """Yields lists of (at most) chunk_size consecutive elements of iterable."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class StreamingTfidfVectorizer(object):
+    """
+    A TF-IDF vectorizer which reads the texts from an iterable (e.g. a generator
+    reading the files one by one), chunk by chunk, without ever keeping the raw
+    texts nor a vocabulary in memory:
+        - n-grams are hashed in n_features columns (HashingVectorizer);
+        - document frequencies are accumulated chunk by chunk;
+        - the IDF weighting (smoothed, as in sklearn's TfidfVectorizer) and
+          the L2 normalisation are applied once all the counts are known.
+    """
+
+    def __init__(self,
+                 n_features=2 ** 20,
+                 ngram_range=(1, 3),
+                 min_df=1,
+                 max_df=1.0,
+                 chunk_size=1000,
+                 tokenizer=tokenize):
+        """
+        :param n_features: The number of hashed features (columns)
+        :param ngram_range: The n-grams sizes, as in sklearn
+        :param min_df: Features appearing in less documents are ignored
+                       (a proportion of the documents if it is a float)
+        :param max_df: Features appearing in more documents are ignored
+                       (a proportion of the documents if it is a float)
+        :param chunk_size: The number of texts vectorized at once
+        :param tokenizer: A function text -> list of tokens
+        """
+        self.n_features = n_features
+        self.min_df = min_df
+        self.max_df = max_df
+        self.chunk_size = chunk_size
+        self.hashing_vectorizer = HashingVectorizer(
+            n_features=n_features,
+            tokenizer=tokenizer,
+            token_pattern=None,
+            ngram_range=ngram_range,
+            lowercase=False,
+            alternate_sign=False,
+            norm=None)
+        self.document_frequencies = None
+        self.documents_num = 0
+        self.idf_ = None
+
+    def _count(self, texts):
+        """Hashed counts of the texts, and the document frequencies of the features.
+        :return: (CSR counts matrix, document frequencies array)"""
+        document_frequencies = np.zeros(self.n_features, dtype=np.int64)
+        chunks = []
+        for chunk in iter_chunks(texts, self.chunk_size):
+            counts = self.hashing_vectorizer.transform(chunk)
+            document_frequencies += np.bincount(counts.indices, minlength=self.n_features)
+            chunks.append(counts)
+            logging.debug(u"%i texts vectorized" % sum(c.shape[0] for c in chunks))
+
+        if not chunks:
+            return sp.csr_matrix((0, self.n_features)), document_frequencies
+        return sp.vstack(chunks, format='csr'), document_frequencies
+
+    def _compute_idf(self):
+        n = self.documents_num
+        min_df = self.min_df * n if isinstance(self.min_df, float) else self.min_df
+        max_df = self.max_df * n if isinstance(self.max_df, float) else self.max_df
+
+        df = self.document_frequencies
+        self.idf_ = np.log((1.0 + n) / (1.0 + df)) + 1.0
+        self.idf_[(df < min_df) | (df > max_df)] = 0.0
+
+    def _weight(self, counts):
+        tfidf = counts.multiply(self.idf_).tocsr()
+        tfidf.eliminate_zeros()
+        return normalize(tfidf, norm='l2', copy=False)
+
+    def fit_transform(self, texts):
+        """
+        Learns the IDF weights from the texts and returns their TF-IDF matrix.
+        :param texts: An iterable of texts, read once.
+        :return: A (documents x n_features) CSR matrix
+        """
+        counts, self.document_frequencies = self._count(texts)
+        self.documents_num = counts.shape[0]
+        self._compute_idf()
+        return self._weight(counts)
+
+    def transform(self, texts):
+        """TF-IDF matrix of new texts, with the IDF weights already learnt."""
+        if self.idf_ is None:
+            raise ValueError("The vectorizer must be fitted before transforming texts.")
+        counts, _ = self._count(texts)
+        return self._weight(counts)
+
+    def get_feature_names_out(self):
+        """Hashed features have no names: they are labelled by their column."""
+        return np.array([u'#%i' % i for i in range(self.n_features)], dtype=object)
+
+    get_feature_names = get_feature_names_out
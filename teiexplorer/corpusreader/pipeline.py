@@ -0,0 +1,247 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+pipeline is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+A single pass over the XML/TEI files of the corpora, whose parsed documents
+are fed to several sinks (SQLite DB, Omeka-s CSV, JSON-lines...).
+Each sink consumes the documents in its own thread, from a bounded queue:
+parsing goes on while the sinks write, and waits for the slowest sink when
+its queue is full. Adding a sink never adds a pass over the XML files.
+
+:Example:
+>>> pipeline = DocumentPipeline([SQLiteSink(u'metadata.db'), JSONLinesSink(u'metadata.jsonl')])
+>>> pipeline.run(iter_tei_documents(corpora))
+"""
+
+import glob
+import io
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+
+import unicodecsv
+
+try:
+    from queue import Queue
+except ImportError:
+    # Python 2
+    from Queue import Queue
+
+from teiexplorer.corpusreader import tei_content_scraper as tcscraper
+
+
+def tei_to_omeka_header(header):
+    """ Transforms an XML-TEI header path to a Omeka-s (semantic-web compliant) header."""
+
+
+    # XML-TEI headers elements to Linked Data correspondences
+    xml_tag_to_voc = {
+        u"#fileDesc#titleStmt_title": u"dcterms:title",
+        u"#fileDesc#titleStmt_author_key": u"dcterms:creator",
+        u"#fileDesc#titleStmt_author": u"dcterms:creator",
+        u"#fileDesc#editionStmt#respStmt": u"dcterms:contributor",
+        u"#fileDesc#publicationStmt_publisher": u"dcterms:publisher",
+        u"#profileDesc#creation_when": u"dcterms:date",
+        u"#profileDesc#langUsage_ident": u"dcterms:language",
+        u"#fileDesc#publicationStmt_idno": u"dcterms:identifier",  # Mandatory for Gallica
+        u"#fileDesc#titleStmt_editor_key": u"http://schema.org/editor",
+        u'#fileDesc#publicationStmt#availability#licence': u"dcterms:rights",
+        u"#fileDesc#publicationStmt#availability#licence_": u"dcterms:rights",
+        u"#fileDesc#publicationStmt#licence": u"dcterms:rights",
+    }
+
+    if xml_tag_to_voc.get(header, None):
+        return xml_tag_to_voc.get(header, header)
+
+    if u'#fileDesc#editionStmt#respStmt_' in header:
+        return u"dcterms:contributor"
+
+    return header
+
+
+def iter_tei_documents(corpora, debug_size=None):
+    """
+    The parse stage: reads the documents of the corpora one by one.
+    :param corpora: A dict {corpus tag: corpus location (glob pattern of the TEI files)}
+    :param debug_size: If set, the maximal number of documents read in each corpus
+    :return: A generator of TeiContent
+    """
+    for (corpus_tag, corpus_location) in corpora.items():
+        document_files = glob.glob(corpus_location)
+        for document_file in (document_files[:debug_size] if debug_size else document_files):
+            logging.info(u"Parsing %s" % document_file)
+            yield tcscraper.TeiContent(document_file, corpus_tag)
+
+
+class Sink(object):
+    """
+    A consumer of the parsed documents, run in its own thread: open, write
+    and close are all called in this thread. Documents are shared by all the
+    sinks, and must not be modified.
+    """
+
+    name = u'sink'
+
+    def open(self):
+        """Called before the first document."""
+        pass
+
+    def write(self, document):
+        """Consumes a parsed document (TeiContent)."""
+        raise NotImplementedError
+
+    def close(self):
+        """Called after the last document."""
+        pass
+
+
+class SQLiteSink(Sink):
+    """Saves the documents in a metadata DB (see utils.sqlite_basic)."""
+
+    name = u'sqlite'
+
+    def __init__(self, db_name):
+        self.db_name = db_name
+        self.database = None
+
+    def open(self):
+        # The SQLite connection is created in the thread using it
+        from teiexplorer.utils.sqlite_basic import CorpusSQLiteDBWriter
+        self.database = CorpusSQLiteDBWriter(self.db_name)
+
+    def write(self, document):
+        self.database.add_xml_document(document)
+
+
+class OmekaCSVSink(Sink):
+    """
+    Writes the metadata of the documents in the Omeka-s CSVImport format, in
+    a <corpus tag>.csv file by corpus. The header of a file is only known once
+    all its documents are read: rows are written in temporary files, which
+    are copied after the header when the sink is closed.
+    """
+
+    name = u'omeka_csv'
+
+    def __init__(self, omeka_csv_folder):
+        self.omeka_csv_folder = omeka_csv_folder
+        # For each corpus tag: (CSV header, temporary rows file, rows writer)
+        self._corpora = {}
+
+    def open(self):
+        if not os.path.exists(self.omeka_csv_folder):
+            os.makedirs(self.omeka_csv_folder)
+
+    def write(self, document):
+        corpus_tag = document.document_metadata[u'_tag']
+        if corpus_tag not in self._corpora:
+            rows_file = tempfile.TemporaryFile()
+            self._corpora[corpus_tag] = ([], rows_file, unicodecsv.writer(rows_file, encoding='utf-8'))
+        (csv_header_info, _, rows_writer) = self._corpora[corpus_tag]
+
+        (_, csv_metadata) = document.metadata_to_omeka_compliant_csv(csv_header_info)
+        csv_metadata.insert(0, u"text/xml")
+        rows_writer.writerow(csv_metadata)
+
+    def close(self):
+        for (corpus_tag, (csv_header_info, rows_file, _)) in self._corpora.items():
+            csv_file = u'%s/%s.csv' % (self.omeka_csv_folder, corpus_tag)
+            with open(csv_file, 'wb') as csv_f:
+                csv_writer = unicodecsv.writer(csv_f, encoding='utf-8')
+                csv_header_info = [tei_to_omeka_header(h) for h in csv_header_info]
+                csv_header_info.insert(0, u"dcterms:format")
+                csv_writer.writerow(csv_header_info)
+                rows_file.seek(0)
+                shutil.copyfileobj(rows_file, csv_f)
+            rows_file.close()
+            logging.info(u"Omeka-s CSV file %s written" % csv_file)
+
+
+class JSONLinesSink(Sink):
+    """Writes the metadata of each document as a JSON object by line:
+    {"document": {"_file": ..., "_tag": ...}, "header": {...}}"""
+
+    name = u'json_lines'
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def open(self):
+        self._file = io.open(self.path, 'w', encoding='utf-8')
+
+    def write(self, document):
+        self._file.write(u'%s\n' % json.dumps(
+            {u'document': document.document_metadata, u'header': document.header_metadata},
+            ensure_ascii=False))
+
+    def close(self):
+        self._file.close()
+
+
+class DocumentPipeline(object):
+    """Feeds the documents of a parse stage to sinks, each one consuming them
+    in its own thread, from a bounded queue."""
+
+    def __init__(self, sinks, queue_size=64):
+        """
+        :param sinks: A list of Sink
+        :param queue_size: The maximal number of documents waiting for each sink
+        """
+        self.sinks = sinks
+        self.queue_size = queue_size
+        self._errors = []
+
+    def _consume(self, sink, documents_queue):
+        try:
+            sink.open()
+            while True:
+                document = documents_queue.get()
+                if document is None:
+                    break
+                sink.write(document)
+            sink.close()
+        except Exception as error:
+            logging.exception(u"The %s sink failed" % sink.name)
+            self._errors.append(error)
+            # The queue is drained, so that the parse stage is not blocked
+            while documents_queue.get() is not None:
+                pass
+
+    def run(self, documents):
+        """
+        :param documents: An iterable of parsed documents, e.g. iter_tei_documents(corpora)
+        :return: The number of documents fed to the sinks
+        """
+        self._errors = []
+        queues = [Queue(maxsize=self.queue_size) for _ in self.sinks]
+        threads = [
+            threading.Thread(target=self._consume, args=(sink, documents_queue), name=sink.name)
+            for (sink, documents_queue) in zip(self.sinks, queues)]
+        for thread in threads:
+            thread.start()
+
+        documents_num = 0
+        try:
+            for document in documents:
+                if self._errors:
+                    break
+                for documents_queue in queues:
+                    documents_queue.put(document)
+                documents_num += 1
+        finally:
+            for documents_queue in queues:
+                documents_queue.put(None)
+            for thread in threads:
+                thread.join()
+
+        if self._errors:
+            raise self._errors[0]
+        logging.info(u"%i documents fed to the sinks %s"
+                     % (documents_num, u', '.join(sink.name for sink in self.sinks)))
+        return documents_num
@@ -9,6 +9,12 @@ from teiexplorer.utils.utils import (
     merge_two_dicts,
     flatten_nested_dict_to_pairs
 )
+from teiexplorer.utils.lingutils import (
+    DEFAULT_LANGUAGE,
+    filter_tokens,
+    normalize_language_code
+)
+from teiexplorer.utils.tokenizer import tokenize
 
 #from collections import Counter
 #from nltk.stem.snowball import SnowballStemmer
@@ -24,12 +30,7 @@ class DocumentContent(object):
 
     filePath = None
 
-    document_metadata = {}
-    header_metadata = {}
-    body_metadata = {}
-
     blob = None
-    content_words = []
     
     def __init__(self, document_filepath, corpus_tag, stemming=True, *args, **kwargs):
         """ A generic Document representation which keeps track of
@@ -49,6 +50,13 @@ class DocumentContent(object):
         self.filePath = document_filepath
         self.stemming = stemming
 
+        # Metadata dicts are created by document: class-level dicts would be
+        # shared (and mutated) by all the documents.
+        self.document_metadata = {}
+        self.header_metadata = {}
+        self.body_metadata = {}
+        self.content_words = []
+
         # Additional metadata
         self.document_metadata[u'_file'] = u"%s" % document_filepath
         self.document_metadata[u'_tag'] = u"%s" % corpus_tag
@@ -307,6 +315,26 @@ class TeiContent(DocumentContent):
 
         self.header_metadata = new_dic
 
+    def get_language(self, default=DEFAULT_LANGUAGE):
+        """Returns the (ISO 639-1) language of the document, as declared in the
+        header's <langUsage><language ident="..."> element.
+        :param default: The language returned if the header does not declare any.
+        :return: A language code, e.g. u'fr'."""
+        # Read from the tree: the header metadata drop the empty elements,
+        # such as <language ident="eng"/>
+        if self.etree_root is not None:
+            for language_element in self.etree_root.iterfind(
+                    u'{0}teiHeader//{0}langUsage/{0}language'.format(self.namespace)):
+                language = normalize_language_code(language_element.get(u'ident', u''))
+                if language:
+                    return language
+        for attributes in self.header_metadata.get(u'language', {}).values():
+            for (_, ident) in sorted(attributes.get(u'ident', [])):
+                language = normalize_language_code(ident)
+                if language:
+                    return language
+        return default
+
     #########################
     #  ADDING CONTENT TO TEI
     #########################
@@ -347,6 +375,34 @@ class TeiContent(DocumentContent):
     ######################
     #   CONTENT METRICS
     ######################
+    def get_body_text(self):
+        """Returns the text of the <body> of the XML/TEI document, the text of
+        each element being separated by a space (None if there is no body)."""
+        if self.etree_root is None:
+            return None
+        body = self.etree_root.find(".//%sbody" % self.namespace)
+        if body is None:
+            return None
+        return u' '.join(body.itertext())
+
+    def get_body_tokens(self, lowercase=True, stem=False):
+        """Returns the tokens of the body of the document (see tokenizer.tokenize)."""
+        return tokenize(
+            self.get_body_text(),
+            lowercase=lowercase,
+            stem=stem,
+            lang=self.get_language())
+
+    def get_content_words(self, stem=None):
+        """Returns the content words of the body of the document,
+        lower cased and stemmed if stemming is enabled (see lingutils.filter_tokens).
+        :param stem: Overrides the stemming option of the document."""
+        stem = self.stemming if stem is None else stem
+        return filter_tokens(
+            self.get_body_tokens(lowercase=False),
+            lang=self.get_language(),
+            stem=stem)
+
     # def __get_body_metrics(self):
     #     """Computes various metrics on the text body of the XML/TEI document:
     #         • Number of characters
@@ -487,25 +543,26 @@ class TeiContent(DocumentContent):
         return by_csv_column
 
 
-    # def metadata_to_omeka_compliant_csv(self, headers=[]):
-    #     """
-    #     Returns the metadata in a format which can be read by
-    #     Omeka-s module "CSVImport".
-    #     :return: The updated CSV header, The metadata of the current document in CSV format
-    #     """
-    #
-    #     omeka_metadata = self.__header_to_omeka_dict()
-    #
-    #     # Check that the header is exhaustive
-    #     if headers:
-    #         missing = set(omeka_metadata.keys())-set(headers)
-    #         headers.extend(missing)
-    #     else:
-    #         headers = sorted(omeka_metadata.keys())
-    #
-    #     header_sorted_omeka_metadata = [omeka_metadata.get(h, None) for h in headers]
-    #
-    #     return headers, header_sorted_omeka_metadata
+    def metadata_to_omeka_compliant_csv(self, headers=None):
+        """
+        Returns the metadata in a format which can be read by
+        Omeka-s module "CSVImport".
+        :param headers: The CSV header of the previous documents, extended in place
+                        with the columns of the current document.
+        :return: The updated CSV header, The metadata of the current document in CSV format
+        """
+
+        omeka_metadata = self.header_to_omeka_dict()
+
+        # Check that the header is exhaustive
+        if headers is not None:
+            headers.extend(sorted(set(omeka_metadata.keys()) - set(headers)))
+        else:
+            headers = sorted(omeka_metadata.keys())
+
+        header_sorted_omeka_metadata = [omeka_metadata.get(h, None) for h in headers]
+
+        return headers, header_sorted_omeka_metadata
 
 
 
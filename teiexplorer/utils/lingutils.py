@@ -4,39 +4,135 @@ import re
 import unidecode
 from unicodedata import normalize
 
-from pylru import lrudecorator
+from .memoize import memoized
+from .stopwords import STOPWORDS
 
 # --- String Normalization --- #
 
+@memoized(capacity=10000)
 def normalize_str(s):
     """ Remove leading and trailing and multiple whitspaces from a string s.
 
     :param s: a string or unicode
     :return: the unicode normalised version of s
     """
-    if isinstance(s, str):
-        s = unicode(s.strip(), 'utf-8')
+    if isinstance(s, bytes):
+        s = s.strip().decode('utf-8')
     else:
         s = s.strip()
     s = normalize('NFC', s)
     return u' '.join(s.split())
 
 
+# ---- Languages ---- #
+
+DEFAULT_LANGUAGE = u'fr'
+
+# ISO 639-2 (as found in <langUsage><language ident="...">) to ISO 639-1
+LANGUAGE_CODES = {
+    u'fre': u'fr',
+    u'fra': u'fr',
+    u'frm': u'fr',  # Middle French
+    u'fro': u'fr',  # Old French
+    u'eng': u'en',
+    u'lat': u'la',
+}
+
+# Languages handled by nltk's SnowballStemmer
+SNOWBALL_LANGUAGES = {
+    u'fr': u'french',
+    u'en': u'english',
+}
+
+
+def normalize_language_code(ident):
+    """ Normalises a language identifier to its ISO 639-1 code.
+    :Example:
+    >>> normalize_language_code(u'fre')
+    >>> u'fr'
+    >>> normalize_language_code(u'fr-FR')
+    >>> u'fr'
+    :param ident: a language identifier (ISO 639-1, ISO 639-2 or BCP 47)
+    :return: the language code, or None if ident is empty
+    """
+    if not ident:
+        return None
+    code = ident.strip().lower().replace(u'_', u'-').split(u'-')[0]
+    return LANGUAGE_CODES.get(code, code)
+
+
+def get_stopwords(lang=DEFAULT_LANGUAGE):
+    """:return: The frozen set of stopwords of the language (empty if unknown)."""
+    return STOPWORDS.get(normalize_language_code(lang), frozenset())
+
+
+# Backward compatibility: the French stopwords
+stoplist = STOPWORDS[DEFAULT_LANGUAGE]
+
+_STEMMERS = {}
+
+
+def get_stemmer(lang=DEFAULT_LANGUAGE):
+    """
+    Returns a memoized stemming function for a language.
+    The cache of language xx is named stem_xx (see memoize.configure_caches).
+    Languages unknown to the Snowball stemmer are not stemmed.
+    :param lang: a language identifier
+    :return: a function word -> stem
+    """
+    lang = normalize_language_code(lang) or DEFAULT_LANGUAGE
+    stemmer = _STEMMERS.get(lang)
+    if stemmer is None:
+        snowball_language = SNOWBALL_LANGUAGES.get(lang)
+        if snowball_language:
+            from nltk.stem.snowball import SnowballStemmer
+            stem = SnowballStemmer(snowball_language).stem
+        else:
+            stem = lambda word: word
+        stemmer = memoized(name=u'stem_%s' % lang, capacity=50000)(stem)
+        _STEMMERS[lang] = stemmer
+    return stemmer
+
+
 # ---- Crappy Termhood Approximation ---- #
-def is_content_word(word):
+def is_content_word(word, lang=DEFAULT_LANGUAGE):
     """
     A baseline function for approximating if a word
     is a content word
     :param word:
+    :param lang: the language of the word
     :return: True if word is a content word, False otherwise.
     """
     if word.isalpha():
         if len(word) > 2:
-            if word.lower() not in stoplist:
+            if word.lower() not in get_stopwords(lang):
                 return True
     return False
 
 
+def filter_tokens(tokens, lang=DEFAULT_LANGUAGE, stem=False):
+    """
+    Keeps the content words (see is_content_word) of a list of tokens,
+    lower cased and optionally stemmed.
+    :Example:
+    >>> filter_tokens([u'Le', u'chat', u'dort', u'sur', u'la', u'table', u'.'])
+    >>> [u'chat', u'dort', u'table']
+    :param tokens: an iterable of tokens
+    :param lang: the language of the tokens
+    :param stem: if True, the content words are stemmed
+    :return: the list of normalised content words
+    """
+    stopwords = get_stopwords(lang)
+    stemmer = get_stemmer(lang) if stem else None
+    content_words = []
+    for token in tokens:
+        if len(token) > 2 and token.isalpha():
+            word = token.lower()
+            if word not in stopwords:
+                content_words.append(stemmer(word) if stemmer else word)
+    return content_words
+
+
 # ----  Person  ---- #
 
 ALPHA_TOKEN = re.compile('\w+', re.UNICODE)
@@ -46,7 +142,7 @@ name_stopwords = [u'mme', u'madame', u'monsieur',
                   u'abb[ée]', u'm. de', u'comte de', u'prince']
 NAME_STOPWORDS_RE = re.compile(u" +| +".join(name_stopwords), re.IGNORECASE)
 
-@lrudecorator(100)
+@memoized(capacity=1000)
 def get_name_initials(name):
     """
     Returns the initials of a given name.
@@ -71,6 +167,22 @@ PERSON_WITHOUT_COMMA_RE = re.compile('(?P<first_name_or_initials>.*\s(de)?)?\s+'
                                      re.IGNORECASE)
 
 
+def normalize_last_name(last_name):
+    """ Ascii, lower case and letters only version of a last name,
+    used in the author fingerprints.
+    :Example:
+    >>> normalize_last_name(u'Pellisson-Fontanier')
+    >>> u'pellissonfontanier'
+    :param last_name: a last name
+    :return: the normalised last name
+    """
+    return u''.join(filter(
+        str.isalpha,
+        str.lower(unidecode.unidecode(last_name or u''))
+    ))
+
+
+@memoized(capacity=10000)
 def parse_person(value):
     """ Parse a person information
     :param value:
@@ -94,18 +206,92 @@ def parse_person(value):
         first_name = parsed.get('first_name_or_initials', u'')
         first_name_initials = get_name_initials(first_name) if len(first_name) > 0 else u''
         last_name = parsed.get('last_name', u'')
-        last_name_normalised = filter(
-            str.isalpha,
-            str.lower(unidecode.unidecode(last_name))
-        )
 
         parsed['fingerprint'] = u"%s%s" % (
-            last_name_normalised,
+            normalize_last_name(last_name),
             first_name_initials
         )
     return parsed
 
 
+def _extract_unique(values, regex):
+    """ Applies regex.search on the distinct values of a sequence, with pandas' str.extract.
+    :return: (the values as a pandas Series, the extracted groups indexed by distinct value)
+    """
+    import pandas as pd
+
+    values = pd.Series(values, dtype=object)
+    uniques = pd.Series(
+        [v for v in values.dropna().unique() if isinstance(v, str)],
+        dtype=object)
+    extracted = uniques.str.extract(regex.pattern, flags=regex.flags, expand=True)
+    extracted.index = uniques.values
+    return values, extracted
+
+
+def _align_on_values(values, extracted):
+    """ Reindexes the groups extracted from distinct values on the original values,
+    replacing missing information by None."""
+    result = extracted.reindex(values.values)
+    result.index = values.index
+    return result.astype(object).where(result.notna(), None)
+
+
+def parse_person_batch(values):
+    """ Columnar version of parse_person, for a sequence (or pandas Series)
+    of person strings. Identical strings are parsed only once.
+    :Example:
+    >>> parse_person_batch([u'Ronsard, Pierre de (1524-1585)', None])
+    >>>   last_name first_name_or_initials birth death fingerprint
+    >>> 0   Ronsard              Pierre de  1524  1585    ronsardp
+    >>> 1      None                   None  None  None        None
+    :param values: The person strings
+    :return: A pandas DataFrame, aligned on values, with the columns
+             last_name, first_name_or_initials, birth, death, fingerprint.
+    """
+    values, parsed = _extract_unique(values, PERSON_WITH_COMMA_RE)
+
+    first_names = parsed['first_name_or_initials'].fillna(u'')
+    first_name_initials = first_names.map(
+        lambda first_name: get_name_initials(first_name) if len(first_name) > 0 else u'')
+    parsed['fingerprint'] = \
+        parsed['last_name'].fillna(u'').map(normalize_last_name) + first_name_initials
+
+    return _align_on_values(values, parsed)
+
+
+def parse_year_date_batch(values):
+    """ Columnar version of parse_year_date, for a sequence (or pandas Series)
+    of year dates. Identical strings are parsed only once.
+    :param values: The year dates
+    :return: A pandas DataFrame, aligned on values, with the columns raw_before,
+             millennium, century, decade, year, raw_after and deduced_date.
+             Unparsable dates have None everywhere, unknown digits are -1.
+    """
+    import pandas as pd
+
+    values, parsed = _extract_unique(values, DATE_RE)
+    is_parsed = parsed['millennium'].notna()
+
+    for k in ['raw_before', 'raw_after']:
+        parsed[k] = parsed[k].where(parsed[k].fillna(u'').str.len() > 0)
+
+    digits = ['millennium', 'century', 'decade', 'year']
+    for k in digits:
+        is_num = parsed[k].fillna(u'').str.match(IS_NUM.pattern)
+        parsed[k] = pd.to_numeric(parsed[k].where(is_num), errors='coerce')\
+            .fillna(-1).astype(int).astype(object).where(is_parsed, None)
+
+    is_deducible = is_parsed & (parsed['decade'] >= 0) & (parsed['year'] >= 0)
+    deduced = parsed.loc[is_deducible, digits].astype(int).astype(str)
+    parsed['deduced_date'] = pd.Series(dtype=object, index=parsed.index)
+    if len(deduced):
+        parsed.loc[is_deducible, 'deduced_date'] = \
+            deduced.apply(lambda r: u''.join(r), axis=1).astype(int)
+
+    return _align_on_values(values, parsed)
+
+
 # ----  Date  ---- #
 DATE_RE = re.compile(
     '(?P<raw_before>[A-Za-z,\- ]*)'
@@ -118,6 +304,7 @@ DATE_RE = re.compile(
 IS_NUM = re.compile('[0-9]')
 
 
+@memoized(capacity=10000)
 def parse_year_date(value):
     """ Parse a year date
     :param value: A year date
@@ -139,261 +326,3 @@ def parse_year_date(value):
                              parsed['decade'],
                              parsed['year']))
     return parsed
-
-
-# French only atm - TODO: allow other languages
-stoplist = [
-    u'ai',
-    u'aie',
-    u'aient',
-    u'aies',
-    u'ait',
-    u'alors',
-    u'après',
-    u'as',
-    u'au',
-    u'aucuns',
-    u'aura',
-    u'aurai',
-    u'auraient',
-    u'aurais',
-    u'aurait',
-    u'auras',
-    u'aurez',
-    u'auriez',
-    u'aurions',
-    u'aurons',
-    u'auront',
-    u'aussi',
-    u'autre',
-    u'aux',
-    u'avaient',
-    u'avais',
-    u'avait',
-    u'avant',
-    u'avec',
-    u'avez',
-    u'aviez',
-    u'avions',
-    u'avoir',
-    u'avons',
-    u'ayant',
-    u'ayez',
-    u'ayons',
-    u'bon',
-    u'bons',
-    u'bien',
-    u'biens',
-    u'c',
-    u'car',
-    u'ce',
-    u'ceci',
-    u'cela',
-    u'celà',
-    u'celà',
-    u'ces',
-    u'cet',
-    u'cette',
-    u'ceux',
-    u'chaque',
-    u'chapitre',
-    u'chapitres',
-    u'ci',
-    u'comme',
-    u'comment',
-    u'd',
-    u'dans',
-    u'de',
-    u'dedans',
-    u'dehors',
-    u'depuis',
-    u'des',
-    u'deux',
-    u'devrait',
-    u'doit',
-    u'donc',
-    u'dont',
-    u'dos',
-    u'droite',
-    u'du',
-    u'début',
-    u'elle',
-    u'elles',
-    u'en',
-    u'encore',
-    u'entre',
-    u'es',
-    u'essai',
-    u'est',
-    u'estre',
-    u'et',
-    u'eu',
-    u'eue',
-    u'eues',
-    u'eurent',
-    u'eus',
-    u'eusse',
-    u'eussent',
-    u'eusses',
-    u'eussiez',
-    u'eussions',
-    u'eut',
-    u'eux',
-    u'eûmes',
-    u'eût',
-    u'eûtes',
-    u'faire',
-    u'fait',
-    u'faites',
-    u'fois',
-    u'font',
-    u'force',
-    u'furent',
-    u'fus',
-    u'fusse',
-    u'fussent',
-    u'fusses',
-    u'fussiez',
-    u'fussions',
-    u'fut',
-    u'fûmes',
-    u'fût',
-    u'fûtes',
-    u'haut',
-    u'hors',
-    u'ici',
-    u'il',
-    u'ils',
-    u'j',
-    u'je',
-    u'juste',
-    u'l',
-    u'la',
-    u'le',
-    u'les',
-    u'leur',
-    u'leurs',
-    u'lui',
-    u'là',
-    u'm',
-    u'ma',
-    u'maintenant',
-    u'mais',
-    u'me',
-    u'mes',
-    u'mine',
-    u'moi',
-    u'moins',
-    u'mon',
-    u'mot',
-    u'même',
-    u'n',
-    u'nbsp',
-    u'ne',
-    u'ni',
-    u'nommés',
-    u'nos',
-    u'notre',
-    u'nous',
-    u'nouveaux',
-    u'on',
-    u'ont',
-    u'ou',
-    u'où',
-    u'page',
-    u'pages',
-    u'par',
-    u'parce',
-    u'parole',
-    u'pas',
-    u'personnes',
-    u'peu',
-    u'peut',
-    u'pièce',
-    u'plus',
-    u'plupart',
-    u'pour',
-    u'pourquoi',
-    u'qu',
-    u'quand',
-    u'que',
-    u'quel',
-    u'quelle',
-    u'quelles',
-    u'quels',
-    u'qui',
-    u's',
-    u'sa',
-    u'sans',
-    u'se',
-    u'sera',
-    u'serai',
-    u'seraient',
-    u'serais',
-    u'serait',
-    u'seras',
-    u'serez',
-    u'seriez',
-    u'serions',
-    u'serons',
-    u'seront',
-    u'ses',
-    u'seulement',
-    u'si',
-    u'sien',
-    u'soi',
-    u'soient',
-    u'sois',
-    u'soit',
-    u'sommes',
-    u'son',
-    u'sont',
-    u'sous',
-    u'soyez',
-    u'soyons',
-    u'suis',
-    u'sujet',
-    u'sur',
-    u't',
-    u'ta',
-    u'tandis',
-    u'te',
-    u'tellement',
-    u'tels',
-    u'tes',
-    u'toi',
-    u'ton',
-    u'tous',
-    u'tout',
-    u'toute',
-    u'trop',
-    u'très',
-    u'tu',
-    u'un',
-    u'une',
-    u'valeur',
-    u'voie',
-    u'voient',
-    u'vont',
-    u'vos',
-    u'vostre',
-    u'votre',
-    u'vous',
-    u'vu',
-    u'y',
-    u'à',
-    u'ça',
-    u'étaient',
-    u'étais',
-    u'était',
-    u'étant',
-    u'état',
-    u'étiez',
-    u'étions',
-    u'été',
-    u'étée',
-    u'étées',
-    u'étés',
-    u'êtes',
-    u'être',
-]
\ No newline at end of file
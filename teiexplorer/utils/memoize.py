@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+memoize is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+"""
+
+import json
+import logging
+from copy import copy
+from functools import update_wrapper
+
+from pylru import lrucache
+
+DEFAULT_CACHE_SIZE = 1000
+
+# All the memoized functions, by name.
+_MEMOIZED_FUNCTIONS = {}
+
+
+class MemoizedFunction(object):
+    """
+    A function whose results are kept in a LRU cache of a given capacity,
+    and which counts its cache hits, misses and evictions.
+    Dict results are returned as (shallow) copies, so that callers updating
+    them do not alter the cached value.
+    """
+
+    def __init__(self, function, name, capacity=DEFAULT_CACHE_SIZE):
+        update_wrapper(self, function)
+        self.function = function
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._cache = lrucache(capacity, self._on_eviction)
+
+    def _on_eviction(self, key, value):
+        self.evictions += 1
+
+    def __call__(self, *args):
+        try:
+            value = self._cache[args]
+            self.hits += 1
+        except KeyError:
+            self.misses += 1
+            value = self.function(*args)
+            self._cache[args] = value
+        except TypeError:
+            # Unhashable arguments: no caching
+            return self.function(*args)
+        return copy(value) if isinstance(value, dict) else value
+
+    def resize(self, capacity):
+        self._cache.size(capacity)
+
+    def clear(self):
+        self._cache.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def statistics(self):
+        calls = self.hits + self.misses
+        return {
+            u'name': self.name,
+            u'capacity': self._cache.size(),
+            u'size': len(self._cache),
+            u'hits': self.hits,
+            u'misses': self.misses,
+            u'evictions': self.evictions,
+            u'hit_ratio': round(float(self.hits) / calls, 3) if calls else 0.0,
+        }
+
+
+def memoized(name=None, capacity=DEFAULT_CACHE_SIZE):
+    """
+    Decorator memoizing a function (with hashable positional arguments)
+    in a named, configurable and instrumented LRU cache.
+
+    :Example:
+    >>> @memoized(capacity=10000)
+    >>> def normalize_str(s):
+    >>>     ...
+    >>> configure_caches({u'normalize_str': 50000})
+    :param name: The name of the cache, used in configuration and statistics.
+                 Defaults to the function name.
+    :param capacity: The default number of results kept in the cache.
+    """
+    def decorator(function):
+        memoized_function = MemoizedFunction(function, name or function.__name__, capacity)
+        _MEMOIZED_FUNCTIONS[memoized_function.name] = memoized_function
+        return memoized_function
+    return decorator
+
+
+def configure_caches(cache_sizes):
+    """
+    Sets the capacities of the caches.
+    :param cache_sizes: A dict {cache name: capacity}, e.g. the "caches"/"sizes"
+                        entry of the configuration file.
+    """
+    for name, capacity in (cache_sizes or {}).items():
+        memoized_function = _MEMOIZED_FUNCTIONS.get(name)
+        if memoized_function is None:
+            logging.warning(u"Ignoring the size of unknown cache %s" % name)
+            continue
+        memoized_function.resize(int(capacity))
+
+
+def warm_up_cache(name, values):
+    """
+    Fills a cache by calling its function on each value.
+    :param name: The name of the cache
+    :param values: An iterable of (single argument) values
+    :return: The number of values processed
+    """
+    memoized_function = _MEMOIZED_FUNCTIONS[name]
+    count = 0
+    for value in values:
+        if value:
+            memoized_function(value)
+            count += 1
+    logging.debug(u"Cache %s warmed up with %i values" % (name, count))
+    return count
+
+
+def cache_statistics():
+    """:return: The statistics of all the caches, by cache name."""
+    return {
+        name: memoized_function.statistics()
+        for (name, memoized_function) in _MEMOIZED_FUNCTIONS.items()
+    }
+
+
+def report_cache_statistics(metrics_endpoint=None):
+    """
+    Logs the statistics of all the caches and, if a metrics endpoint URL
+    is given, POSTs them to it as JSON.
+    :param metrics_endpoint: An HTTP(S) URL, e.g. the "caches"/"metrics_endpoint"
+                             entry of the configuration file.
+    """
+    statistics = cache_statistics()
+    for name in sorted(statistics):
+        logging.info(
+            u"Cache %(name)s: %(hits)i hits, %(misses)i misses, %(evictions)i evictions "
+            u"(%(size)i/%(capacity)i entries, hit ratio %(hit_ratio).3f)" % statistics[name])
+
+    if metrics_endpoint:
+        try:
+            from urllib.request import Request, urlopen
+        except ImportError:
+            from urllib2 import Request, urlopen
+
+        request = Request(
+            metrics_endpoint,
+            data=json.dumps({u'caches': statistics}).encode('utf-8'),
+            headers={'Content-Type': 'application/json'})
+        try:
+            urlopen(request, timeout=10).close()
+        except Exception as e:
+            logging.warning(u"Could not report cache statistics to %s: %s" % (metrics_endpoint, e))
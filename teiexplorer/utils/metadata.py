@@ -7,11 +7,14 @@ Author: Valérie Hanoka
 """
 
 import io
+import logging
 
-def load_tsv_dewey(dewey_filepath):
+
+def iter_tsv_dewey(dewey_filepath):
     """
-    Parses a correspondance files between documents' Ark ids and Dewey codes.
+    Streams a correspondance files between documents' Ark ids and Dewey codes.
     This file must contain at least 2 columns: Ark id and Dewey numeric class code and/or Dewey class text.
+    Malformed lines (no Ark id or no Dewey information) are logged and skipped.
 
     :Exemple: of a TSV Dewey mapping file:
 
@@ -20,13 +23,16 @@ def load_tsv_dewey(dewey_filepath):
     cb34153359b\t900\tGéographie, histoire, sciences auxiliaires de l'histoire
 
     :param dewey_filepath:
-    :return:
+    :return: An iterator over (ark, [dewey_code, dewey_text, ...]) pairs.
     """
 
-    deweys = None
     with io.open(dewey_filepath, mode='r', encoding="utf-8") as dewey_file:
-        deweys_lines = [row.split('\t') for row in dewey_file.readlines()]
-        deweys = {row[0]: row[1:] for row in deweys_lines}
-
-    return deweys
-
+        for line_number, line in enumerate(dewey_file, 1):
+            row = [field.strip() for field in line.split(u'\t')]
+            ark = row[0]
+            dewey_info = [field for field in row[1:] if field]
+            if not (ark and dewey_info):
+                if line.strip():
+                    logging.warning(u"Ignoring malformed Dewey line %i in %s" % (line_number, dewey_filepath))
+                continue
+            yield ark, dewey_info
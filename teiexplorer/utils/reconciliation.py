@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+reconciliation is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+"""
+
+import logging
+import re
+from collections import defaultdict
+
+from .lingutils import (
+    get_name_initials,
+    normalize_last_name
+)
+
+
+YEAR_RE = re.compile(u'^[0-9][0-9][0-9.][0-9.]$')
+
+
+def are_years_compatible(year_a, year_b):
+    """ Compares two (possibly partial) years, as stored in the person table.
+    u"16.." is compatible with u"1624", but not with u"1585".
+    :return: True if they agree, False if they contradict each other, None if unknown.
+    """
+    year_a = (u'%s' % year_a).strip() if year_a else u''
+    year_b = (u'%s' % year_b).strip() if year_b else u''
+    if not (YEAR_RE.match(year_a) and YEAR_RE.match(year_b)):
+        return None
+    return all(a == b or u'.' in (a, b) for (a, b) in zip(year_a, year_b))
+
+
+class _UnionFind(object):
+    """ Union-find over the integers [0, size[, with path halving. """
+
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, i):
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(self, i, j):
+        root_i, root_j = self.find(i), self.find(j)
+        if root_i != root_j:
+            self.parent[max(root_i, root_j)] = min(root_i, root_j)
+
+
+class AuthorReconciler(object):
+    """
+    Corpus-wide reconciliation of the rows of the person table.
+
+    Persons are first grouped in blocks sharing the same normalised last name
+    and first initial. Only the persons of a same block are compared, and
+    identical profiles (initials, birth, death, BnF key) are compared once,
+    so that the whole process is near-linear in the number of person rows.
+    Two profiles of a block are put in the same cluster when their score
+    reaches MATCH_THRESHOLD:
+        - a shared BnF 'key' is a match, two different keys are not;
+        - contradictory birth or death years are not a match;
+        - otherwise, the score increases with initials and years agreement.
+    Matches are applied from the best scored to the worst, and two clusters
+    are never merged if their keys or years contradict each other (so that
+    "Diderot, D." cannot bridge two different Diderot).
+    Clusters are saved in the person_cluster table.
+    """
+
+    MATCH_THRESHOLD = 0.7
+    BLOCK_SCORE = 0.4
+    SAME_INITIALS_SCORE = 0.3
+    PREFIX_INITIALS_SCORE = 0.15
+    SAME_YEARS_SCORE = 0.3
+
+    def __init__(self, db):
+        """
+        :param db: A dataset connection to the metadata DB.
+        """
+        self.db = db
+
+    def _read_profiles(self):
+        """ Reads the person table and groups the person ids by profile.
+        :return: A dict {block: {profile: [person_id, ...]}}
+        """
+        blocks = defaultdict(lambda: defaultdict(list))
+        for person in self.db['person'].all():
+            last_name = normalize_last_name(person.get('last_name'))
+            if not last_name:
+                continue
+            first_name = (person.get('first_name_or_initials') or u'').strip()
+            initials = get_name_initials(first_name) if first_name else u''
+            profile = (
+                initials,
+                (person.get('birth') or u'').strip(),
+                (person.get('death') or u'').strip(),
+                (u'%s' % (person.get('key') or u'')).strip(),
+            )
+            blocks[(last_name, initials[:1])][profile].append(person['id'])
+
+        # Persons without first name are attached to the only block
+        # of their last name, if it is not ambiguous.
+        initials_by_last_name = defaultdict(list)
+        for (last_name, initial) in blocks:
+            if initial:
+                initials_by_last_name[last_name].append(initial)
+        for last_name, initials in initials_by_last_name.items():
+            if len(initials) == 1 and (last_name, u'') in blocks:
+                for profile, ids in blocks.pop((last_name, u'')).items():
+                    blocks[(last_name, initials[0])][profile].extend(ids)
+
+        return blocks
+
+    def score(self, profile_a, profile_b):
+        """ Similarity score of two profiles (initials, birth, death, key) of a same block. """
+        (initials_a, birth_a, death_a, key_a) = profile_a
+        (initials_b, birth_b, death_b, key_b) = profile_b
+
+        if key_a and key_b:
+            return 1.0 if key_a == key_b else 0.0
+
+        years = [are_years_compatible(birth_a, birth_b), are_years_compatible(death_a, death_b)]
+        if False in years:
+            return 0.0
+
+        score = self.BLOCK_SCORE
+        if initials_a == initials_b:
+            score += self.SAME_INITIALS_SCORE
+        elif initials_a.startswith(initials_b) or initials_b.startswith(initials_a):
+            score += self.PREFIX_INITIALS_SCORE
+        if True in years:
+            score += self.SAME_YEARS_SCORE
+        return score
+
+    @staticmethod
+    def _are_clusters_compatible(profiles_a, profiles_b):
+        """ True if no profile of a cluster contradicts a profile of the other one. """
+        keys = set(key for (_, _, _, key) in profiles_a + profiles_b if key)
+        if len(keys) > 1:
+            return False
+        for (_, birth_a, death_a, _) in profiles_a:
+            for (_, birth_b, death_b, _) in profiles_b:
+                if are_years_compatible(birth_a, birth_b) is False \
+                        or are_years_compatible(death_a, death_b) is False:
+                    return False
+        return True
+
+    def clusters(self):
+        """
+        Computes the person clusters.
+        :return: A list of dicts {person_id, cluster_id, block}, where
+                 cluster_id is the smallest person id of the cluster.
+        """
+        rows = []
+        for (last_name, initial), profiles_ids in self._read_profiles().items():
+            profiles = list(profiles_ids.keys())
+            matches = []
+            for i in range(len(profiles)):
+                for j in range(i + 1, len(profiles)):
+                    score = self.score(profiles[i], profiles[j])
+                    if score >= self.MATCH_THRESHOLD:
+                        matches.append((score, i, j))
+
+            union_find = _UnionFind(len(profiles))
+            cluster_profiles = {i: [profile] for i, profile in enumerate(profiles)}
+            for (_, i, j) in sorted(matches, key=lambda m: -m[0]):
+                root_i, root_j = union_find.find(i), union_find.find(j)
+                if root_i == root_j or not self._are_clusters_compatible(
+                        cluster_profiles[root_i], cluster_profiles[root_j]):
+                    continue
+                union_find.union(root_i, root_j)
+                merged = cluster_profiles.pop(root_i) + cluster_profiles.pop(root_j)
+                cluster_profiles[union_find.find(root_i)] = merged
+
+            members = defaultdict(list)
+            for i, profile in enumerate(profiles):
+                members[union_find.find(i)].extend(profiles_ids[profile])
+
+            block = u'%s%s' % (last_name, initial)
+            for person_ids in members.values():
+                cluster_id = min(person_ids)
+                rows.extend({u'person_id': person_id, u'cluster_id': cluster_id, u'block': block}
+                            for person_id in person_ids)
+        return rows
+
+    def save_clusters(self, batch_size=1000):
+        """ Computes the person clusters and (re)writes the person_cluster table.
+        :return: The number of clusters."""
+        rows = self.clusters()
+
+        if u'person_cluster' in self.db.tables:
+            cluster_table = self.db['person_cluster']
+        else:
+            cluster_table = self.db.create_table(u'person_cluster',
+                                                 primary_id=u'person_id',
+                                                 primary_type=self.db.types.integer)
+        with self.db:
+            cluster_table.delete()
+            cluster_table.insert_many(rows, chunk_size=batch_size)
+        cluster_table.create_index([u'cluster_id'])
+
+        clusters_num = len(set(row[u'cluster_id'] for row in rows))
+        logging.info(u"%i persons reconciled in %i clusters." % (len(rows), clusters_num))
+        return clusters_num
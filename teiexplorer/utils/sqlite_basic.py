@@ -8,19 +8,31 @@ Author: Valérie Hanoka
 
 import logging
 import dataset
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
 from .utils import (
     merge_two_dicts
 )
 from .lingutils import (
     normalize_str,
     parse_year_date,
-    parse_person
+    parse_year_date_batch,
+    parse_person,
+    parse_person_batch
 )
 
 from .metadata import (
-    load_tsv_dewey
+    iter_tsv_dewey
 )
+from .memoize import (
+    warm_up_cache
+)
+from .reconciliation import (
+    AuthorReconciler
+)
+from collections import defaultdict
 from copy import deepcopy
+from itertools import islice
 
 from pylru import lrudecorator
 import math
@@ -32,6 +44,79 @@ import csv
 import io
 
 
+# Full-text index over the searchable metadata of each document.
+# The unicode61 tokenizer folds case and (with remove_diacritics 2)
+# diacritics, so that "Academie" matches "Académie".
+SEARCH_INDEX_TABLE = u'document_search'
+SEARCH_INDEX_COLUMNS = [u'title', u'author', u'fingerprint', u'identifier']
+SEARCH_INDEX_DDL = (
+    u'CREATE VIRTUAL TABLE IF NOT EXISTS %s USING fts5('
+    u'document_id UNINDEXED, %s, '
+    u'tokenize="unicode61 remove_diacritics 2")' % (
+        SEARCH_INDEX_TABLE,
+        u', '.join(SEARCH_INDEX_COLUMNS)))
+SEARCH_INDEX_INSERT = u'INSERT INTO %s (rowid, document_id, %s) VALUES (:rowid, :document_id, %s)' % (
+    SEARCH_INDEX_TABLE,
+    u', '.join(SEARCH_INDEX_COLUMNS),
+    u', '.join(u':%s' % c for c in SEARCH_INDEX_COLUMNS))
+
+SEARCH_OPERATORS = {u'AND', u'OR', u'NOT'}
+
+
+def search_expression(query):
+    """
+    Transforms a user query into an FTS5 query expression. Each term is
+    quoted as an FTS5 string, so that punctuation (hyphens, apostrophes...)
+    is handled by the tokenizer instead of the FTS5 query syntax:
+    u"Saint-Simon" matches the phrase "saint simon". The AND, OR and NOT
+    operators, the column filters on SEARCH_INDEX_COLUMNS (u'title:oeuvres')
+    and the prefix queries (u'ronsa*') are kept.
+
+    :Example:
+    >>> search_expression(u'title:Saint-Simon OR ronsa*')
+    >>> u'title:"Saint-Simon" OR "ronsa"*'
+    :param query: A user query
+    :return: An FTS5 query expression
+    """
+    terms = []
+    for term in normalize_str(query).split():
+        if term in SEARCH_OPERATORS:
+            terms.append(term)
+            continue
+        column = u''
+        (prefix, _, rest) = term.partition(u':')
+        if rest and prefix in SEARCH_INDEX_COLUMNS:
+            (column, term) = (u'%s:' % prefix, rest)
+        star = u'*' if term.endswith(u'*') else u''
+        term = term.rstrip(u'*')
+        if term:
+            terms.append(u'%s"%s"%s' % (column, term.replace(u'"', u'""'), star))
+    # Operators without operands are not valid FTS5 expressions
+    while terms and terms[0] in SEARCH_OPERATORS:
+        terms.pop(0)
+    while terms and terms[-1] in SEARCH_OPERATORS:
+        terms.pop()
+    return u' '.join(terms)
+
+
+def warm_up_caches(db):
+    """
+    Fills the caches of the lingutils normalizers with the raw values
+    already stored in a metadata DB (persons, dates and titles), so that
+    normalizing them again only costs a cache lookup.
+    :param db: A dataset connection to the metadata DB.
+    """
+    logging.info(u"Warming up the normalizers caches.")
+    if u'person' in db.tables and db['person'].has_column(u'author'):
+        warm_up_cache(u'parse_person', (p[u'author'] for p in db['person'].distinct(u'author')))
+    if u'date' in db.tables:
+        date_table = db['date']
+        for column in [u'when', u'date']:
+            if date_table.has_column(column):
+                warm_up_cache(u'parse_year_date', (d[column] for d in date_table.distinct(column)))
+    if u'title' in db.tables and db['title'].has_column(u'title'):
+        warm_up_cache(u'normalize_str', (t[u'title'] for t in db['title'].distinct(u'title')))
+
 
 class CorpusSQLiteDBWriter(object):
     """
@@ -80,7 +165,10 @@ class CorpusSQLiteDBWriter(object):
             self.title_table = self.db['title']
             self.document_has_title_table = self.db['documentHasTitle']
 
-
+        with self.db:
+            self.db.query(SEARCH_INDEX_DDL)
+        if u'document' in self.db.tables and not self._search_index_is_keyed():
+            self.rebuild_search_index()
 
     def get_ordered_metadata_attributes(self, attribute_dict):
         """
@@ -121,11 +209,13 @@ class CorpusSQLiteDBWriter(object):
 
     def _insert_document_row(self, doc):
         """Add the current document in the document_table"""
+        # The document is not modified: it may be read by other sinks at the same time
+        document_row = dict(doc.document_metadata)
         ark_id_dict = doc.header_metadata.get('ark')
         if ark_id_dict:
             _, ark_id = list(ark_id_dict.values()).pop().get('ark')[0]
-            doc.document_metadata['ark'] = ark_id
-        return self.document_table.insert(doc.document_metadata)
+            document_row['ark'] = ark_id
+        return self.document_table.insert(document_row)
         # TODO : Body parsing information
 
 
@@ -147,7 +237,8 @@ class CorpusSQLiteDBWriter(object):
     ):
         """Add the current document's item in the following tables:
             - item_table
-            - documentHasItem_table"""
+            - documentHasItem_table
+        :return: The list of the (modified) item rows linked to the document."""
 
         if not (item
                 and base_table is not None
@@ -170,9 +261,10 @@ class CorpusSQLiteDBWriter(object):
                              )
                              )
 
+        linked_rows = []
         item_unordered_info = doc_info.header_metadata.get(item, None)
         if not item_unordered_info:
-            return
+            return linked_rows
         item_info = self.get_ordered_metadata_attributes(item_unordered_info)
         for (from_xml_element, rows) in item_info.items():
             for row_number, row_info in rows.items():
@@ -188,7 +280,9 @@ class CorpusSQLiteDBWriter(object):
                     'from_xml_element': from_xml_element
                 }
                 self._get_or_create_row(doc_has_item_info, relational_table)
+                linked_rows.append(row_info)
 
+        return linked_rows
 
     # ----  Transforming Information for table modification  ----#
 
@@ -227,6 +321,318 @@ class CorpusSQLiteDBWriter(object):
                 authors_info.append(author_row_info)
             return authors_info
 
+    def _index_document(self, doc_id, titles, authors, identifiers):
+        """(Re)writes the full-text search entry of a document from the rows
+        which were just linked to it."""
+
+        entry = self._search_entry(doc_id, titles, authors, identifiers)
+
+        # The entry of a document is keyed by the rowid of the document row:
+        # document_id is UNINDEXED, filtering on it would scan the whole index.
+        with self.db:
+            entry[u'rowid'] = self._document_rowid(doc_id)
+            self.db.query(
+                u'DELETE FROM %s WHERE rowid = :rowid' % SEARCH_INDEX_TABLE,
+                rowid=entry[u'rowid'])
+            self.db.query(SEARCH_INDEX_INSERT, **entry)
+
+    @staticmethod
+    def _search_entry(doc_id, titles, authors, identifiers):
+        """The full-text search entry of a document, from its title, person and identifier rows."""
+
+        def join_values(rows, attribute):
+            values = [normalize_str(u'%s' % row.get(attribute))
+                      for row in rows if row.get(attribute)]
+            return u' '.join(values)
+
+        return {
+            u'document_id': doc_id,
+            u'title': join_values(titles, u'title'),
+            u'author': join_values(authors, u'author'),
+            u'fingerprint': join_values(authors, u'fingerprint'),
+            u'identifier': join_values(identifiers, u'idno'),
+        }
+
+    def _document_rowid(self, doc_id):
+        """The rowid of the row of a document in the document table."""
+        for row in self.db.query(u'SELECT rowid FROM document WHERE _file = :doc_id', doc_id=doc_id):
+            return row[u'rowid']
+        raise KeyError(doc_id)
+
+    def _search_index_is_keyed(self):
+        """False if some full-text search entries are not keyed by the rowid of
+        their document (indexes written by previous versions)."""
+        for _ in self.db.query(
+                u'SELECT 1 FROM %s s LEFT JOIN document d ON d.rowid = s.rowid '
+                u'WHERE d._file IS NOT s.document_id LIMIT 1' % SEARCH_INDEX_TABLE):
+            return False
+        return True
+
+    def import_dewey(self, dewey_filepath, batch_size=1000):
+        """
+        Bulk-loads a TSV correspondance file between documents' Ark ids
+        and Dewey codes into the dewey table (see metadata.iter_tsv_dewey).
+        The previous content of the table is replaced, so that importing
+        the same file twice gives the same table.
+        :param dewey_filepath: The Dewey/Document-ark correspondences file path.
+        :param batch_size: Number of rows inserted at once.
+        :return: The number of imported rows.
+        """
+        logging.info(u"Importing Dewey codes from %s" % dewey_filepath)
+
+        # The table is only created when Dewey codes are imported (see has_dewey)
+        if u'dewey' in self.db.tables:
+            dewey_table = self.db['dewey']
+        else:
+            dewey_table = self.db.create_table('dewey',
+                                               primary_id=u'ark',
+                                               primary_type=self.db.types.string(200))
+
+        seen_arks = set([])
+        batch = []
+        with self.db:
+            dewey_table.delete()
+            for ark, dewey_info in iter_tsv_dewey(dewey_filepath):
+                if ark in seen_arks:
+                    logging.warning(u"Ignoring duplicated Dewey entry for %s" % ark)
+                    continue
+                seen_arks.add(ark)
+                batch.append({
+                    u'ark': ark,
+                    u'dewey': normalize_str(u' - '.join(dewey_info))
+                })
+                if len(batch) == batch_size:
+                    dewey_table.insert_many(batch)
+                    batch = []
+            dewey_table.insert_many(batch)
+
+        logging.info(u"%i Dewey codes imported." % len(seen_arks))
+        return len(seen_arks)
+
+    def _linked_rows(self, relational_table, item_id, base_table):
+        """
+        The rows of base_table linked to each document through relational_table,
+        read with a single join.
+        :return: A dict {document _file: [base_table rows]}
+        """
+        linked_rows = defaultdict(list)
+        if relational_table not in self.db.tables or base_table not in self.db.tables:
+            return linked_rows
+        for row in self.db.query(
+                u'SELECT r.document_id AS _document_id, b.* FROM "%s" r JOIN "%s" b ON b.id = r.%s '
+                u'ORDER BY r.id' % (relational_table, base_table, item_id)):
+            linked_rows[row[u'_document_id']].append(row)
+        return linked_rows
+
+    def rebuild_search_index(self, batch_size=1000):
+        """Rewrites the full-text search entries of all the documents from
+        the content of the DB tables.
+        :param batch_size: Number of entries inserted at once."""
+        logging.info(u"Rebuilding the full-text search index.")
+        titles = self._linked_rows(u'documentHasTitle', u'title_id', u'title')
+        authors = self._linked_rows(u'documentHasAuthor', u'author_id', u'person')
+        identifiers = self._linked_rows(u'documentHasIdentifier', u'idno_id', u'identifier')
+
+        def entries():
+            for document in self.db.query(u'SELECT rowid, _file FROM document'):
+                doc_id = document[u'_file']
+                entry = self._search_entry(
+                    doc_id, titles.get(doc_id, []), authors.get(doc_id, []), identifiers.get(doc_id, []))
+                entry[u'rowid'] = document[u'rowid']
+                yield entry
+
+        entries = entries()
+        with self.db:
+            self.db.query(u'DELETE FROM %s' % SEARCH_INDEX_TABLE)
+            batch = list(islice(entries, batch_size))
+            while batch:
+                self.db.executable.execute(text(SEARCH_INDEX_INSERT), batch)
+                batch = list(islice(entries, batch_size))
+
+    def _ensure_columns(self, table, frame):
+        """Creates the columns of a pandas DataFrame which are missing in table."""
+        for column in frame.columns:
+            if not table.has_column(column):
+                examples = frame[column].dropna()
+                if len(examples):
+                    table.create_column_by_example(column, examples.iloc[0])
+                else:
+                    table.create_column(column, self.db.types.text)
+
+    def renormalize(self, batch_size=1000):
+        """
+        Recomputes the parsed columns of the person and date tables
+        (see normalise_author_information and normalise_date_information)
+        for the whole DB in one pass, with the columnar parsers of lingutils.
+        The full-text search index is then rebuilt with the new fingerprints.
+        :param batch_size: Number of rows updated at once.
+        """
+        # --- PERSONS --- #
+        persons = [(p[u'id'], p.get(u'author')) for p in self.person_table.all()]
+        if persons:
+            logging.info(u"Renormalizing %i persons." % len(persons))
+            parsed = parse_person_batch([author for (_, author) in persons])
+            parsed[u'id'] = [person_id for (person_id, _) in persons]
+            self._ensure_columns(self.person_table, parsed)
+            with self.db:
+                self.person_table.update_many(
+                    parsed.to_dict('records'), [u'id'], chunk_size=batch_size)
+
+        # --- DATES --- #
+        # Same precedence as in normalise_date_information
+        dates = [(d[u'id'], d.get(u'when') or d.get(u'date')) for d in self.date_table.all()]
+        if dates:
+            logging.info(u"Renormalizing %i dates." % len(dates))
+            parsed = parse_year_date_batch([date for (_, date) in dates])
+            parsed[u'id'] = [date_id for (date_id, _) in dates]
+            self._ensure_columns(self.date_table, parsed)
+            with self.db:
+                self.date_table.update_many(
+                    parsed.to_dict('records'), [u'id'], chunk_size=batch_size)
+
+        self.rebuild_search_index()
+
+    def reconcile_authors(self):
+        """Clusters the persons of the whole DB which are likely to be the same
+        author, and saves the clusters in the person_cluster table
+        (see reconciliation.AuthorReconciler)."""
+        logging.info(u"Reconciling authors.")
+        return AuthorReconciler(self.db).save_clusters()
+
+    def add_document_similarities(self, similarities, method=u'minhash', batch_size=1000):
+        """
+        (Re)writes the similarities of pairs of documents computed by method
+        in the document_similarity table (see corpuscomparer.near_duplicates).
+        :param similarities: An iterable of (document _file, other document _file, similarity)
+        :param method: The name of the similarity measure. The previous similarities
+                       of the same method are replaced.
+        :param batch_size: Number of rows inserted at once.
+        :return: The number of saved pairs.
+        """
+        if u'document_similarity' in self.db.tables:
+            similarity_table = self.db['document_similarity']
+        else:
+            similarity_table = self.db.create_table(u'document_similarity')
+            similarity_table.create_column(u'document_id', self.db.types.string(200))
+            similarity_table.create_column(u'other_document_id', self.db.types.string(200))
+            similarity_table.create_column(u'similarity', self.db.types.float)
+            similarity_table.create_column(u'method', self.db.types.string(50))
+
+        rows = [
+            {u'document_id': document_id,
+             u'other_document_id': other_document_id,
+             u'similarity': float(similarity),
+             u'method': method}
+            for (document_id, other_document_id, similarity) in similarities
+        ]
+        with self.db:
+            similarity_table.delete(method=method)
+            similarity_table.insert_many(rows, chunk_size=batch_size)
+        similarity_table.create_index([u'document_id'])
+        similarity_table.create_index([u'other_document_id'])
+
+        logging.info(u"%i document similarities (%s) saved." % (len(rows), method))
+        return len(rows)
+
+    def _replace_table(self, table_name, columns, rows, indexes=(), batch_size=1000):
+        """
+        (Re)creates a table and inserts rows in it.
+        :param columns: A list of (column name, column type)
+        :param rows: An iterable of tuples of the values of the columns
+        :param indexes: The columns to index
+        :return: The number of inserted rows
+        """
+        if table_name in self.db.tables:
+            self.db[table_name].drop()
+        table = self.db.create_table(table_name)
+        for (column, column_type) in columns:
+            table.create_column(column, column_type)
+
+        # insert_many needs a list: rows are inserted by lists of batch_size rows
+        names = [column for (column, _) in columns]
+        rows = iter(rows)
+        rows_num = 0
+        with self.db:
+            while True:
+                batch = [dict(zip(names, row)) for row in islice(rows, batch_size)]
+                if not batch:
+                    break
+                table.insert_many(batch, chunk_size=batch_size)
+                rows_num += len(batch)
+        for column in indexes:
+            table.create_index([column])
+        return rows_num
+
+    def add_graph_analytics(self, components, document_links, coauthors, degrees, batch_size=1000):
+        """
+        (Re)writes the analytics of the documents-attributes graph of the DB
+        (see corpuscomparer.graph_analytics) in the tables:
+            - document_component: the connected component of each document;
+            - document_link: the pairs of documents sharing attributes;
+            - coauthor: the pairs of authors sharing documents;
+            - graph_degree: the degrees of the documents and authors in the
+              two previous projections.
+        :param components: An iterable of (document _file, component id, component size)
+        :param document_links: An iterable of (document _file, other document _file,
+                               number of shared attributes)
+        :param coauthors: An iterable of (author fingerprint, other author fingerprint,
+                          number of shared documents)
+        :param degrees: An iterable of (projection, node, degree, weighted degree),
+                        projection being u'document' or u'author'
+        :param batch_size: Number of rows inserted at once.
+        """
+        string = self.db.types.string(200)
+        integer = self.db.types.integer
+
+        components_num = self._replace_table(
+            u'document_component',
+            [(u'document_id', string), (u'component_id', integer), (u'component_size', integer)],
+            components, indexes=[u'document_id', u'component_id'], batch_size=batch_size)
+        links_num = self._replace_table(
+            u'document_link',
+            [(u'document_id', string), (u'other_document_id', string), (u'shared', integer)],
+            document_links, indexes=[u'document_id', u'other_document_id'], batch_size=batch_size)
+        coauthors_num = self._replace_table(
+            u'coauthor',
+            [(u'author', string), (u'other_author', string), (u'documents', integer)],
+            coauthors, indexes=[u'author', u'other_author'], batch_size=batch_size)
+        self._replace_table(
+            u'graph_degree',
+            [(u'projection', self.db.types.string(50)), (u'node', string),
+             (u'degree', integer), (u'weighted_degree', integer)],
+            degrees, indexes=[u'node'], batch_size=batch_size)
+
+        logging.info(u"Graph analytics saved: %i documents components, %i document links, %i co-authors."
+                     % (components_num, links_num, coauthors_num))
+
+    def reset_text_reuse(self):
+        """Creates the (empty) text_reuse table, where the passages shared by
+        two documents are saved (see add_text_reuse_passages)."""
+        if u'text_reuse' in self.db.tables:
+            self.db['text_reuse'].drop()
+        self.text_reuse_table = self.db.create_table(u'text_reuse')
+        for column in (u'document_id', u'other_document_id'):
+            self.text_reuse_table.create_column(column, self.db.types.string(200))
+        for column in (u'document_start', u'document_end',
+                       u'other_document_start', u'other_document_end', u'length'):
+            self.text_reuse_table.create_column(column, self.db.types.integer)
+        self.text_reuse_table.create_index([u'document_id'])
+        self.text_reuse_table.create_index([u'other_document_id'])
+
+    def add_text_reuse_passages(self, passages, batch_size=1000):
+        """
+        Saves passages shared by two documents in the text_reuse table
+        (see corpuscomparer.text_reuse.find_text_reuse).
+        :param passages: A list of dicts with the document_id, document_start, document_end,
+                         other_document_id, other_document_start, other_document_end
+                         (character offsets in the TEI bodies) and length (in tokens) keys.
+        :param batch_size: Number of rows inserted at once.
+        """
+        if u'text_reuse' not in self.db.tables:
+            self.reset_text_reuse()
+        with self.db:
+            self.db['text_reuse'].insert_many(passages, chunk_size=batch_size)
+
     def add_xml_document(self, doc):
         """Saves a DocumentContent() in a SQLite database."""
         logging.debug("Saving document %s in the database." % doc.document_metadata.get(u'_file'))
@@ -235,7 +641,7 @@ class CorpusSQLiteDBWriter(object):
         document_id = self._insert_document_row(doc)
 
         # --- IDENTIFIER ---- #
-        self._insert_document_item_row(
+        identifiers = self._insert_document_item_row(
             item=u'idno',
             modifier_function=self.modify_url_type,
             base_table=self.idno_table,
@@ -255,7 +661,7 @@ class CorpusSQLiteDBWriter(object):
         )
 
         # --- DOCUMENT AUTHORS --- #
-        self._insert_document_item_row(
+        authors = self._insert_document_item_row(
             item=u'author',
             modifier_function=self.normalise_author_information,
             base_table=self.person_table,
@@ -265,7 +671,7 @@ class CorpusSQLiteDBWriter(object):
         )
 
         # --- DOCUMENT TITLE --- #
-        self._insert_document_item_row(
+        titles = self._insert_document_item_row(
             item=u'title',
             base_table=self.title_table,
             relational_table=self.document_has_title_table,
@@ -273,6 +679,9 @@ class CorpusSQLiteDBWriter(object):
             doc_id=document_id
         )
 
+        # --- FULL-TEXT SEARCH INDEX --- #
+        self._index_document(document_id, titles, authors, identifiers)
+
 
 class CorpusSQLiteDBReader(object):
 
@@ -312,19 +721,87 @@ class CorpusSQLiteDBReader(object):
         self.title_table = self.db['title']
         self.document_has_title_table = self.db['documentHasTitle']
 
-    def treat_document(
-            self,
-            modify_TEI=True,
-            dewey_filepath='dewey_corresp_utf8.tsv'):
+    def search(self, query, limit=20, raw=False):
+        """
+        Full-text search over the normalized titles, authors, author
+        fingerprints and identifiers of the documents.
+        Matching ignores case and diacritics.
+
+        :Example:
+        >>> db.search(u'academie francoise', limit=5)
+        >>> [u'/path/to/olivet_histoire-academie.xml', ...]
+        >>> db.search(u"title:l'académie OR saint-simon")
+        :param query: Terms, all of which must match (see search_expression), e.g.
+                      u'ronsard', u"l'académie", u'title:oeuvres ronsard', u'ronsard OR baïf'
+        :param limit: The maximum number of documents returned
+        :param raw: If True, query is used as is, as an FTS5 query expression
+        :return: The ids of the matching documents, best ranked first.
+        """
+        if SEARCH_INDEX_TABLE not in self.db.tables:
+            raise IOError("Database has no full-text search index.")
 
-        # Getting Dewey codes
-        deweys = load_tsv_dewey(dewey_filepath)
+        expression = normalize_str(query) if raw else search_expression(query)
+        if not expression:
+            return []
+        try:
+            results = self.db.query(
+                u'SELECT document_id FROM %s WHERE %s MATCH :expression '
+                u'ORDER BY rank LIMIT :limit' % (SEARCH_INDEX_TABLE, SEARCH_INDEX_TABLE),
+                expression=expression,
+                limit=limit)
+            return [r['document_id'] for r in results]
+        except OperationalError as error:
+            raise ValueError(u"Invalid search query %s (%s)" % (query, error.orig))
+
+    def has_dewey(self):
+        """True if Dewey codes were imported in the DB (see CorpusSQLiteDBWriter.import_dewey)."""
+        return (u'dewey' in self.db.tables
+                and u'ark' in self.document_table.columns
+                and self.db['dewey'].count() > 0)
+
+    def iter_documents(self, corpus_tag=None, since_rowid=None, batch_size=500):
+        """
+        Iterates over the documents rows, with their Dewey code (if any)
+        joined on their Ark id.
+        Documents are read by batches of batch_size rows, using a keyset
+        pagination on the document rowid: memory stays bounded and an
+        interrupted iteration can be resumed from the last '_rowid' seen.
+
+        :Example:
+        >>> for document in db.iter_documents(corpus_tag=u'CORPUS_1', since_rowid=1200):
+        >>>     print(document[u'_rowid'], document[u'_file'], document.get(u'dewey'))
+        :param corpus_tag: If set, only the documents of this corpus are returned.
+        :param since_rowid: If set, only the documents stored after this rowid are returned.
+        :param batch_size: The number of documents fetched from the DB at once.
+        :return: An iterator over the documents rows (dicts).
+        """
+        with_dewey = self.has_dewey()
+        query = u'SELECT document.rowid AS _rowid, document.*%s FROM document %s' \
+                u'WHERE document.rowid > :since_rowid %s' \
+                u'ORDER BY document.rowid LIMIT :batch_size' % (
+                    u', dewey.dewey AS dewey' if with_dewey else u'',
+                    u'LEFT JOIN dewey ON dewey.ark = document.ark ' if with_dewey else u'',
+                    u'AND document._tag = :corpus_tag ' if corpus_tag else u'')
+
+        last_rowid = since_rowid or 0
+        while True:
+            params = {u'since_rowid': last_rowid, u'batch_size': batch_size}
+            if corpus_tag:
+                params[u'corpus_tag'] = corpus_tag
+            batch = [dict(row) for row in self.db.query(query, **params)]
+            for document in batch:
+                yield document
+            if len(batch) < batch_size:
+                break
+            last_rowid = batch[-1][u'_rowid']
+
+    def treat_document(self, modify_TEI=True, corpus_tag=None, since_rowid=None):
 
         # Getting fingerprint order and to ignore
         authors_precedence = self.get_fingerprints_with_precedence_information()
         ignore_reconciliation = self.compute_fingerprints_ambiguity()
 
-        for document in self.document_table:
+        for document in self.iter_documents(corpus_tag=corpus_tag, since_rowid=since_rowid):
 
             doc_id = document['_file']
             logging.info("Treating doc %s \r" %doc_id)
@@ -336,12 +813,8 @@ class CorpusSQLiteDBReader(object):
             )
 
             # Adding Dewey
-            ark = document.get('ark')
-            if ark:
-                dewey_info = deweys.get(ark)
-                if dewey_info:
-                    dewey_code = ' - '.join(deweys.get(document.get('ark')))
-                    doc_info['dewey'] = normalize_str(dewey_code)
+            if document.get('dewey'):
+                doc_info['dewey'] = document['dewey']
 
 
             # Getting back the authors, depending on if they
@@ -478,36 +951,27 @@ class CorpusSQLiteDBReader(object):
         """
 
         if authors and len(authors) > 1:
-            keys_beginning = [k[0:4] for k in authors.keys()]
-            duplicates_beginning = {
-                k: keys_beginning.count(k)
-                for k in keys_beginning
-                if keys_beginning.count(k) > 1
-            }
+            keys_by_beginning = defaultdict(list)
+            for k in authors.keys():
+                keys_by_beginning[k[0:4]].append(k)
 
-            if duplicates_beginning:
-                for duplicate_beginning in duplicates_beginning:
-                    # Bold guess...
-                    dict_informativeness = {
-                        self.dict_informativeness(d): k
-                        for k, d in authors.iteritems()
-                        if k.startswith(duplicate_beginning)
-                    }
-
-                    author_keys = set([])
-                    if dict_informativeness:
-                        most_informative_key = dict_informativeness[max(dict_informativeness)]
-
-                        for k in authors.keys():
-                            if k is not most_informative_key:
-                                if authors[k].get('key'):
-                                    author_keys.add(authors[k].get('key'))
-                                authors.pop(k)
-
-                    for k in authors.keys():
-                        if authors[k].get('key'):
-                            author_keys.add(authors[k].get('key'))
-                        authors[k]['key'] = u', '.join(author_keys)
+            for duplicate_keys in keys_by_beginning.values():
+                if len(duplicate_keys) < 2:
+                    continue
+
+                # Bold guess: we keep the most informative entry
+                most_informative_key = max(
+                    duplicate_keys,
+                    key=lambda k: self.dict_informativeness(authors[k]))
+
+                author_keys = set([])
+                for k in duplicate_keys:
+                    if authors[k].get('key'):
+                        author_keys.add(authors[k].get('key'))
+                    if k != most_informative_key:
+                        authors.pop(k)
+
+                authors[most_informative_key]['key'] = u', '.join(sorted(author_keys))
 
         return authors
 
@@ -686,7 +1150,7 @@ class CorpusSQLiteDBReader(object):
 
         return u'; '.join(attribute_info).encode('utf-8')
 
-    def export_to_csv(self, file, dewey_filepath=None):
+    def export_to_csv(self, file, corpus_tag=None):
 
         attributes_names = {
             u'identifier': {
@@ -717,14 +1181,11 @@ class CorpusSQLiteDBReader(object):
             },
         }
 
-        if dewey_filepath:
-            deweys = load_tsv_dewey(dewey_filepath)
+        with_dewey = self.has_dewey()
 
         with open(file, 'wb') as f:
 
-
-
-            header = [u'doc_id', 'dewey'] if dewey_filepath else [u'doc_id']
+            header = [u'doc_id', 'dewey'] if with_dewey else [u'doc_id']
             header.extend(attributes_names.keys())
             w = csv.DictWriter(f, fieldnames=header)
 
@@ -732,7 +1193,7 @@ class CorpusSQLiteDBReader(object):
             info_batch = []
             info_batch_size = 0
 
-            for document in self.document_table:
+            for document in self.iter_documents(corpus_tag=corpus_tag):
 
                 info = {}
                 doc_id = document.get(u'_file')
@@ -743,14 +1204,9 @@ class CorpusSQLiteDBReader(object):
                     info[attribute_name] = attributes
                     info[u'doc_id'] = doc_id.rpartition('/')[2]
 
-                    # deweys
-                    if dewey_filepath:
-                        ark = document.get('ark')
-                        if ark:
-                            dewey_info = deweys.get(ark)
-                            if dewey_info:
-                                dewey_code = ' - '.join(deweys.get(document.get('ark')))
-                                info['dewey'] = normalize_str(dewey_code).encode('utf-8')
+                # deweys
+                if with_dewey and document.get('dewey'):
+                    info['dewey'] = document['dewey'].encode('utf-8')
 
                 # saving the info in the CSV file
                 info_batch.append(info)
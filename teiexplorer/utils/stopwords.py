@@ -0,0 +1,471 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+stopwords is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+Stopwords lists, by ISO 639-1 language code.
+"""
+
+FRENCH_STOPWORDS = frozenset([
+    u'ai',
+    u'aie',
+    u'aient',
+    u'aies',
+    u'ait',
+    u'alors',
+    u'après',
+    u'as',
+    u'au',
+    u'aucuns',
+    u'aura',
+    u'aurai',
+    u'auraient',
+    u'aurais',
+    u'aurait',
+    u'auras',
+    u'aurez',
+    u'auriez',
+    u'aurions',
+    u'aurons',
+    u'auront',
+    u'aussi',
+    u'autre',
+    u'aux',
+    u'avaient',
+    u'avais',
+    u'avait',
+    u'avant',
+    u'avec',
+    u'avez',
+    u'aviez',
+    u'avions',
+    u'avoir',
+    u'avons',
+    u'ayant',
+    u'ayez',
+    u'ayons',
+    u'bon',
+    u'bons',
+    u'bien',
+    u'biens',
+    u'c',
+    u'car',
+    u'ce',
+    u'ceci',
+    u'cela',
+    u'celà',
+    u'celà',
+    u'ces',
+    u'cet',
+    u'cette',
+    u'ceux',
+    u'chaque',
+    u'chapitre',
+    u'chapitres',
+    u'ci',
+    u'comme',
+    u'comment',
+    u'd',
+    u'dans',
+    u'de',
+    u'dedans',
+    u'dehors',
+    u'depuis',
+    u'des',
+    u'deux',
+    u'devrait',
+    u'doit',
+    u'donc',
+    u'dont',
+    u'dos',
+    u'droite',
+    u'du',
+    u'début',
+    u'elle',
+    u'elles',
+    u'en',
+    u'encore',
+    u'entre',
+    u'es',
+    u'essai',
+    u'est',
+    u'estre',
+    u'et',
+    u'eu',
+    u'eue',
+    u'eues',
+    u'eurent',
+    u'eus',
+    u'eusse',
+    u'eussent',
+    u'eusses',
+    u'eussiez',
+    u'eussions',
+    u'eut',
+    u'eux',
+    u'eûmes',
+    u'eût',
+    u'eûtes',
+    u'faire',
+    u'fait',
+    u'faites',
+    u'fois',
+    u'font',
+    u'force',
+    u'furent',
+    u'fus',
+    u'fusse',
+    u'fussent',
+    u'fusses',
+    u'fussiez',
+    u'fussions',
+    u'fut',
+    u'fûmes',
+    u'fût',
+    u'fûtes',
+    u'haut',
+    u'hors',
+    u'ici',
+    u'il',
+    u'ils',
+    u'j',
+    u'je',
+    u'juste',
+    u'l',
+    u'la',
+    u'le',
+    u'les',
+    u'leur',
+    u'leurs',
+    u'lui',
+    u'là',
+    u'm',
+    u'ma',
+    u'maintenant',
+    u'mais',
+    u'me',
+    u'mes',
+    u'mine',
+    u'moi',
+    u'moins',
+    u'mon',
+    u'mot',
+    u'même',
+    u'n',
+    u'nbsp',
+    u'ne',
+    u'ni',
+    u'nommés',
+    u'nos',
+    u'notre',
+    u'nous',
+    u'nouveaux',
+    u'on',
+    u'ont',
+    u'ou',
+    u'où',
+    u'page',
+    u'pages',
+    u'par',
+    u'parce',
+    u'parole',
+    u'pas',
+    u'personnes',
+    u'peu',
+    u'peut',
+    u'pièce',
+    u'plus',
+    u'plupart',
+    u'pour',
+    u'pourquoi',
+    u'qu',
+    u'quand',
+    u'que',
+    u'quel',
+    u'quelle',
+    u'quelles',
+    u'quels',
+    u'qui',
+    u's',
+    u'sa',
+    u'sans',
+    u'se',
+    u'sera',
+    u'serai',
+    u'seraient',
+    u'serais',
+    u'serait',
+    u'seras',
+    u'serez',
+    u'seriez',
+    u'serions',
+    u'serons',
+    u'seront',
+    u'ses',
+    u'seulement',
+    u'si',
+    u'sien',
+    u'soi',
+    u'soient',
+    u'sois',
+    u'soit',
+    u'sommes',
+    u'son',
+    u'sont',
+    u'sous',
+    u'soyez',
+    u'soyons',
+    u'suis',
+    u'sujet',
+    u'sur',
+    u't',
+    u'ta',
+    u'tandis',
+    u'te',
+    u'tellement',
+    u'tels',
+    u'tes',
+    u'toi',
+    u'ton',
+    u'tous',
+    u'tout',
+    u'toute',
+    u'trop',
+    u'très',
+    u'tu',
+    u'un',
+    u'une',
+    u'valeur',
+    u'voie',
+    u'voient',
+    u'vont',
+    u'vos',
+    u'vostre',
+    u'votre',
+    u'vous',
+    u'vu',
+    u'y',
+    u'à',
+    u'ça',
+    u'étaient',
+    u'étais',
+    u'était',
+    u'étant',
+    u'état',
+    u'étiez',
+    u'étions',
+    u'été',
+    u'étée',
+    u'étées',
+    u'étés',
+    u'êtes',
+    u'être',
+])
+
+ENGLISH_STOPWORDS = frozenset([
+    u'a',
+    u'about',
+    u'above',
+    u'after',
+    u'again',
+    u'against',
+    u'all',
+    u'am',
+    u'an',
+    u'and',
+    u'any',
+    u'are',
+    u'as',
+    u'at',
+    u'be',
+    u'because',
+    u'been',
+    u'before',
+    u'being',
+    u'below',
+    u'between',
+    u'both',
+    u'but',
+    u'by',
+    u'can',
+    u'could',
+    u'did',
+    u'do',
+    u'does',
+    u'doing',
+    u'down',
+    u'during',
+    u'each',
+    u'few',
+    u'for',
+    u'from',
+    u'further',
+    u'had',
+    u'has',
+    u'have',
+    u'having',
+    u'he',
+    u'her',
+    u'here',
+    u'hers',
+    u'herself',
+    u'him',
+    u'himself',
+    u'his',
+    u'how',
+    u'i',
+    u'if',
+    u'in',
+    u'into',
+    u'is',
+    u'it',
+    u'its',
+    u'itself',
+    u'just',
+    u'me',
+    u'more',
+    u'most',
+    u'my',
+    u'myself',
+    u'no',
+    u'nor',
+    u'not',
+    u'now',
+    u'of',
+    u'off',
+    u'on',
+    u'once',
+    u'only',
+    u'or',
+    u'other',
+    u'our',
+    u'ours',
+    u'ourselves',
+    u'out',
+    u'over',
+    u'own',
+    u'same',
+    u'she',
+    u'should',
+    u'so',
+    u'some',
+    u'such',
+    u'than',
+    u'that',
+    u'the',
+    u'their',
+    u'theirs',
+    u'them',
+    u'themselves',
+    u'then',
+    u'there',
+    u'these',
+    u'they',
+    u'this',
+    u'those',
+    u'through',
+    u'to',
+    u'too',
+    u'under',
+    u'until',
+    u'up',
+    u'very',
+    u'was',
+    u'we',
+    u'were',
+    u'what',
+    u'when',
+    u'where',
+    u'which',
+    u'while',
+    u'who',
+    u'whom',
+    u'why',
+    u'will',
+    u'with',
+    u'would',
+    u'you',
+    u'your',
+    u'yours',
+    u'yourself',
+    u'yourselves',
+])
+
+LATIN_STOPWORDS = frozenset([
+    u'a',
+    u'ab',
+    u'ac',
+    u'ad',
+    u'adhuc',
+    u'at',
+    u'atque',
+    u'aut',
+    u'autem',
+    u'cum',
+    u'de',
+    u'dum',
+    u'e',
+    u'enim',
+    u'eo',
+    u'est',
+    u'et',
+    u'etiam',
+    u'ex',
+    u'haec',
+    u'hic',
+    u'hoc',
+    u'iam',
+    u'ille',
+    u'in',
+    u'inter',
+    u'ipse',
+    u'is',
+    u'ita',
+    u'me',
+    u'mihi',
+    u'nam',
+    u'ne',
+    u'nec',
+    u'neque',
+    u'nisi',
+    u'non',
+    u'nos',
+    u'nunc',
+    u'ob',
+    u'per',
+    u'post',
+    u'pro',
+    u'quae',
+    u'quam',
+    u'qui',
+    u'quia',
+    u'quid',
+    u'quidem',
+    u'quod',
+    u'quoque',
+    u'sed',
+    u'si',
+    u'sic',
+    u'sine',
+    u'sit',
+    u'sub',
+    u'sum',
+    u'sunt',
+    u'super',
+    u'tamen',
+    u'tam',
+    u'te',
+    u'tu',
+    u'tum',
+    u'ubi',
+    u'ut',
+    u'vel',
+    u'vero',
+])
+
+STOPWORDS = {
+    u'fr': FRENCH_STOPWORDS,
+    u'en': ENGLISH_STOPWORDS,
+    u'la': LATIN_STOPWORDS,
+}
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+tokenizer is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+"""
+
+import re
+from functools import partial
+from multiprocessing import Pool
+
+from .lingutils import (
+    DEFAULT_LANGUAGE,
+    get_stemmer
+)
+
+# French elided words (l', d', qu', jusqu'...) are tokens on their own,
+# unless they are part of a lexicalised word (aujourd'hui, quelqu'un...).
+ELISIONS = [u'c', u'd', u'j', u'l', u'm', u'n', u's', u't',
+            u'qu', u'jusqu', u'lorsqu', u'puisqu', u'quoiqu']
+APOSTROPHES = u"'’"
+
+TOKEN_RE = re.compile(
+    u'(?P<elision>(?:%s)[%s](?=\\w))|\\w+(?:[%s]\\w+)*' % (
+        u'|'.join(ELISIONS), APOSTROPHES, APOSTROPHES),
+    re.IGNORECASE | re.UNICODE)
+
+APOSTROPHES_RE = re.compile(u'[%s]' % APOSTROPHES)
+
+
+def tokenize(text, lowercase=True, keep_elisions=False, stem=False, lang=DEFAULT_LANGUAGE):
+    """
+    Splits a text into word tokens.
+
+    :Example:
+    >>> tokenize(u"L'homme qu'on aime est aujourd'hui là.")
+    >>> [u'homme', u'on', u'aime', u'est', u"aujourd'hui", u'là']
+    >>> tokenize(u"L'homme qu'on aime", lowercase=False, keep_elisions=True)
+    >>> [u"L'", u'homme', u"qu'", u'on', u'aime']
+    :param text: a unicode text
+    :param lowercase: if True, tokens are lower cased
+    :param keep_elisions: if True, elided words (l', qu'...) are kept as tokens
+    :param stem: if True, tokens are stemmed (see lingutils.get_stemmer)
+    :param lang: the language of the text, used for stemming
+    :return: the list of tokens
+    """
+    return [token for (token, _, _) in tokenize_with_offsets(
+        text, lowercase=lowercase, keep_elisions=keep_elisions, stem=stem, lang=lang)]
+
+
+def tokenize_with_offsets(text, lowercase=True, keep_elisions=False, stem=False, lang=DEFAULT_LANGUAGE):
+    """
+    Splits a text into word tokens, keeping their positions in the text
+    (see tokenize for the options).
+
+    :Example:
+    >>> tokenize_with_offsets(u"L'homme est là.")
+    >>> [(u'homme', 2, 7), (u'est', 8, 11), (u'là', 12, 14)]
+    :return: the list of (token, start, end) where text[start:end] is the
+             (original form of the) token
+    """
+    if not text:
+        return []
+
+    stemmer = get_stemmer(lang) if stem else None
+    tokens = []
+    for match in TOKEN_RE.finditer(text):
+        if match.group(u'elision') and not keep_elisions:
+            continue
+        token = APOSTROPHES_RE.sub(u"'", match.group(0))
+        if lowercase:
+            token = token.lower()
+        if stemmer:
+            token = stemmer(token)
+        tokens.append((token, match.start(), match.end()))
+    return tokens
+
+
+def tokenize_documents(texts, processes=None, chunksize=16, **tokenize_options):
+    """
+    Tokenizes many texts in a process pool (see tokenize for the options).
+    :param texts: an iterable of texts
+    :param processes: the number of worker processes (default: number of CPUs).
+                      With 1, texts are tokenized in the current process.
+    :param chunksize: the number of texts sent to a worker at once
+    :return: the list of the token lists, in the order of texts
+    """
+    tokenize_text = partial(tokenize, **tokenize_options)
+    if processes == 1:
+        return [tokenize_text(text) for text in texts]
+
+    pool = Pool(processes)
+    try:
+        return list(pool.imap(tokenize_text, texts, chunksize))
+    finally:
+        pool.close()
+        pool.join()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+test_clustering_result.py is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+"""
+
+import os
+import tempfile
+
+import numpy as np
+
+from teiexplorer.corpuscomparer.clustering_result import ClusteringResult
+
+
+class _Model(object):
+    labels_ = np.array([1, 0, 1, 2, 1])
+    cluster_centers_ = np.array([
+        [0.1, 0.9, 0.0, 0.5],
+        [0.8, 0.0, 0.3, 0.2],
+        [0.0, 0.1, 0.2, 0.7],
+    ])
+
+
+def test_clustering_result_from_model():
+    """Top terms and members of the clusters: Should pass"""
+    filenames = [u'a.xml', u'b.xml', u'c.xml', u'd.xml', u'e.xml']
+    result = ClusteringResult.from_model(u'run', _Model(), filenames, [u'w', u'x', u'y', u'z'], top_terms_num=2)
+
+    assert result.n_clusters == 3
+    assert result.top_terms == [[u'x', u'z'], [u'w', u'y'], [u'z', u'y']]
+    assert result.cluster_name(1) == u'w + y'
+    assert result.documents(1) == [u'a.xml', u'c.xml', u'e.xml']
+    assert result.documents(2) == [u'd.xml']
+
+
+def test_clustering_result_save():
+    """A saved result is reloaded with its layout: Should pass"""
+    result = ClusteringResult(u'run', [u'a.xml', u'b.xml'], [0, 0], [[u'w'], [u'x']])
+    assert [len(members) for members in result.members] == [2, 0]
+    result.set_layout([0.5, 1.0], [0.0, -1.0], u'svd')
+
+    path = os.path.join(tempfile.mkdtemp(), u'run_result.pkl')
+    result.save(path)
+    loaded = ClusteringResult.load(path)
+    assert loaded.filenames == result.filenames
+    assert loaded.layout_method == u'svd'
+    assert np.allclose(loaded.ys, [0.0, -1.0])
+    os.remove(path)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+test_comparer.py is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+"""
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from teiexplorer.corpuscomparer.comparer import CorpusComparer
+
+CATS = u"Le chat noir dort sur le canapé du salon, le chat ronronne près du feu. %s"
+SHIPS = u"Le navire quitte le port de Marseille, les marins hissent les voiles. %s"
+
+
+def _documents():
+    """12 documents about 2 topics, and the topic of each one."""
+    return [(u'doc%02i.xml' % i, (CATS if i % 2 else SHIPS) % (u'Texte %i.' % i)) for i in range(12)]
+
+
+def _comparer(mode):
+    comparer = CorpusComparer({u'clustering': {u'n_clusters': 2, u'mode': mode, u'chunk_size': 5}})
+    for (filename, text) in _documents():
+        comparer.add_text_content(filename, text)
+    return comparer
+
+
+def _in_results_directory(test):
+    """Runs test in a temporary directory, with the data/results folder of the comparer."""
+    def run():
+        current_directory = os.getcwd()
+        directory = tempfile.mkdtemp()
+        try:
+            os.makedirs(os.path.join(directory, u'data', u'results'))
+            os.chdir(directory)
+            test()
+        finally:
+            os.chdir(current_directory)
+            shutil.rmtree(directory)
+    run.__doc__ = test.__doc__
+    return run
+
+
+def _topics_are_clusters(labels):
+    cats = set(labels[1::2].tolist())
+    ships = set(labels[::2].tolist())
+    return len(cats) == 1 and len(ships) == 1 and cats != ships
+
+
+def test_online_k_means():
+    """Test that the MiniBatchKMeans model fitted by chunks labels all the documents: Should pass"""
+    comparer = _comparer(u'minibatch')
+    try:
+        comparer.vectorize(processes=1)
+        km = comparer._online_k_means()
+        assert km.labels_.shape == (12,)
+        assert km.cluster_centers_.shape == (2, comparer.tfidf_matrix.shape[1])
+        assert _topics_are_clusters(km.labels_)
+        assert (km.labels_ == km.predict(comparer.tfidf_matrix)).all()
+    finally:
+        comparer.close()
+
+
+@_in_results_directory
+def test_assign_clusters():
+    """Test that new and already registered documents are assigned clusters, keeping the rows aligned: Should pass"""
+    for mode in [u'minibatch', u'kmeans']:
+        comparer = _comparer(mode)
+        try:
+            comparer.k_means_clustering(u'run', processes=1)
+            km = comparer._load_model(u'run')
+            assert _topics_are_clusters(km.labels_)
+            cats_cluster = km.labels_[1]
+            ships_cluster = km.labels_[0]
+
+            # A new document, a registered one whose text changed, and the same new document again
+            clusters = comparer.assign_clusters(u'run', [
+                (u'new.xml', SHIPS % u'Nouveau.'),
+                (u'doc01.xml', SHIPS % u'Texte 1.'),
+                (u'new.xml', CATS % u'Nouveau.'),
+            ])
+            assert clusters == {u'new.xml': cats_cluster, u'doc01.xml': ships_cluster}
+
+            km = comparer._load_model(u'run')
+            filenames = comparer.registry.filenames
+            assert filenames == [filename for (filename, _) in _documents()] + [u'new.xml']
+            assert comparer.tfidf_matrix.shape[0] == len(filenames) == len(km.labels_)
+            assert km.labels_[1] == ships_cluster
+            assert km.labels_[-1] == cats_cluster
+            assert comparer.registry.get_text(u'doc01.xml') == SHIPS % u'Texte 1.'
+            np.testing.assert_array_equal(km.labels_, km.predict(comparer.tfidf_matrix))
+
+            documents_clusters = comparer.get_clustering_result(u'run')
+            assert len(documents_clusters.labels) == len(filenames)
+        finally:
+            comparer.close()
+
+
+def test_multidimensional_scaling():
+    """Test of the 2-D layouts of the documents: Should pass"""
+    comparer = _comparer(u'kmeans')
+    try:
+        comparer.vectorize(processes=1)
+        for method in [u'mds', u'svd']:
+            (xs, ys) = comparer.multidimensional_scaling(method)
+            assert xs.shape == ys.shape == (12,)
+        assert not hasattr(comparer, u'dist')
+    finally:
+        comparer.close()
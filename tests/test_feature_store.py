@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+test_feature_store.py is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+"""
+
+import shutil
+import tempfile
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from teiexplorer.corpuscomparer.feature_store import FeatureStore
+from teiexplorer.utils.tokenizer import tokenize
+
+TEXTS = [
+    (u'a.xml', u"Le chat dort sur le tapis."),
+    (u'b.xml', u"Le chien dort dans la cour."),
+    (u'c.xml', u"Un chat et un chien jouent dans la cour."),
+]
+
+
+def _sorted_columns(matrix, feature_names):
+    order = np.argsort(feature_names)
+    return matrix.toarray()[:, order]
+
+
+def test_feature_store_tfidf():
+    """The store TF-IDF matrix equals sklearn's: Should pass"""
+    store = FeatureStore(tempfile.mkdtemp(), ngram_range=(1, 2))
+    store.add_documents(TEXTS, processes=1)
+    matrix = store.tfidf()
+
+    vectorizer = TfidfVectorizer(tokenizer=tokenize, token_pattern=None, lowercase=False, ngram_range=(1, 2))
+    truth = vectorizer.fit_transform([text for (_, text) in TEXTS])
+
+    assert np.allclose(_sorted_columns(matrix, store.get_feature_names_out()),
+                       _sorted_columns(truth, vectorizer.get_feature_names_out()))
+    shutil.rmtree(store.directory)
+
+
+def test_feature_store_incremental():
+    """Documents added to a saved store give the same matrix as a new store: Should pass"""
+    directory = tempfile.mkdtemp()
+    store = FeatureStore(directory)
+    assert store.add_documents(TEXTS[:2], processes=1) == 2
+    store.save()
+
+    store = FeatureStore(directory)
+    assert len(store) == 2
+    assert store.add_documents(TEXTS, processes=1) == 1
+    assert store.add_documents([(u'a.xml', u"Le chat dort.")], processes=1) == 1
+    store.save()
+
+    ordered_ids = [u'a.xml', u'b.xml', u'c.xml']
+    reloaded = FeatureStore(directory)
+    fresh = FeatureStore(tempfile.mkdtemp())
+    fresh.add_documents([(u'a.xml', u"Le chat dort.")] + TEXTS[1:], processes=1)
+    assert reloaded.manifest() == fresh.manifest()
+    assert np.allclose(_sorted_columns(reloaded.tfidf(ordered_ids), reloaded.get_feature_names_out()),
+                       _sorted_columns(fresh.tfidf(ordered_ids), fresh.get_feature_names_out()))
+
+    # New texts are weighted with the stored IDF, without being added
+    new_matrix = reloaded.transform([u"Le chat dort dans la cour."], processes=1)
+    assert new_matrix.shape == (1, len(reloaded.get_feature_names_out()))
+    assert len(reloaded) == 3
+    shutil.rmtree(directory)
+    shutil.rmtree(fresh.directory)
+
+
+def test_feature_store_max_features():
+    """The vocabulary is pruned to the n-grams of highest document frequency: Should pass"""
+    directory = tempfile.mkdtemp()
+    store = FeatureStore(directory, ngram_range=(1, 1), max_features=4)
+    store.add_documents(TEXTS, processes=1)
+    assert len(store.vocabulary) == store.counts.shape[1] == 4
+    # N-grams of a single document are pruned first, then those of lowest count ("le" has 3)
+    assert set(store.vocabulary) <= {u'le', u'dort', u'chat', u'chien', u'dans', u'la', u'cour'}
+    assert u'le' in store.vocabulary
+    store.save()
+
+    # Replaced texts leave no unused n-gram, and the cap is kept when documents are added
+    store = FeatureStore(directory, ngram_range=(1, 1), max_features=4)
+    store.add_documents([(u'a.xml', u"Le chat dort."), (u'd.xml', u"Le chat dort dans la cour.")], processes=1)
+    assert len(store.vocabulary) == 4
+    document_frequencies = np.bincount(store.counts.indices, minlength=len(store.vocabulary))
+    assert (document_frequencies > 0).all()
+    store.save()
+    assert FeatureStore(directory, ngram_range=(1, 1), max_features=4).vocabulary == store.vocabulary
+    matrix = store.tfidf()
+    assert matrix.shape == (4, len(store.get_feature_names_out()))
+    shutil.rmtree(directory)
+
+
+def test_feature_store_chunks():
+    """Documents counted by chunks give the same store as in a single chunk: Should pass"""
+    by_chunks = FeatureStore(tempfile.mkdtemp(), ngram_range=(1, 2))
+    single = FeatureStore(tempfile.mkdtemp(), ngram_range=(1, 2))
+    assert by_chunks.add_documents(iter(TEXTS), processes=1, chunk_size=1) == 3
+    single.add_documents(TEXTS, processes=1)
+    assert by_chunks.vocabulary == single.vocabulary
+    assert (by_chunks.counts != single.counts).nnz == 0
+
+    # Unchanged documents are filtered while reading, a modified one is replaced
+    assert by_chunks.add_documents(iter(TEXTS), processes=1, chunk_size=1) == 0
+    assert by_chunks.add_documents([(u'b.xml', u"Le chien dort."), TEXTS[2]], processes=1, chunk_size=1) == 1
+    assert by_chunks.document_ids == [u'a.xml', u'c.xml', u'b.xml']
+    assert by_chunks.counts.shape == (3, len(by_chunks.vocabulary))
+    shutil.rmtree(by_chunks.directory)
+    shutil.rmtree(single.directory)
+
+
+def test_feature_store_remove_documents():
+    """Removed documents leave neither rows nor unused n-grams: Should pass"""
+    directory = tempfile.mkdtemp()
+    store = FeatureStore(directory, ngram_range=(1, 1))
+    store.add_documents(TEXTS, processes=1)
+    assert store.remove_documents([u'a.xml', u'unknown.xml']) == 1
+    assert store.remove_documents([u'a.xml']) == 0
+    assert store.document_ids == [u'b.xml', u'c.xml']
+    assert u'tapis' not in store.vocabulary
+    document_frequencies = np.bincount(store.counts.indices, minlength=len(store.vocabulary))
+    assert (document_frequencies > 0).all()
+    store.save()
+    assert FeatureStore(directory, ngram_range=(1, 1)).manifest() == store.manifest()
+    assert store.tfidf([u'c.xml']).shape[0] == 1
+    shutil.rmtree(directory)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+test_graph_analytics.py is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+"""
+
+import numpy as np
+
+from teiexplorer.corpuscomparer.graph_analytics import (
+    author_projection,
+    degree_statistics,
+    document_components,
+    document_projection,
+    iter_pairs,
+    union_find
+)
+from teiexplorer.corpuscomparer.metadata_graph import CorpusGraph
+
+
+def _graph():
+    """
+    4 documents: doc1 and doc2 are written by hugo and dumas, doc3 by dumas,
+    doc4 by zola. doc1 and doc4 share a date, doc3 and doc4 a series.
+    """
+    labels = [u'doc1', u'doc2', u'doc3', u'doc4', u'hugo', u'dumas', u'zola', u'1862', u'series']
+    node_types = [0, 0, 0, 0, 1, 1, 1, 2, 4]
+    edges = [(0, 4), (0, 5), (1, 4), (1, 5), (2, 5), (3, 6), (0, 7), (3, 7)]
+    return CorpusGraph(node_types, labels, [s for (s, _) in edges], [t for (_, t) in edges])
+
+
+def test_union_find():
+    """Test of the connected components of a graph: Should pass"""
+    components = union_find(7, [5, 1, 6, 2], [4, 2, 5, 3])
+    assert components.tolist() == [0, 1, 1, 1, 2, 2, 2]
+    assert union_find(3, [], []).tolist() == [0, 1, 2]
+
+
+def test_document_components():
+    """Test of the components of the documents linked by some attributes: Should pass"""
+    graph = _graph()
+    (documents, components) = document_components(graph, relations=(u'author',))
+    assert [graph.label(document) for document in documents] == [u'doc1', u'doc2', u'doc3', u'doc4']
+    assert components.tolist() == [0, 0, 0, 1]
+
+    (_, components) = document_components(graph, relations=(u'author', u'date'))
+    assert components.tolist() == [0, 0, 0, 0]
+
+
+def test_projections():
+    """Test of the document-document and author-author projections: Should pass"""
+    graph = _graph()
+
+    (documents, projection) = document_projection(graph, relations=(u'author', u'date'))
+    pairs = sorted(iter_pairs(graph, documents, projection))
+    assert pairs == [(u'doc1', u'doc2', 2), (u'doc1', u'doc3', 1), (u'doc1', u'doc4', 1), (u'doc2', u'doc3', 1)]
+
+    # The author dumas, of 3 documents, is ignored
+    (documents, projection) = document_projection(graph, relations=(u'author',), max_attribute_degree=2)
+    assert sorted(iter_pairs(graph, documents, projection)) == [(u'doc1', u'doc2', 1)]
+
+    (authors, projection) = author_projection(graph)
+    assert [graph.label(author) for author in authors] == [u'hugo', u'dumas', u'zola']
+    assert list(iter_pairs(graph, authors, projection)) == [(u'hugo', u'dumas', 2)]
+
+    statistics = degree_statistics(projection)
+    assert statistics[u'degrees'].tolist() == [1, 1, 0]
+    assert statistics[u'weighted_degrees'].tolist() == [2, 2, 0]
+    assert statistics[u'edges'] == 1
+    assert statistics[u'isolated'] == 1
+    assert statistics[u'max_degree'] == 1
+    assert np.isclose(statistics[u'mean_degree'], 2.0 / 3)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+test_graph_export.py is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+"""
+
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+from xml.dom import minidom
+
+from teiexplorer.corpuscomparer.graph_export import (
+    export_gephi_csv,
+    export_graphml,
+    export_json_lines,
+    iter_edges
+)
+from teiexplorer.corpuscomparer.metadata_graph import CorpusGraph
+
+
+def _graph():
+    """2 documents sharing an author, the first one having a date."""
+    return CorpusGraph(
+        node_types=[0, 0, 1, 2],
+        labels=[u'doc1.xml', u'doc2.xml', u'Hugo & "Victor"', u'1862'],
+        sources=[0, 1, 0, 0],
+        targets=[2, 2, 3, 2])
+
+
+def test_iter_edges():
+    """Test of the iteration on the edges of a graph, by blocks: Should pass"""
+    graph = _graph()
+    edges = [
+        (node, neighbour)
+        for (nodes, neighbours) in iter_edges(graph, block_size=1)
+        for (node, neighbour) in zip(nodes.tolist(), neighbours.tolist())]
+    assert edges == [(0, 2), (0, 3), (1, 2)]
+
+
+def test_exports():
+    """Test of the GraphML, JSON-lines and Gephi CSV exports: Should pass"""
+    graph = _graph()
+    directory = tempfile.mkdtemp()
+    try:
+        graphml_path = os.path.join(directory, u'graph.graphml')
+        export_graphml(graph, graphml_path, block_size=2)
+        graphml = minidom.parse(graphml_path)
+        assert len(graphml.getElementsByTagName(u'node')) == 4
+        assert len(graphml.getElementsByTagName(u'edge')) == 3
+        labels = [data.firstChild.data for data in graphml.getElementsByTagName(u'data')
+                  if data.getAttribute(u'key') == u'label']
+        assert u'Hugo & "Victor"' in labels
+
+        json_path = os.path.join(directory, u'edges.jsonl')
+        export_json_lines(graph, json_path, block_size=2)
+        with io.open(json_path, encoding='utf-8') as json_file:
+            edges = [json.loads(line) for line in json_file]
+        assert len(edges) == 3
+        assert edges[0] == {
+            u'source': 0, u'source_label': u'doc1.xml', u'source_type': u'document',
+            u'target': 2, u'target_label': u'Hugo & "Victor"', u'target_type': u'author'}
+
+        nodes_path = os.path.join(directory, u'nodes.csv')
+        edges_path = os.path.join(directory, u'edges.csv')
+        export_gephi_csv(graph, nodes_path, edges_path, block_size=2)
+        with io.open(nodes_path, encoding='utf-8', newline='') as nodes_file:
+            nodes = list(csv.reader(nodes_file))
+        with io.open(edges_path, encoding='utf-8', newline='') as edges_file:
+            edges = list(csv.reader(edges_file))
+        assert nodes[0] == [u'Id', u'Label', u'Type']
+        assert nodes[3] == [u'2', u'Hugo & "Victor"', u'author']
+        assert edges == [
+            [u'Source', u'Target', u'Type', u'Relation'],
+            [u'0', u'2', u'Undirected', u'author'],
+            [u'0', u'3', u'Undirected', u'date'],
+            [u'1', u'2', u'Undirected', u'author']]
+    finally:
+        shutil.rmtree(directory)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+test_hierarchy.py is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+"""
+
+import os
+import shutil
+import tempfile
+
+import matplotlib
+matplotlib.use("Agg")
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.cluster.hierarchy import fcluster, is_valid_linkage
+from sklearn.preprocessing import normalize
+
+from teiexplorer.corpuscomparer.hierarchy import (
+    connectivity_graph,
+    draw_dendrogram,
+    ward_linkage
+)
+from teiexplorer.corpuscomparer.similarity import top_k_similarities
+
+
+def _blobs(clusters_num=3, documents_num=30, features_num=30):
+    """Documents whose features are drawn from disjoint sets of features."""
+    rng = np.random.RandomState(1)
+    rows = np.zeros((documents_num, features_num))
+    block = features_num // clusters_num
+    for i in range(documents_num):
+        cluster = i % clusters_num
+        rows[i, cluster * block:(cluster + 1) * block] = rng.random_sample(block)
+    return sp.csr_matrix(normalize(rows))
+
+
+def test_connectivity_graph():
+    """Test of the symmetric connectivity of a neighbours graph: Should pass"""
+    graph = connectivity_graph(sp.csr_matrix(np.array([[0, 0.5, 0], [0, 0, 0.2], [0, 0, 0]])))
+    assert np.array_equal(graph.toarray(), np.array([[0, 1, 0], [1, 0, 1], [0, 1, 0]]))
+
+
+def test_ward_linkage():
+    """Test of the ward hierarchy of documents: Should pass"""
+    matrix = _blobs()
+    labels = np.arange(matrix.shape[0]) % 3
+
+    for knn_graph in (None, top_k_similarities(matrix, k=5)):
+        linkage = ward_linkage(matrix, knn_graph=knn_graph, n_components=10)
+        assert linkage.shape == (matrix.shape[0] - 1, 4)
+        assert is_valid_linkage(linkage)
+        assert linkage[-1, 3] == matrix.shape[0]
+
+        clusters = fcluster(linkage, 3, criterion='maxclust')
+        for cluster in range(3):
+            assert len(set(clusters[labels == cluster])) == 1
+        assert len(set(clusters)) == 3
+
+
+def test_draw_dendrogram():
+    """Test of the truncated dendrogram drawing: Should pass"""
+    matrix = _blobs()
+    linkage = ward_linkage(matrix, knn_graph=top_k_similarities(matrix, k=5), n_components=10)
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, u'dendrogram.png')
+        draw_dendrogram(linkage, [u'doc%i' % i for i in range(matrix.shape[0])], path, depth=2)
+        assert os.path.getsize(path) > 0
+    finally:
+        shutil.rmtree(directory)
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+test_import_time.py is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+"""
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules which take hundreds of milliseconds to import
+HEAVY_MODULES = (u'dataset', u'sqlalchemy', u'alembic', u'sklearn', u'matplotlib',
+                 u'seaborn', u'pandas', u'lxml', u'unicodecsv')
+
+# Import time budget of the command line, in microseconds. Timings depend on
+# the load of the machine: the budget is only checked if it is set, e.g.
+# TEIEXPLORER_IMPORT_TIME_BUDGET=500000 python -m pytest tests/test_import_time.py
+IMPORT_TIME_BUDGET = os.environ.get(u'TEIEXPLORER_IMPORT_TIME_BUDGET')
+
+
+def _import_times(arguments):
+    """
+    Runs python -X importtime with arguments.
+    :return: (the imported modules, the total import time in microseconds)
+    """
+    process = subprocess.run(
+        [sys.executable, u'-X', u'importtime'] + arguments,
+        cwd=ROOT, capture_output=True, universal_newlines=True)
+    modules = []
+    total = 0
+    for line in process.stderr.splitlines():
+        if not line.startswith(u'import time:') or u'cumulative' in line:
+            continue
+        (_, cumulative, module) = line[len(u'import time:'):].split(u'|')
+        modules.append(module.strip())
+        # Modules imported by other modules are indented
+        if not module.startswith(u'  '):
+            total += int(cumulative)
+    return modules, total
+
+
+def _heavy_modules(modules):
+    return sorted(module for module in modules if module.split(u'.')[0] in HEAVY_MODULES)
+
+
+def test_cli_import_time():
+    """Test of the modules (and import time) of the command line help: Should pass"""
+    (modules, total) = _import_times([u'main.py', u'--help'])
+    assert u'optparse' in modules
+    assert _heavy_modules(modules) == []
+    if IMPORT_TIME_BUDGET:
+        assert total < int(IMPORT_TIME_BUDGET)
+
+
+def test_comparer_import_time():
+    """Test of the modules imported with the corpus comparer: Should pass"""
+    (modules, _) = _import_times([u'-c', u'import teiexplorer.corpuscomparer.comparer'])
+    assert u'teiexplorer.corpuscomparer.comparer' in modules
+    assert _heavy_modules(modules) == []
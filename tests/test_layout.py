@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+test_layout.py is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+"""
+
+import numpy as np
+import scipy.sparse as sp
+
+from teiexplorer.corpuscomparer.layout import (
+    LAYOUTS,
+    compute_layout,
+    landmark_mds_layout,
+    synthetic_corpus
+)
+
+
+def test_layout_methods():
+    """Every layout method gives finite 2-D coordinates of the sparse matrix rows: Should pass"""
+    X = synthetic_corpus(150, 2000, 0.01)
+    for method in LAYOUTS:
+        xs, ys = compute_layout(X, method)
+        assert xs.shape == ys.shape == (150,)
+        assert np.isfinite(xs).all() and np.isfinite(ys).all()
+
+    try:
+        compute_layout(X, 'tsne')
+        assert False
+    except ValueError:
+        pass
+
+
+def test_layout_landmark_mds():
+    """Landmark MDS places the landmarks at their classical MDS positions: Should pass"""
+    X = synthetic_corpus(60, 500, 0.05)
+    all_landmarks = landmark_mds_layout(X, n_landmarks=60)
+    by_blocks = landmark_mds_layout(X, n_landmarks=60, block_size=7)
+    assert np.allclose(all_landmarks, by_blocks)
+
+
+def test_layout_landmark_mds_distances():
+    """Landmark MDS preserves the distances of documents mixing two topics: Should pass"""
+    angles = np.linspace(0, np.pi / 2, 40)
+    X = sp.csr_matrix(np.column_stack([np.cos(angles), np.sin(angles), np.zeros(40)]))
+    positions = landmark_mds_layout(X, n_landmarks=10)
+
+    # The documents are on an arc: their layout distances grow with their angles
+    distances = np.sqrt(((positions - positions[0]) ** 2).sum(axis=1))
+    assert (np.diff(distances) > 0).all()
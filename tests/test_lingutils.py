@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+test_lingutils.py is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+"""
+
+from teiexplorer.utils.lingutils import (
+    filter_tokens,
+    normalize_language_code,
+    normalize_last_name,
+    parse_person,
+    parse_person_batch,
+    parse_year_date,
+    parse_year_date_batch
+)
+
+
+def test_lingutils_parse_person_batch():
+    """Columnar person parsing gives the same result as parse_person: Should pass"""
+    persons = [
+        u'Ronsard, Pierre de (1524-1585)',
+        u"Olivet, Pierre-Joseph d' (1682-1768)",
+        u'Ronsard, Pierre de (1524-1585)',
+        u'Hugo',
+    ]
+    parsed = parse_person_batch(persons).to_dict('records')
+    truth = [parse_person(p) for p in persons]
+
+    assert parsed == truth
+
+
+def test_lingutils_parse_year_date_batch():
+    """Columnar date parsing gives the same result as parse_year_date: Should pass"""
+    dates = [u'1729', u'17..', u'vers 1650, Paris', u'1729']
+    parsed = [
+        {k: v for k, v in row.items() if v is not None}
+        for row in parse_year_date_batch(dates).to_dict('records')
+    ]
+    truth = [parse_year_date(d) for d in dates]
+
+    assert parsed == truth
+
+
+def test_lingutils_parse_batch_unparsable():
+    """Missing or unparsable values give empty rows: Should pass"""
+    parsed = parse_year_date_batch([None, u'no date']).to_dict('records')
+
+    assert all(v is None for row in parsed for v in row.values())
+
+
+def test_lingutils_normalize_last_name():
+    """Normalise last names for fingerprints and blocking: Should pass"""
+    assert normalize_last_name(u'Pellisson-Fontanier') == u'pellissonfontanier'
+    assert normalize_last_name(u'Rônsard') == u'ronsard'
+    assert normalize_last_name(u"d'Olivet") == u'dolivet'
+    assert normalize_last_name(None) == u''
+    assert parse_person(u'Rônsard, Pierre de (1524-1585)')[u'fingerprint'].startswith(u'ronsard')
+
+
+def test_lingutils_normalize_language_code():
+    """Normalise TEI language identifiers: Should pass"""
+    assert normalize_language_code(u'fre') == u'fr'
+    assert normalize_language_code(u'fr-FR') == u'fr'
+    assert normalize_language_code(u'eng') == u'en'
+    assert normalize_language_code(u'') is None
+
+
+def test_lingutils_filter_tokens():
+    """Keep the lower cased content words of a language: Should pass"""
+    tokens = [u'Le', u'chat', u'dort', u'sur', u'la', u'table', u'.']
+    assert filter_tokens(tokens, u'fre') == [u'chat', u'dort', u'table']
+    assert filter_tokens([u'The', u'cats', u'were', u'sleeping'], u'en') == [u'cats', u'sleeping']
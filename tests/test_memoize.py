@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+test_memoize.py is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+"""
+
+from teiexplorer.utils.memoize import (
+    memoized,
+    configure_caches,
+    cache_statistics
+)
+
+
+@memoized(name=u'test_memoize_square', capacity=2)
+def square(x):
+    return {u'square': x * x}
+
+
+def test_memoize_statistics():
+    """Count hits, misses and evictions of a memoized function: Should pass"""
+    square.clear()
+    for x in [1, 2, 1, 3, 1]:
+        square(x)
+    statistics = cache_statistics()[u'test_memoize_square']
+
+    assert (statistics[u'hits'], statistics[u'misses'], statistics[u'evictions']) == (2, 3, 1)
+
+
+def test_memoize_copy_and_configure():
+    """Cached dicts cannot be altered by callers, caches can be resized: Should pass"""
+    square.clear()
+    square(4)[u'square'] = 0
+    configure_caches({u'test_memoize_square': 10})
+
+    assert square(4) == {u'square': 16}
+    assert cache_statistics()[u'test_memoize_square'][u'capacity'] == 10
@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+test_metadata.py is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+"""
+
+import io
+import os
+import tempfile
+
+from teiexplorer.utils.metadata import iter_tsv_dewey
+
+
+def test_metadata_iter_tsv_dewey():
+    """Stream Dewey correspondences, skipping malformed lines: Should pass"""
+
+    content = (u"cb41526125z\t090\tManuscrits et livres rares\n"
+               u"malformed_line\n"
+               u"\n"
+               u"cb34153359b\t900\tGéographie\n")
+    (fd, dewey_filepath) = tempfile.mkstemp(suffix='.tsv')
+    os.close(fd)
+    with io.open(dewey_filepath, mode='w', encoding='utf-8') as dewey_file:
+        dewey_file.write(content)
+
+    deweys = list(iter_tsv_dewey(dewey_filepath))
+    os.remove(dewey_filepath)
+
+    truth = [
+        (u'cb41526125z', [u'090', u'Manuscrits et livres rares']),
+        (u'cb34153359b', [u'900', u'Géographie']),
+    ]
+    assert deweys == truth
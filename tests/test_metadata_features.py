@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+test_metadata_features.py is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+"""
+
+import shutil
+import tempfile
+
+import dataset
+import numpy as np
+import scipy.sparse as sp
+
+from teiexplorer.corpuscomparer.metadata_features import (
+    align_rows,
+    build_metadata_features,
+    combine_features
+)
+
+
+def _metadata_db(directory):
+    """A metadata DB of 3 documents: doc1 and doc2 share their author and decade."""
+    db = dataset.connect(u'sqlite:///%s/metadata.db' % directory)
+    db['document'].insert_many([
+        {u'_file': u'doc1.xml', u'_tag': u'C1', u'ark': u'ark1'},
+        {u'_file': u'doc2.xml', u'_tag': u'C1', u'ark': u'ark2'},
+        {u'_file': u'doc3.xml', u'_tag': u'C2', u'ark': u'ark3'},
+    ])
+    db['person'].insert_many([
+        {u'id': 1, u'fingerprint': u'hugo victor'},
+        {u'id': 2, u'fingerprint': u'zola emile'},
+    ])
+    db['documentHasAuthor'].insert_many([
+        {u'document_id': u'doc1.xml', u'author_id': 1},
+        {u'document_id': u'doc2.xml', u'author_id': 1},
+        {u'document_id': u'doc3.xml', u'author_id': 2},
+    ])
+    db['date'].insert_many([
+        {u'id': 1, u'deduced_date': 1862},
+        {u'id': 2, u'deduced_date': 1866},
+        {u'id': 3, u'deduced_date': 1885},
+    ])
+    db['documentHasDate'].insert_many([
+        {u'document_id': u'doc1.xml', u'date_id': 1},
+        {u'document_id': u'doc2.xml', u'date_id': 2},
+        {u'document_id': u'doc3.xml', u'date_id': 3},
+    ])
+    db['dewey'].insert_many([
+        {u'ark': u'ark1', u'dewey': u'843'},
+        {u'ark': u'ark3', u'dewey': u'843'},
+    ])
+    return db
+
+
+def test_build_metadata_features():
+    """Test of the metadata features of the documents of a DB: Should pass"""
+    directory = tempfile.mkdtemp()
+    try:
+        db = _metadata_db(directory)
+        matrix, document_ids, feature_names = build_metadata_features(
+            db, document_ids=[u'doc1.xml', u'doc2.xml', u'doc3.xml'])
+
+        assert document_ids == [u'doc1.xml', u'doc2.xml', u'doc3.xml']
+        assert u'author=hugo victor' in feature_names
+        assert u'decade=1860' in feature_names
+        assert u'century=1800' in feature_names
+        assert u'dewey=843' in feature_names
+        assert u'dewey_class=8' in feature_names
+        assert u'corpus_tag=C2' in feature_names
+        assert matrix.shape == (3, len(feature_names))
+        assert np.allclose(sp.linalg.norm(matrix, axis=1), 1.0)
+
+        similarities = (matrix * matrix.T).toarray()
+        assert similarities[0, 1] > similarities[0, 2]
+        assert similarities[0, 1] > similarities[1, 2]
+
+        # Features of new documents, in the space of the previous ones
+        weights = {u'author': 1.0, u'decade': 1.0}
+        _, _, names = build_metadata_features(db, document_ids=[u'doc1.xml'], weights=weights)
+        new_matrix, _, new_names = build_metadata_features(
+            db, document_ids=[u'doc3.xml', u'unknown.xml'], weights=weights, feature_names=names)
+        assert new_names == names
+        assert new_matrix.shape == (2, len(names))
+        assert new_matrix.nnz == 0
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_align_rows():
+    """Test of the reordering of the rows of a matrix: Should pass"""
+    matrix = sp.csr_matrix(np.array([[1, 0], [0, 2]]))
+    aligned = align_rows(matrix, [u'a', u'b'], [u'b', u'c', u'a'])
+    assert np.array_equal(aligned.toarray(), np.array([[0, 2], [0, 0], [1, 0]]))
+
+
+def test_combine_features():
+    """Test of the weighted combination of feature blocks: Should pass"""
+    text = sp.csr_matrix(np.array([[1.0, 0.0], [1.0, 0.0]]))
+    metadata = sp.csr_matrix(np.array([[1.0, 0.0], [0.0, 3.0]]))
+    combined = combine_features([(text, 0.75), (metadata, 0.25), (metadata, 0.0)])
+
+    assert combined.shape == (2, 4)
+    similarities = (combined * combined.T).toarray()
+    assert np.allclose(np.diag(similarities), 1.0)
+    assert np.isclose(similarities[0, 1], 0.75)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+test_metadata_graph.py is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+"""
+
+import shutil
+import tempfile
+
+import dataset
+import numpy as np
+
+from teiexplorer.corpuscomparer.metadata_graph import CorpusGraph
+
+
+def _metadata_db(directory):
+    """A metadata DB of 3 documents: doc1 and doc2 share their author and series."""
+    db = dataset.connect(u'sqlite:///%s/metadata.db' % directory)
+    db['document'].insert_many([
+        {u'_file': u'doc1.xml', u'_tag': u'C1'},
+        {u'_file': u'doc2.xml', u'_tag': u'C1'},
+        {u'_file': u'doc3.xml', u'_tag': u'C2'},
+    ])
+    db['person'].insert_many([
+        {u'id': 1, u'fingerprint': u'hugo victor'},
+        {u'id': 2, u'fingerprint': u'zola emile'},
+    ])
+    db['documentHasAuthor'].insert_many([
+        {u'document_id': u'doc1.xml', u'author_id': 1},
+        {u'document_id': u'doc2.xml', u'author_id': 1},
+        {u'document_id': u'doc3.xml', u'author_id': 2},
+        {u'document_id': u'doc3.xml', u'author_id': 2},
+    ])
+    db['date'].insert_many([
+        {u'id': 1, u'deduced_date': 1862},
+        {u'id': 2, u'deduced_date': None},
+    ])
+    db['documentHasDate'].insert_many([
+        {u'document_id': u'doc1.xml', u'date_id': 1},
+        {u'document_id': u'doc2.xml', u'date_id': 2},
+    ])
+    db['identifier'].insert_many([
+        {u'id': 1, u'idno': u'ark:/12148/bpt6k1'},
+    ])
+    db['documentHasIdentifier'].insert_many([
+        {u'document_id': u'doc3.xml', u'idno_id': 1},
+    ])
+    db['title'].insert_many([
+        {u'id': 1, u'title': u'Les Misérables'},
+        {u'id': 2, u'title': u'Œuvres complètes'},
+    ])
+    db['documentHasTitle'].insert_many([
+        {u'document_id': u'doc1.xml', u'title_id': 1, u'from_xml_element': u'_#fileDesc#titleStmt'},
+        {u'document_id': u'doc1.xml', u'title_id': 2, u'from_xml_element': u'_#fileDesc#seriesStmt'},
+        {u'document_id': u'doc2.xml', u'title_id': 2, u'from_xml_element': u'_#fileDesc#seriesStmt'},
+    ])
+    return db
+
+
+def test_corpus_graph():
+    """Test of the documents-attributes graph of a metadata DB: Should pass"""
+    directory = tempfile.mkdtemp()
+    try:
+        graph = CorpusGraph.from_database(_metadata_db(directory))
+
+        assert len(graph.nodes(u'document')) == 3
+        assert len(graph.nodes(u'author')) == 2
+        assert len(graph.nodes(u'date')) == 1
+        assert len(graph.nodes(u'series')) == 1
+        assert graph.n_edges == 7
+        assert graph.indices.dtype == np.int32
+
+        hugo = graph.node_id(u'author', u'hugo victor')
+        assert graph.node_type(hugo) == u'author'
+        assert [graph.label(node) for node in graph.neighbours(hugo)] == [u'doc1.xml', u'doc2.xml']
+
+        doc1 = graph.node_id(u'document', u'doc1.xml')
+        assert [graph.label(node) for node in graph.neighbours(doc1)] == \
+               [u'hugo victor', u'1862', u'Œuvres complètes']
+        assert [graph.label(node) for node in graph.neighbours(doc1, u'series')] == [u'Œuvres complètes']
+
+        doc3 = graph.node_id(u'document', u'doc3.xml')
+        assert len(graph.neighbours(doc3)) == 2
+
+        assert graph.degrees().sum() == 2 * graph.n_edges
+        adjacency = graph.adjacency()
+        assert (adjacency != adjacency.T).nnz == 0
+    finally:
+        shutil.rmtree(directory)
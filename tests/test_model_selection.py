@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+test_model_selection.py is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+"""
+
+import shutil
+import tempfile
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.preprocessing import normalize
+
+from teiexplorer.corpuscomparer.model_selection import (
+    load_shared_matrix,
+    select_n_clusters,
+    share_matrix
+)
+
+
+def _blobs(clusters_num=3, documents_num=60, features_num=40):
+    """Documents whose features are drawn from disjoint sets of features."""
+    rng = np.random.RandomState(1)
+    rows = np.zeros((documents_num, features_num))
+    block = features_num // clusters_num
+    for i in range(documents_num):
+        cluster = i % clusters_num
+        rows[i, cluster * block:(cluster + 1) * block] = rng.random_sample(block)
+    return normalize(sp.csr_matrix(rows))
+
+
+def test_model_selection_shared_matrix():
+    """A shared matrix is memory-mapped back unchanged: Should pass"""
+    directory = tempfile.mkdtemp()
+    matrix = _blobs()
+    shared = load_shared_matrix(share_matrix(matrix, directory))
+    # Read-only views of the memory-mapped files, not copies
+    assert not shared.data.flags.writeable
+    assert (shared != matrix).nnz == 0
+    del shared
+    shutil.rmtree(directory)
+
+
+def test_model_selection_best_k():
+    """The number of well separated clusters has the best silhouette: Should pass"""
+    scores, model = select_n_clusters(_blobs(), range(1, 6), processes=2, sample_size=None)
+    assert [score[u'k'] for score in scores] == [2, 3, 4, 5]
+    assert model.n_clusters == 3
+    assert scores[0][u'inertia'] > scores[1][u'inertia']
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+test_near_duplicates.py is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+"""
+
+import random
+
+from teiexplorer.corpuscomparer.near_duplicates import (
+    LSHIndex,
+    MinHasher,
+    estimate_jaccard,
+    find_near_duplicates,
+    optimal_bands
+)
+
+
+def _random_tokens(rng, length, vocabulary_size=5000):
+    return [u'w%i' % rng.randint(0, vocabulary_size) for _ in range(length)]
+
+
+def test_near_duplicates_minhash():
+    """MinHash signatures estimate the Jaccard similarity of shingle sets: Should pass"""
+    rng = random.Random(1)
+    tokens = _random_tokens(rng, 2000)
+    modified = list(tokens)
+    for i in range(0, len(modified), 40):
+        modified[i] = u'x'
+
+    minhasher = MinHasher(num_perm=256, shingle_size=5)
+    shingles = lambda t: set(u' '.join(t[i:i + 5]) for i in range(len(t) - 4))
+    jaccard = float(len(shingles(tokens) & shingles(modified))) / len(shingles(tokens) | shingles(modified))
+
+    assert estimate_jaccard(minhasher.signature(tokens), minhasher.signature(tokens)) == 1.0
+    assert abs(estimate_jaccard(minhasher.signature(tokens), minhasher.signature(modified)) - jaccard) < 0.1
+    assert estimate_jaccard(minhasher.signature(tokens), minhasher.signature(_random_tokens(rng, 2000))) < 0.05
+
+
+def test_near_duplicates_lsh():
+    """Only the near-duplicate documents are found: Should pass"""
+    rng = random.Random(1)
+    documents = [(u'doc%i.xml' % i, _random_tokens(rng, 500)) for i in range(300)]
+    documents.append((u'copy.xml', documents[42][1][:490] + [u'fin']))
+    documents.append((u'empty.xml', []))
+
+    assert find_near_duplicates(documents, threshold=0.8)[0][:2] == (u'doc42.xml', u'copy.xml')
+    assert len(find_near_duplicates(documents, threshold=0.8)) == 1
+
+    assert optimal_bands(128, 0.8) == 16
+    try:
+        LSHIndex(num_perm=128, bands=10)
+        assert False
+    except ValueError:
+        pass
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+test_pipeline.py is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+"""
+
+import io
+import json
+import os
+import shutil
+import tempfile
+
+import unicodecsv
+
+from teiexplorer.corpusreader.pipeline import (
+    DocumentPipeline,
+    iter_tei_documents,
+    JSONLinesSink,
+    OmekaCSVSink,
+    Sink
+)
+
+TEI_DOCUMENT = u"""<?xml version="1.0" encoding="UTF-8"?>
+<TEI xmlns="http://www.tei-c.org/ns/1.0">
+<teiHeader>
+ <fileDesc>
+  <titleStmt><title>%(title)s</title><author key="%(key)s">%(author)s</author></titleStmt>
+  <publicationStmt><publisher>OBVIL</publisher><idno>http://gallica.bnf.fr/ark:/12148/%(ark)s</idno></publicationStmt>
+ </fileDesc>
+</teiHeader>
+<text><body><p>Le chat dort sur la table du salon.</p></body></text>
+</TEI>
+"""
+
+
+class _ListSink(Sink):
+    """Keeps the documents it receives."""
+
+    def __init__(self, name, fail_at=None):
+        self.name = name
+        self.fail_at = fail_at
+        self.documents = []
+        self.closed = False
+
+    def write(self, document):
+        if len(self.documents) == self.fail_at:
+            raise ValueError(u"Sink failure")
+        self.documents.append(document)
+
+    def close(self):
+        self.closed = True
+
+
+def _corpus(directory):
+    """Writes 3 TEI documents in directory."""
+    for (i, (title, author)) in enumerate([(u'Les Misérables', u'Hugo, Victor'),
+                                           (u'Notre-Dame de Paris', u'Hugo, Victor'),
+                                           (u'Candide', u'Voltaire')]):
+        with io.open(os.path.join(directory, u'doc%i.xml' % i), 'w', encoding='utf-8') as tei_file:
+            tei_file.write(TEI_DOCUMENT % {u'title': title, u'author': author, u'key': i, u'ark': u'bpt6k%i' % i})
+    return {u'T': os.path.join(directory, u'*.xml')}
+
+
+def test_pipeline_fan_out():
+    """Test that each sink receives each document once, in order: Should pass"""
+    sinks = [_ListSink(u'first'), _ListSink(u'second')]
+    assert DocumentPipeline(sinks, queue_size=2).run(range(100)) == 100
+    for sink in sinks:
+        assert sink.documents == list(range(100))
+        assert sink.closed
+
+
+def test_pipeline_sink_failure():
+    """Test that the failure of a sink stops the pipeline without blocking it: Should pass"""
+    sinks = [_ListSink(u'first'), _ListSink(u'failing', fail_at=3)]
+    try:
+        DocumentPipeline(sinks, queue_size=1).run(range(1000))
+        assert False
+    except ValueError:
+        pass
+    assert sinks[0].closed
+    assert not sinks[1].closed
+    assert sinks[1].documents == [0, 1, 2]
+
+
+def test_pipeline_tei_sinks():
+    """Test of the parse of TEI documents, written in Omeka CSV and JSON-lines files: Should pass"""
+    directory = tempfile.mkdtemp()
+    try:
+        corpora = _corpus(directory)
+        documents = list(iter_tei_documents(corpora))
+        assert len(documents) == 3
+        # The metadata dicts are not shared by the documents
+        assert len(set(id(document.document_metadata) for document in documents)) == 3
+        assert len(list(iter_tei_documents(corpora, debug_size=2))) == 2
+
+        csv_folder = os.path.join(directory, u'omeka')
+        json_path = os.path.join(directory, u'metadata.jsonl')
+        DocumentPipeline([OmekaCSVSink(csv_folder), JSONLinesSink(json_path)]).run(iter_tei_documents(corpora))
+
+        with open(os.path.join(csv_folder, u'T.csv'), 'rb') as csv_file:
+            rows = list(unicodecsv.reader(csv_file, encoding='utf-8'))
+        assert len(rows) == 4
+        assert rows[0][0] == u'dcterms:format'
+        assert u'dcterms:title' in rows[0]
+        titles = [row[rows[0].index(u'dcterms:title')] for row in rows[1:]]
+        assert sorted(titles) == [u'Candide', u'Les Misérables', u'Notre-Dame de Paris']
+
+        with io.open(json_path, encoding='utf-8') as json_file:
+            lines = [json.loads(line) for line in json_file]
+        assert sorted(line[u'document'][u'_file'] for line in lines) == sorted(
+            document.filePath for document in documents)
+        assert all(line[u'document'][u'_tag'] == u'T' for line in lines)
+    finally:
+        shutil.rmtree(directory)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+test_reconciliation.py is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+"""
+
+import dataset
+
+from teiexplorer.utils.reconciliation import (
+    AuthorReconciler,
+    are_years_compatible
+)
+
+
+def test_reconciliation_are_years_compatible():
+    """Compare partial years: Should pass"""
+    assert are_years_compatible(u'1524', u'15..') is True
+    assert are_years_compatible(u'1524', u'1585') is False
+    assert are_years_compatible(u'1524', None) is None
+
+
+def test_reconciliation_score():
+    """Score profiles (initials, birth, death, key) of a same block: Should pass"""
+    reconciler = AuthorReconciler(db=None)
+    denis = (u'd', u'1713', u'1784', u'')
+    assert reconciler.score(denis, (u'd', u'', u'', u'')) >= reconciler.MATCH_THRESHOLD
+    assert reconciler.score(denis, (u'd', u'1800', u'', u'')) == 0.0
+    assert reconciler.score((u'd', u'', u'', u'1'), (u'dm', u'', u'', u'1')) == 1.0
+    assert reconciler.score((u'd', u'', u'', u'1'), (u'd', u'', u'', u'2')) == 0.0
+
+
+def _persons_db():
+    """A metadata DB with a person table of known clusters."""
+    db = dataset.connect(u'sqlite:///:memory:')
+    db['person'].insert_many([
+        # Same BnF key, different keys are never merged
+        {u'id': 1, u'last_name': u'Hugo', u'first_name_or_initials': u'Victor', u'key': u'11907966'},
+        {u'id': 2, u'last_name': u'HUGO', u'first_name_or_initials': u'V.', u'key': u'11907966'},
+        {u'id': 3, u'last_name': u'Hugo', u'first_name_or_initials': u'Victor', u'key': u'99999999'},
+        # Compatible years, contradictory years
+        {u'id': 4, u'last_name': u'Diderot', u'first_name_or_initials': u'Denis', u'birth': u'1713', u'death': u'1784'},
+        {u'id': 5, u'last_name': u'Diderot', u'first_name_or_initials': u'Denis', u'birth': u'17..'},
+        {u'id': 6, u'last_name': u'Diderot', u'first_name_or_initials': u'Didier', u'birth': u'1800'},
+        # A person without first name, attached to the only block of its last name
+        {u'id': 7, u'last_name': u'Ronsard', u'first_name_or_initials': u'Pierre', u'death': u'1585'},
+        {u'id': 8, u'last_name': u'Ronsard', u'death': u'1585'},
+        # Same block: a BnF key known for a single profile does not prevent the match
+        {u'id': 9, u'last_name': u'Ronsard', u'first_name_or_initials': u'Pierre', u'death': u'1585', u'key': u'1'},
+        # Other blocks (last name, first initial) are never compared, even with the same years
+        {u'id': 10, u'last_name': u'Ronsart', u'first_name_or_initials': u'Pierre', u'death': u'1585'},
+        {u'id': 12, u'last_name': u'Diderot', u'first_name_or_initials': u'Angélique',
+         u'birth': u'1713', u'death': u'1784'},
+        {u'id': 11, u'last_name': None, u'first_name_or_initials': u'Anonyme'},
+    ])
+    return db
+
+
+def test_reconciliation_clusters():
+    """Cluster the persons of a DB by block, from the best matches to the worst: Should pass"""
+    db = _persons_db()
+    clusters = dict((row[u'person_id'], row[u'cluster_id']) for row in AuthorReconciler(db).clusters())
+
+    # Persons without last name are not reconciled
+    assert sorted(clusters.keys()) == list(range(1, 11)) + [12]
+    assert clusters[1] == clusters[2] == 1
+    assert clusters[3] == 3
+    assert clusters[4] == clusters[5] == 4
+    assert clusters[6] == 6
+    assert clusters[7] == clusters[8] == clusters[9] == 7
+    assert clusters[10] == 10
+    assert clusters[12] == 12
+
+
+def test_reconciliation_save_clusters():
+    """Save the person clusters in the person_cluster table, replacing the previous ones: Should pass"""
+    db = _persons_db()
+    reconciler = AuthorReconciler(db)
+    assert reconciler.save_clusters(batch_size=2) == 7
+    assert reconciler.save_clusters() == 7
+
+    cluster_table = db['person_cluster']
+    assert cluster_table.count() == 11
+    assert cluster_table.find_one(person_id=2)[u'cluster_id'] == 1
+    assert cluster_table.has_index([u'cluster_id'])
+    blocks = set(row[u'block'] for row in cluster_table.find(cluster_id=7))
+    assert len(blocks) == 1
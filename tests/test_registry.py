@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+test_registry.py is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+"""
+
+import os
+import pickle
+
+from teiexplorer.corpuscomparer.registry import DocumentRegistry
+
+
+def test_registry_ids():
+    """Documents get dense ids, a re-added document keeps its id: Should pass"""
+    registry = DocumentRegistry()
+    assert registry.add(u'a.xml', u"Le chat dort.") == 0
+    assert registry.add(u'b.xml', u"L'été à Noël") == 1
+    assert registry.add(u'a.xml', u"Le chien dort.") == 0
+
+    assert len(registry) == 2
+    assert u'b.xml' in registry
+    assert registry.get_id(u'b.xml') == 1
+    assert registry.get_text(1) == u"L'été à Noël"
+    assert list(registry.items()) == [(u'a.xml', u"Le chien dort."), (u'b.xml', u"L'été à Noël")]
+
+    directory = registry.directory
+    registry.close()
+    assert not os.path.exists(directory)
+
+
+def test_registry_pickle():
+    """An unpickled registry reads the same text store: Should pass"""
+    registry = DocumentRegistry()
+    registry.add(u'a.xml', u"Le chat dort.")
+    registry.add(u'b.xml', u"La cour.")
+
+    copy = pickle.loads(pickle.dumps(registry))
+    assert copy.get_text(u'b.xml') == u"La cour."
+    copy.close()
+    assert os.path.exists(registry.directory)
+    registry.close()
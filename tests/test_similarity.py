@@ -0,0 +1,28 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+test_similarity.py is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+"""
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.preprocessing import normalize
+
+from teiexplorer.corpuscomparer.similarity import top_k_similarities
+
+
+def test_similarity_top_k():
+    """Blocked top-k similarities equal the best dense cosine similarities: Should pass"""
+    X = normalize(sp.random(200, 300, density=0.05, format='csr', random_state=1))
+    knn_graph = top_k_similarities(X, k=3, block_size=64)
+
+    dense = (X * X.T).toarray()
+    np.fill_diagonal(dense, 0)
+    truth = np.sort(dense, axis=1)[:, -3:]
+
+    assert knn_graph.shape == (200, 200)
+    assert knn_graph.diagonal().sum() == 0
+    assert (knn_graph.getnnz(axis=1) <= 3).all()
+    assert np.allclose(np.sort(knn_graph.toarray(), axis=1)[:, -3:], truth, atol=1e-5)
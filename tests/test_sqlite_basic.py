@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+test_sqlite_basic.py is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+"""
+
+import io
+import os
+import shutil
+import tempfile
+
+import dataset
+
+from teiexplorer.corpusreader import tei_content_scraper as tcscraper
+from teiexplorer.utils.sqlite_basic import (
+    CorpusSQLiteDBReader,
+    CorpusSQLiteDBWriter,
+    search_expression,
+    SEARCH_INDEX_TABLE,
+    warm_up_caches
+)
+from teiexplorer.utils.lingutils import parse_person
+from teiexplorer.utils.memoize import cache_statistics
+
+TEI_DOCUMENT = u"""<?xml version="1.0" encoding="UTF-8"?>
+<TEI xmlns="http://www.tei-c.org/ns/1.0" xml:id="cb%(key)s">
+<teiHeader>
+ <fileDesc>
+  <titleStmt><title>%(title)s</title><author key="%(key)s">%(author)s</author></titleStmt>
+  <publicationStmt><publisher>OBVIL</publisher><idno>http://gallica.bnf.fr/ark:/12148/%(ark)s</idno></publicationStmt>
+  <sourceDesc><bibl><date when="%(date)s">%(date)s</date></bibl></sourceDesc>
+ </fileDesc>
+</teiHeader>
+<text><body><p>Le chat dort sur la table du salon.</p></body></text>
+</TEI>
+"""
+
+DOCUMENTS = [
+    (u'doc0.xml', u"Histoire de l'Académie françoise", u'Olivet, Pierre-Joseph d\' (1682-1768)'),
+    (u'doc1.xml', u'Mémoires', u'Saint-Simon, Louis de Rouvroy (1675-1755)'),
+    (u'doc2.xml', u'Les Amours', u'Ronsard, Pierre de (1524-1585)'),
+]
+
+
+def _write_tei(directory, filename, title, author, key=0):
+    document_file = os.path.join(directory, filename)
+    with io.open(document_file, 'w', encoding='utf-8') as tei_file:
+        tei_file.write(TEI_DOCUMENT % {u'title': title, u'author': author, u'key': key,
+                                       u'ark': u'bpt6k%i' % key, u'date': 1700 + key})
+    return document_file
+
+
+def _database(directory, documents=DOCUMENTS, corpus_tag=u'T'):
+    """A metadata DB of the documents, written in directory."""
+    db_name = os.path.join(directory, u'metadata.db')
+    writer = CorpusSQLiteDBWriter(db_name)
+    for (key, (filename, title, author)) in enumerate(documents):
+        document_file = _write_tei(directory, filename, title, author, key)
+        writer.add_xml_document(tcscraper.TeiContent(document_file, corpus_tag))
+    return db_name, writer
+
+
+def test_search_expression():
+    """Test of the quoting of the terms of a search query: Should pass"""
+    assert search_expression(u'Saint-Simon') == u'"Saint-Simon"'
+    assert search_expression(u"l'académie  françoise") == u'"l\'académie" "françoise"'
+    assert search_expression(u'title:Mémoires OR ronsa*') == u'title:"Mémoires" OR "ronsa"*'
+    assert search_expression(u'unknown:x') == u'"unknown:x"'
+    assert search_expression(u'say "hello"') == u'"say" """hello"""'
+    assert search_expression(u'AND ronsard OR') == u'"ronsard"'
+    assert search_expression(u'  ') == u''
+
+
+def test_search():
+    """Test of the full-text search, with accents, hyphens and column filters: Should pass"""
+    directory = tempfile.mkdtemp()
+    try:
+        (db_name, _) = _database(directory)
+        reader = CorpusSQLiteDBReader(db_name)
+        files = dict((filename, os.path.join(directory, filename)) for (filename, _, _) in DOCUMENTS)
+
+        assert reader.search(u'Saint-Simon') == [files[u'doc1.xml']]
+        assert reader.search(u"l'académie") == [files[u'doc0.xml']]
+        assert reader.search(u'academie FRANCOISE') == [files[u'doc0.xml']]
+        assert reader.search(u'memoires') == [files[u'doc1.xml']]
+        assert reader.search(u'title:ronsard') == []
+        assert reader.search(u'author:ronsard') == [files[u'doc2.xml']]
+        assert reader.search(u'rons*') == [files[u'doc2.xml']]
+        assert sorted(reader.search(u'ronsard OR olivet')) == [files[u'doc0.xml'], files[u'doc2.xml']]
+        assert reader.search(u'ronsard', raw=True) == [files[u'doc2.xml']]
+        assert reader.search(u'') == []
+        try:
+            reader.search(u'Saint-Simon', raw=True)
+            assert False
+        except ValueError:
+            pass
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_search_index_maintenance():
+    """Test that each document has a single search entry, keyed by its rowid, after re-indexing: Should pass"""
+    directory = tempfile.mkdtemp()
+    try:
+        (db_name, writer) = _database(directory)
+        doc0 = os.path.join(directory, u'doc0.xml')
+
+        def entries():
+            return [(r[u'rowid'], r[u'document_id']) for r in writer.db.query(
+                u'SELECT rowid, document_id FROM %s ORDER BY rowid' % SEARCH_INDEX_TABLE)]
+
+        assert entries() == [(writer._document_rowid(os.path.join(directory, filename)),
+                              os.path.join(directory, filename)) for (filename, _, _) in DOCUMENTS]
+
+        # Re-indexing a document replaces its entry
+        writer._index_document(doc0, [{u'title': u'Nouveau titre'}], [], [])
+        assert len(entries()) == len(DOCUMENTS)
+        reader = CorpusSQLiteDBReader(db_name)
+        assert reader.search(u'nouveau') == [doc0]
+        assert reader.search(u'académie') == []
+
+        # Entries which are not keyed by the rowid of their document are rebuilt
+        with writer.db:
+            writer.db.query(u'UPDATE %s SET rowid = rowid + 100' % SEARCH_INDEX_TABLE)
+        writer = CorpusSQLiteDBWriter(db_name)
+        assert writer._search_index_is_keyed()
+        assert len(entries()) == len(DOCUMENTS)
+        assert reader.search(u'académie') == [doc0]
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_import_dewey():
+    """Test that Dewey codes are imported once in the indexed dewey table: Should pass"""
+    directory = tempfile.mkdtemp()
+    try:
+        (db_name, writer) = _database(directory)
+        dewey_filepath = os.path.join(directory, u'dewey.tsv')
+        with io.open(dewey_filepath, 'w', encoding='utf-8') as dewey_file:
+            dewey_file.write(u"cb0\t900\tHistoire\n"
+                             u"cb2\t841\tPoésie française\n"
+                             u"cb2\t800\tDuplicated entry\n"
+                             u"malformed_line\n")
+
+        # The dewey table is only created by the import
+        assert u'dewey' not in writer.db.tables
+        assert u'dewey' not in CorpusSQLiteDBWriter(db_name).db.tables
+        assert not CorpusSQLiteDBReader(db_name).has_dewey()
+        assert writer.import_dewey(dewey_filepath, batch_size=1) == 2
+        assert writer.import_dewey(dewey_filepath) == 2
+
+        assert u'dewey' in writer.db.tables
+        assert writer.db['dewey'].count() == 2
+        # ark is the primary key of the table: Dewey codes are joined with an index lookup
+        plan = u' '.join(u'%s' % row[u'detail'] for row in writer.db.query(
+            u'EXPLAIN QUERY PLAN SELECT dewey FROM dewey WHERE ark = :ark', ark=u'cb0'))
+        assert u'USING INDEX' in plan
+
+        reader = CorpusSQLiteDBReader(db_name)
+        assert reader.has_dewey()
+        deweys = dict((document[u'ark'], document[u'dewey']) for document in reader.iter_documents())
+        assert deweys == {u'cb0': u'900 - Histoire', u'cb1': None, u'cb2': u'841 - Poésie française'}
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_iter_documents():
+    """Test of the keyset pagination of the documents, resumed and filtered by corpus: Should pass"""
+    directory = tempfile.mkdtemp()
+    try:
+        documents = [(u'doc%i.xml' % i, u'Titre %i' % i, u'Auteur%i, Jean' % i) for i in range(7)]
+        (db_name, writer) = _database(directory, documents[:5], corpus_tag=u'A')
+        for (key, (filename, title, author)) in enumerate(documents[5:], 5):
+            document_file = _write_tei(directory, filename, title, author, key)
+            writer.add_xml_document(tcscraper.TeiContent(document_file, u'B'))
+        reader = CorpusSQLiteDBReader(db_name)
+        files = [os.path.join(directory, filename) for (filename, _, _) in documents]
+
+        # Batch boundaries: batches of 1, of a divisor of 7, of more than 7 documents
+        for batch_size in [1, 7, 3, 100]:
+            rows = list(reader.iter_documents(batch_size=batch_size))
+            assert [row[u'_file'] for row in rows] == files
+            rowids = [row[u'_rowid'] for row in rows]
+            assert rowids == sorted(rowids)
+
+        # Resuming after the 3rd document
+        rowids = [row[u'_rowid'] for row in reader.iter_documents()]
+        assert [row[u'_file'] for row in reader.iter_documents(since_rowid=rowids[2], batch_size=2)] == files[3:]
+        assert list(reader.iter_documents(since_rowid=rowids[-1])) == []
+
+        # Filtering on the corpus
+        assert [row[u'_file'] for row in reader.iter_documents(corpus_tag=u'B', batch_size=1)] == files[5:]
+        assert [row[u'_file'] for row in reader.iter_documents(
+            corpus_tag=u'A', since_rowid=rowids[1], batch_size=2)] == files[2:5]
+        assert list(reader.iter_documents(corpus_tag=u'C')) == []
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_renormalize():
+    """Test that renormalize recomputes the persons, dates and search index of the whole DB: Should pass"""
+    directory = tempfile.mkdtemp()
+    try:
+        (db_name, writer) = _database(directory)
+        doc2 = os.path.join(directory, u'doc2.xml')
+        ronsard = writer.person_table.find_one(last_name=u'Ronsard')
+        # Raw values changed since they were parsed
+        with writer.db:
+            writer.person_table.update(
+                {u'id': ronsard[u'id'], u'author': u'Baïf, Jean-Antoine de (1532-1589)'}, [u'id'])
+            writer.date_table.update({u'id': 1, u'when': u'vers 1650'}, [u'id'])
+
+        writer.renormalize(batch_size=2)
+
+        person = writer.person_table.find_one(id=ronsard[u'id'])
+        assert (person[u'last_name'], person[u'birth'], person[u'fingerprint']) == (u'Baïf', u'1532', u'baifja')
+        assert writer.date_table.find_one(id=1)[u'deduced_date'] == 1650
+
+        reader = CorpusSQLiteDBReader(db_name)
+        assert reader.search(u'fingerprint:baifja') == [doc2]
+        assert reader.search(u'fingerprint:ronsardp') == []
+        assert reader.search(u'title:amours') == [doc2]
+        assert writer.db[SEARCH_INDEX_TABLE].count() == len(DOCUMENTS)
+        assert writer._search_index_is_keyed()
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_rebuild_search_index():
+    """Test that the rebuilt search index equals the index maintained on insert: Should pass"""
+    directory = tempfile.mkdtemp()
+    try:
+        (_, writer) = _database(directory)
+        query = u'SELECT rowid, * FROM %s ORDER BY rowid' % SEARCH_INDEX_TABLE
+        entries = [dict(row) for row in writer.db.query(query)]
+        writer.rebuild_search_index(batch_size=2)
+        assert [dict(row) for row in writer.db.query(query)] == entries
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_warm_up_caches():
+    """Test that the caches are warmed up from a metadata DB, without modifying it: Should pass"""
+    directory = tempfile.mkdtemp()
+    try:
+        db_name = os.path.join(directory, u'metadata.db')
+        db = dataset.connect(u'sqlite:///%s' % db_name)
+        for table in [u'date', u'document', u'documentHasAuthor', u'documentHasDate',
+                      u'documentHasIdentifier', u'documentHasTitle', u'identifier', u'title']:
+            db[table].insert({u'id': 1})
+        db['person'].insert({u'author': u'Jodelle, Étienne (1532-1573)'})
+        tables = set(db.tables)
+
+        warm_up_caches(CorpusSQLiteDBReader(db_name).db)
+        assert set(dataset.connect(u'sqlite:///%s' % db_name).tables) == tables
+        hits = cache_statistics()[u'parse_person'][u'hits']
+        parse_person(u'Jodelle, Étienne (1532-1573)')
+        assert cache_statistics()[u'parse_person'][u'hits'] == hits + 1
+    finally:
+        shutil.rmtree(directory)
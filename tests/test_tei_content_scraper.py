@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+test_tei_content_scraper.py is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+"""
+
+import io
+import os
+import shutil
+import tempfile
+
+from teiexplorer.corpusreader.tei_content_scraper import TeiContent
+
+TEI_DOCUMENT = u"""<?xml version="1.0" encoding="UTF-8"?>
+<TEI xmlns="http://www.tei-c.org/ns/1.0">
+<teiHeader>
+ <fileDesc>
+  <titleStmt><title>Titre</title></titleStmt>
+ </fileDesc>%(profile)s
+</teiHeader>
+<text><body><p>%(body)s</p></body></text>
+</TEI>
+"""
+
+
+def _tei_content(directory, profile, body):
+    document_file = os.path.join(directory, u'doc.xml')
+    with io.open(document_file, 'w', encoding='utf-8') as tei_file:
+        tei_file.write(TEI_DOCUMENT % {u'profile': profile, u'body': body})
+    return TeiContent(document_file, u'T')
+
+
+def test_tei_content_scraper_get_language():
+    """Test that the language is read from the langUsage ident, even on an empty element: Should pass"""
+    directory = tempfile.mkdtemp()
+    try:
+        english = _tei_content(
+            directory,
+            u'<profileDesc><langUsage><language ident="eng"/></langUsage></profileDesc>',
+            u'The cat was sleeping on the table.')
+        assert english.get_language() == u'en'
+        assert english.get_content_words(stem=True) == [u'cat', u'sleep', u'tabl']
+
+        french = _tei_content(
+            directory,
+            u'<profileDesc><langUsage><language ident="fr">français</language></langUsage></profileDesc>',
+            u'Le chat dort sur la table.')
+        assert french.get_language() == u'fr'
+
+        undeclared = _tei_content(directory, u'', u'Le chat dort sur la table.')
+        assert undeclared.get_language() == u'fr'
+        assert undeclared.get_language(default=u'la') == u'la'
+    finally:
+        shutil.rmtree(directory)
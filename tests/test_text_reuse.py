@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+test_text_reuse.py is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+"""
+
+import random
+from collections import Counter
+
+from teiexplorer.corpuscomparer.text_reuse import (
+    NgramIndex,
+    align_texts,
+    chain_seeds,
+    find_text_reuse,
+    ngram_hashes
+)
+
+
+def _random_text(rng, length):
+    return u' '.join(u'mot%i' % rng.randint(0, 3000) for _ in range(length))
+
+
+def test_text_reuse_index():
+    """N-gram postings and candidate pairs of documents: Should pass"""
+    index = NgramIndex(ngram_size=2, max_document_frequency=2)
+    index.add_document(u'a', [u'le', u'chat', u'dort', u'ici'])
+    index.add_document(u'b', [u'un', u'chat', u'dort', u'ici'])
+    index.add_document(u'c', [u'le', u'chat', u'mange'])
+
+    assert index.postings(ngram_hashes([u'chat', u'dort'], 2)[0]) == [(u'a', 1), (u'b', 1)]
+    assert index.candidate_pairs(min_shared=2) == {(0, 1): 2}
+    assert index.candidate_pairs(min_shared=1) == {(0, 1): 2, (0, 2): 1}
+
+
+def test_text_reuse_chain_seeds():
+    """Seeds are chained along their diagonal, despite small gaps: Should pass"""
+    seeds = [(10, 3), (11, 4), (15, 8), (40, 90), (100, 3)]
+    assert chain_seeds(seeds, max_gap=10) == [[10, 15, 3, 8, 3], [40, 40, 90, 90, 1], [100, 100, 3, 3, 1]]
+
+
+def test_text_reuse_align():
+    """A modified borrowed passage is aligned with character offsets: Should pass"""
+    rng = random.Random(2)
+    borrowed = _random_text(rng, 60)
+    text = u'%s %s %s' % (_random_text(rng, 200), borrowed, _random_text(rng, 100))
+    modified = borrowed.split()
+    modified[30] = u'autre'
+    other_text = u'%s %s %s' % (_random_text(rng, 50), u' '.join(modified), _random_text(rng, 300))
+
+    [(start, end, other_start, other_end, length)] = align_texts(text, other_text)
+    assert text[start:end] == borrowed
+    assert other_text[other_start:other_end] == u' '.join(modified)
+    assert length == 60
+
+
+def test_text_reuse_find():
+    """Passages of a corpus are found in a process pool: Should pass"""
+    rng = random.Random(3)
+    borrowed = _random_text(rng, 40)
+    texts = {
+        u'a.xml': u'%s %s' % (_random_text(rng, 100), borrowed),
+        u'b.xml': u'%s %s' % (borrowed, _random_text(rng, 100)),
+        u'c.xml': _random_text(rng, 200),
+        u'd.xml': None,
+    }
+    passages = []
+    assert find_text_reuse(sorted(texts), texts.__getitem__, passages.extend, processes=2) == 1
+    assert passages[0][u'document_id'] == u'a.xml'
+    assert passages[0][u'other_document_id'] == u'b.xml'
+    assert passages[0][u'other_document_start'] == 0
+
+
+def test_text_reuse_load_once():
+    """Each text is loaded once for the index, and once for all its alignments: Should pass"""
+    rng = random.Random(4)
+    borrowed = _random_text(rng, 40)
+    texts = dict((u'%i.xml' % i, u'%s %s' % (_random_text(rng, 50), borrowed)) for i in range(6))
+    loads = Counter()
+
+    def load_text(document_id):
+        loads[document_id] += 1
+        return texts[document_id]
+
+    # All the 15 pairs of documents share the borrowed passage
+    assert find_text_reuse(sorted(texts), load_text, processes=1) == 15
+    assert loads == Counter(dict((document_id, 2) for document_id in texts))
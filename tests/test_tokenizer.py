@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+test_tokenizer.py is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+"""
+
+from teiexplorer.utils.tokenizer import (
+    tokenize,
+    tokenize_documents,
+    tokenize_with_offsets
+)
+
+
+def test_tokenizer_elisions():
+    """Split French elisions, keep lexicalised apostrophes: Should pass"""
+    tokens = tokenize(u"L'homme qu’on aime est aujourd'hui là.")
+    truth = [u'homme', u'on', u'aime', u'est', u"aujourd'hui", u'là']
+
+    assert tokens == truth
+
+
+def test_tokenizer_keep_elisions():
+    """Keep elided words and case: Should pass"""
+    tokens = tokenize(u"L'homme qu’on aime", lowercase=False, keep_elisions=True)
+    truth = [u"L'", u'homme', u"qu'", u'on', u'aime']
+
+    assert tokens == truth
+
+
+def test_tokenizer_documents():
+    """Tokenize documents in order: Should pass"""
+    texts = [u"Le chat", None, u"d'abord"]
+
+    assert tokenize_documents(texts, processes=1) == [[u'le', u'chat'], [], [u'abord']]
+
+
+def test_tokenizer_offsets():
+    """Token offsets point to their original form in the text: Should pass"""
+    text = u"L'Homme qu’on aime est là."
+    tokens = tokenize_with_offsets(text)
+    assert [t for (t, _, _) in tokens] == tokenize(text)
+    assert tokens[0] == (u'homme', 2, 7)
+    assert [text[start:end] for (_, start, end) in tokens][1] == u'on'
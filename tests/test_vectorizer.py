@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+test_vectorizer.py is part of the project TEIExplorer
+Author: Valérie Hanoka
+
+"""
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from teiexplorer.corpuscomparer.vectorizer import StreamingTfidfVectorizer
+from teiexplorer.utils.tokenizer import tokenize
+
+TEXTS = [
+    u"Le chat dort sur la table du salon.",
+    u"Le chien dort dans le jardin.",
+    u"Le roi et la reine font la guerre.",
+    u"La reine aime la paix.",
+]
+
+
+def test_vectorizer_streaming_tfidf():
+    """Streaming hashed TF-IDF gives the same similarities as TfidfVectorizer: Should pass"""
+    streaming = StreamingTfidfVectorizer(n_features=2 ** 18, ngram_range=(1, 1), chunk_size=3)
+    tfidf = streaming.fit_transform(iter(TEXTS))
+    truth = TfidfVectorizer(tokenizer=tokenize, token_pattern=None, lowercase=False)\
+        .fit_transform(TEXTS)
+
+    assert tfidf.shape == (len(TEXTS), 2 ** 18)
+    assert np.allclose((tfidf * tfidf.T).toarray(), (truth * truth.T).toarray())
+
+
+def test_vectorizer_streaming_transform():
+    """New texts are weighted with the learnt IDF: Should pass"""
+    streaming = StreamingTfidfVectorizer(n_features=2 ** 10, ngram_range=(1, 2))
+    streaming.fit_transform(iter(TEXTS))
+    new = streaming.transform([TEXTS[0]])
+
+    assert np.isclose(new.multiply(new).sum(), 1.0)